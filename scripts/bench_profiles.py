@@ -0,0 +1,107 @@
+"""
+    Time PDF to Word conversion with each conversion profile.
+
+    Usage::
+
+        python scripts/bench_profiles.py [file.pdf ...] [--repeat N]
+
+    Without files, a synthetic report is generated: every page has a logo,
+    a heading, a dozen lines of body text, a 7x5 ruled table and a filled
+    vector shape. Each profile converts each file ``--repeat`` times and the
+    median wall time is reported, together with the speedup over ``full``.
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fitz  # noqa: E402
+
+from sits_pdf.word_converter import PROFILES, Converter  # noqa: E402
+
+WORDS = ("alpha", "beta", "gamma", "delta", "lorem", "ipsum", "dolor", "amet")
+
+
+def make_sample(path: str, pages: int = 10, seed: int = 1):
+    """Write the synthetic report described in the module docstring."""
+    rng = random.Random(seed)
+    logo = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, 64, 64), 0)
+    logo.set_rect(logo.irect, (200, 30, 30))
+    logo = logo.tobytes("png")
+
+    doc = fitz.open()
+    for p in range(pages):
+        page = doc.new_page()
+        page.insert_image(fitz.Rect(40, 20, 100, 60), stream=logo)
+        page.insert_text((120, 45), f"Report page {p + 1}", fontsize=18)
+        y = 90
+        for _ in range(12):
+            line = " ".join(rng.choice(WORDS) for _ in range(12))
+            page.insert_text((50, y), line, fontsize=10)
+            y += 14
+        x0, y0, width, height = 50, y + 20, 100, 20
+        for r in range(7):
+            for c in range(5):
+                rect = fitz.Rect(x0 + c * width, y0 + r * height, x0 + (c + 1) * width, y0 + (r + 1) * height)
+                page.draw_rect(rect, color=(0, 0, 0), width=0.8)
+                page.insert_text((rect.x0 + 4, rect.y1 - 6), f"r{r}c{c}", fontsize=9)
+        page.draw_circle((400, 700), 30, color=(0, 0, 1), fill=(0.8, 0.8, 1))
+    doc.save(path)
+    doc.close()
+
+
+def time_profile(pdf_path: str, profile: str, repeat: int) -> float:
+    """Median seconds of ``repeat`` conversions of ``pdf_path``."""
+    timings = []
+    for _ in range(repeat):
+        cv = Converter(pdf_path)
+        output = tempfile.NamedTemporaryFile(suffix=".docx", delete=False)
+        output.close()
+        try:
+            start = time.perf_counter()
+            cv.convert(output.name, profile=profile)
+            timings.append(time.perf_counter() - start)
+        finally:
+            cv.close()
+            os.unlink(output.name)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("files", nargs="*", help="PDF files, a synthetic report if omitted")
+    parser.add_argument("--repeat", type=int, default=3, help="conversions per file and profile")
+    parser.add_argument("--pages", type=int, default=10, help="pages of the synthetic report")
+    args = parser.parse_args()
+
+    files = args.files
+    temp_dir = None
+    if not files:
+        temp_dir = tempfile.TemporaryDirectory()
+        files = [os.path.join(temp_dir.name, "sample.pdf")]
+        make_sample(files[0], args.pages)
+
+    # keep the converter's per-page progress out of the report
+    import logging
+    logging.getLogger().setLevel(logging.WARNING)
+
+    print(f"{'file':<24} {'profile':<12} {'median s':>9} {'speedup':>8}")
+    for path in files:
+        full = None
+        for profile in PROFILES:
+            seconds = time_profile(path, profile, args.repeat)
+            full = full or seconds
+            print(f"{os.path.basename(path):<24} {profile:<12} {seconds:>9.3f} {full / seconds:>7.2f}x")
+
+    if temp_dir is not None:
+        temp_dir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
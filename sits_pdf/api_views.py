@@ -1,4 +1,5 @@
 import base64
+import json
 import io
 import os
 import uuid
@@ -11,18 +12,23 @@ from django.conf import settings
 from .serializers import PDFFileSerializer
 from .merger import PdfMerger
 from .views import compress_pdf_in_memory
-from .views import convert_pdf_to_docx
+from .views import PROFILES, convert_pdf_to_docx
 from .views import extract_tables_and_content
 from .views import write_to_excel
-from .pdf_to_image_covert import convert_from_bytes
-import zipfile
+from .views import iter_jpeg_files
+from .views import MARGINS, render_url_to_pdf
+from .pdf_to_image_covert import convert_from_bytes, pdfinfo_from_bytes
+from .pdf_split_utils import iter_fixed_range_files, iter_single_page_files, parse_page_ranges
+from .streaming import spooled_output, stream_output, stream_zip
+from .zip_stream import iter_zip
+from .ghostscript import get_ghostscript_pool
+from .tasks import unique_names
+from . import pipeline
 from PIL import Image
 import tempfile
 from .support._reader import PdfReader
 from .support._writer import PdfWriter
 from io import BytesIO
-from playwright.sync_api import sync_playwright
-from django.http import HttpResponse
 
 class MergePDFAPIView(APIView):
     parser_classes = (MultiPartParser, FormParser)
@@ -53,15 +59,11 @@ class MergePDFAPIView(APIView):
                 pdf_io = io.BytesIO(pdf_bytes)
                 merger.append(pdf_io)
 
-            output = io.BytesIO()
+            output = spooled_output()
             merger.write(output)
-            output.seek(0)
-            merged_content = output.getvalue()
 
-            # Return the merged PDF file directly
-            response = HttpResponse(merged_content, content_type='application/pdf')
-            response['Content-Disposition'] = 'attachment; filename="merged.pdf"'
-            return response
+            # Stream the merged PDF file directly
+            return stream_output(request, output, 'application/pdf', 'merged.pdf')
 
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -88,97 +90,61 @@ class SplitPDFAPI(APIView):
         pdf_bytes = file.read()
 
         try:
-            with BytesIO(pdf_bytes) as f:
-                pdf = PdfReader(f)
-                num_pages = len(pdf.pages)
-
-                split_type = request.POST.get("split_type")
-
-                if split_type == "custom":
-                    start_page = int(request.POST.get("start_page"))
-                    end_page = int(request.POST.get("end_page"))
-                    writer = PdfWriter()
-                    for i in range(start_page - 1, end_page):
-                        writer.add_page(pdf.pages[i])
-                    output_pdf = BytesIO()
-                    writer.write(output_pdf)
-                    output_pdf.seek(0)
-                    output_data = output_pdf.getvalue()
-                    output_filename = f"extracted_pages_{start_page}_{end_page}.pdf"
-                    output_type = "application/pdf"
-
-                elif split_type == "fixed_range":
+            pdf = PdfReader(BytesIO(pdf_bytes))
+            num_pages = len(pdf.pages)
+
+            split_type = request.POST.get("split_type")
+
+            if split_type == "custom":
+                start_page = int(request.POST.get("start_page"))
+                end_page = int(request.POST.get("end_page"))
+                writer = PdfWriter()
+                for i in range(start_page - 1, end_page):
+                    writer.add_page(pdf.pages[i])
+                output_data = spooled_output()
+                writer.write(output_data)
+                output_filename = f"extracted_pages_{start_page}_{end_page}.pdf"
+                output_type = "application/pdf"
+
+            elif split_type == "fixed_range":
+                # parts are generated and sent to the client one at a time, so
+                # check the part size before the response starts
+                try:
                     pages_per_file = int(request.POST.get("pages_per_file"))
-                    num_files = -(-num_pages // pages_per_file)
-                    pdf_files = []
-                    for i in range(num_files):
-                        writer = PdfWriter()
-                        for j in range(pages_per_file):
-                            page_num = i * pages_per_file + j
-                            if page_num < num_pages:
-                                writer.add_page(pdf.pages[page_num])
-                        output_pdf = BytesIO()
-                        writer.write(output_pdf)
-                        output_pdf.seek(0)
-                        pdf_files.append(output_pdf.getvalue())
-
-                    zip_buffer = BytesIO()
-                    with zipfile.ZipFile(zip_buffer, "w") as zip_file:
-                        for i, pdf_file in enumerate(pdf_files):
-                            zip_file.writestr(
-                                f"{os.path.splitext(file.name)[0]}_part_{i+1}.pdf",
-                                pdf_file,
-                            )
-                    zip_buffer.seek(0)
-                    output_data = zip_buffer.getvalue()
-                    output_filename = f"split_files_{file.name}.zip"
-                    output_type = "application/zip"
-
-                elif split_type == "all_pages":
-                    zip_buffer = BytesIO()
-                    with zipfile.ZipFile(zip_buffer, "w") as zip_file:
-                        for i in range(num_pages):
-                            writer = PdfWriter()
-                            writer.add_page(pdf.pages[i])
-                            pdf_data = BytesIO()
-                            writer.write(pdf_data)
-                            pdf_data.seek(0)
-                            zip_file.writestr(f"page_{i+1}.pdf", pdf_data.getvalue())
-                    zip_buffer.seek(0)
-                    output_data = zip_buffer.getvalue()
-                    output_filename = "single_pages.zip"
-                    output_type = "application/zip"
-
-                elif split_type == "selected_pages":
-                    pages_to_extract = request.POST.get("pages_to_extract")
-                    writer = PdfWriter()
-                    pages_to_extract_list = []
-                    for page_range in pages_to_extract.split(","):
-                        page_range = page_range.strip()
-                        if "-" in page_range:
-                            start, end = map(int, page_range.split("-"))
-                            pages_to_extract_list.extend(range(start, end + 1))
-                        else:
-                            pages_to_extract_list.append(int(page_range))
-                    for page_num in pages_to_extract_list:
-                        if 1 <= page_num <= num_pages:
-                            writer.add_page(pdf.pages[page_num - 1])
-                        else:
-                            return Response({"error": f"Error splitting PDF : Invalid page number "}, status=status.HTTP_400_BAD_REQUEST)
-                    output_pdf = BytesIO()
-                    writer.write(output_pdf)
-                    output_pdf.seek(0)
-                    output_data = output_pdf.getvalue()
-                    output_filename = "extracted_pages.pdf"
-                    output_type = "application/pdf"
-
-                else:
-                    return Response({"error": "Invalid split type"}, status=status.HTTP_400_BAD_REQUEST)
-
-            # Return the split PDF file directly
-            response = HttpResponse(output_data, content_type=output_type)
-            response['Content-Disposition'] = f'attachment; filename="{output_filename}"'
-            return response
+                except (TypeError, ValueError):
+                    pages_per_file = 0
+                if pages_per_file < 1:
+                    return Response({"error": "pages_per_file must be a positive integer."}, status=status.HTTP_400_BAD_REQUEST)
+                entries = iter_fixed_range_files(
+                    pdf, pages_per_file, os.path.splitext(file.name)[0]
+                )
+                return stream_zip(iter_zip(entries), f"split_files_{file.name}.zip")
+
+            elif split_type == "all_pages":
+                return stream_zip(iter_zip(iter_single_page_files(pdf)), "single_pages.zip")
+
+            elif split_type == "selected_pages":
+                pages_to_extract = request.POST.get("pages_to_extract")
+                writer = PdfWriter()
+                try:
+                    pages_to_extract_list = parse_page_ranges(pages_to_extract or "")
+                except ValueError:
+                    return Response({"error": "Invalid pages_to_extract."}, status=status.HTTP_400_BAD_REQUEST)
+                for page_num in pages_to_extract_list:
+                    if 1 <= page_num <= num_pages:
+                        writer.add_page(pdf.pages[page_num - 1])
+                    else:
+                        return Response({"error": f"Error splitting PDF : Invalid page number "}, status=status.HTTP_400_BAD_REQUEST)
+                output_data = spooled_output()
+                writer.write(output_data)
+                output_filename = "extracted_pages.pdf"
+                output_type = "application/pdf"
+
+            else:
+                return Response({"error": "Invalid split type"}, status=status.HTTP_400_BAD_REQUEST)
+
+            # Stream the split PDF file directly
+            return stream_output(request, output_data, output_type, output_filename)
 
         except Exception as e:
             return Response({"error": "Failed to split PDF."}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -193,29 +159,33 @@ class CompressPDFAPIView(APIView):
     parser_classes = (MultiPartParser, FormParser)
 
     def post(self, request, format=None):
-        file = request.FILES.get('file')
-        if not file:
+        files = request.FILES.getlist('files') or request.FILES.getlist('file')
+        if not files:
             return Response({"error": "No file was submitted."}, status=status.HTTP_400_BAD_REQUEST)
 
-        if not file.name.lower().endswith('.pdf'):
-            return Response({"error": f"{file.name} is not a PDF file."}, status=status.HTTP_400_BAD_REQUEST)
+        for file in files:
+            if not file.name.lower().endswith('.pdf'):
+                return Response({"error": f"{file.name} is not a PDF file."}, status=status.HTTP_400_BAD_REQUEST)
 
-        pdf_bytes = file.read()
+        # Compress the whole batch concurrently
+        results = get_ghostscript_pool().compress_many(
+            (file.read() for file in files), quality='ebook', func=compress_pdf_in_memory
+        )
+        failed = [file.name for file, result in zip(files, results) if isinstance(result, Exception)]
+        if failed:
+            return Response({"error": f"Failed to compress PDF: {', '.join(failed)}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-        try:
-            compressed_pdf_bytes = compress_pdf_in_memory(pdf_bytes, quality='ebook')
-        except Exception as e:
-            return Response({"error": "Failed to compress PDF."}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        if len(files) == 1:
+            # Stream the compressed PDF file directly
+            return stream_output(request, BytesIO(results[0]), 'application/pdf', 'compressed.pdf')
 
-        # Return the compressed PDF file directly
-        response = HttpResponse(compressed_pdf_bytes, content_type='application/pdf')
-        response['Content-Disposition'] = 'attachment; filename="compressed.pdf"'
-        return response
+        names = unique_names([file.name for file in files], prefix="compressed_")
+        return stream_zip(iter_zip(zip(names, results)), "compressed_pdfs.zip")
 
     def get(self, request, format=None):
         return Response({
-            "message": "This endpoint compresses a single PDF file.",
-            "instructions": "Send a POST request with 'file' as the key and a PDF file as the value."
+            "message": "This endpoint compresses one or more PDF files.",
+            "instructions": "Send a POST request with 'file' as the key and a PDF file as the value, or 'files' with several PDF files to receive a ZIP archive."
         })
     
 class PDFToWordAPI(APIView):
@@ -229,22 +199,25 @@ class PDFToWordAPI(APIView):
         if not file.name.lower().endswith('.pdf'):
             return Response({"error": f"{file.name} is not a PDF file."}, status=status.HTTP_400_BAD_REQUEST)
 
+        profile = request.data.get('profile', 'full')
+        if profile not in PROFILES:
+            return Response({"error": f"Invalid profile. Choose one of: {', '.join(PROFILES)}."}, status=status.HTTP_400_BAD_REQUEST)
+
         pdf_bytes = file.read()
 
         try:
-            docx_bytes = convert_pdf_to_docx(pdf_bytes)
+            output = spooled_output()
+            convert_pdf_to_docx(pdf_bytes, output=output, profile=profile)
         except Exception as e:
             return Response({"error": "Failed to convert PDF to Word."}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-        # Return the converted Word file directly
-        response = HttpResponse(docx_bytes, content_type='application/vnd.openxmlformats-officedocument.wordprocessingml.document')
-        response['Content-Disposition'] = f'attachment; filename="{file.name.replace(".pdf", ".docx")}"'
-        return response
+        # Stream the converted Word file directly
+        return stream_output(request, output, 'application/vnd.openxmlformats-officedocument.wordprocessingml.document', file.name.replace(".pdf", ".docx"))
 
     def get(self, request, format=None):
         return Response({
             "message": "This endpoint converts a PDF file to a Word document.",
-            "instructions": "Send a POST request with 'file' as the key and a PDF file as the value."
+            "instructions": "Send a POST request with 'file' as the key and a PDF file as the value. Optionally set 'profile' to 'text_only' (text and hyperlinks only) or 'tables_only' (text and tables, no images) for a faster conversion; defaults to 'full'."
         })
     
 class PDFToJPGAPI(APIView):
@@ -261,40 +234,21 @@ class PDFToJPGAPI(APIView):
         pdf_bytes = file.read()
 
         try:
-            images = convert_from_bytes(pdf_bytes)
-            num_images = len(images)
+            num_images = pdfinfo_from_bytes(pdf_bytes)["Pages"]
 
             if num_images == 1:
                 # Single page PDF
-                image_io = io.BytesIO()
-                images[0].save(image_io, format="JPEG", quality=95)
-                image_io.seek(0)
+                image_io = spooled_output()
+                convert_from_bytes(pdf_bytes)[0].save(image_io, format="JPEG", quality=95)
 
-                jpg_bytes = image_io.getvalue()
                 jpg_filename = f"{file.name.replace('.pdf', '.jpg')}"
 
-                # Return the converted JPG file directly
-                response = HttpResponse(jpg_bytes, content_type='image/jpeg')
-                response['Content-Disposition'] = f'attachment; filename="{jpg_filename}"'
-                return response
+                # Stream the converted JPG file directly
+                return stream_output(request, image_io, 'image/jpeg', jpg_filename)
             else:
-                # Multi-page PDF
-                zip_io = io.BytesIO()
-                with zipfile.ZipFile(zip_io, "w") as zip_file:
-                    for i, image in enumerate(images):
-                        image_io = io.BytesIO()
-                        image.save(image_io, format="JPEG", quality=95)
-                        image_io.seek(0)
-                        zip_file.writestr(f"page_{i+1}.jpg", image_io.getvalue())
-
-                zip_io.seek(0)
-                zip_bytes = zip_io.getvalue()
+                # Multi-page PDF: pages are rendered, zipped and sent one at a time
                 zip_filename = f"{file.name.replace('.pdf', '.zip')}"
-
-                # Return the converted ZIP file directly
-                response = HttpResponse(zip_bytes, content_type='application/zip')
-                response['Content-Disposition'] = f'attachment; filename="{zip_filename}"'
-                return response
+                return stream_zip(iter_zip(iter_jpeg_files(pdf_bytes)), zip_filename)
         except Exception as e:
             return Response({"error": "Failed to convert PDF to JPG."}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
@@ -323,19 +277,13 @@ class JPGToPDFAPI(APIView):
             images.append(image)
 
         try:
-            pdf_io = io.BytesIO()
+            pdf_io = spooled_output()
             images[0].save(
                 pdf_io, format="PDF", save_all=True, append_images=images[1:]
             )
-            pdf_io.seek(0)
-
-            pdf_bytes = pdf_io.getvalue()
-            pdf_filename = "converted.pdf"
 
-            # Return the converted PDF file directly
-            response = HttpResponse(pdf_bytes, content_type='application/pdf')
-            response['Content-Disposition'] = f'attachment; filename="{pdf_filename}"'
-            return response
+            # Stream the converted PDF file directly
+            return stream_output(request, pdf_io, 'application/pdf', 'converted.pdf')
 
         except Exception as e:
             return Response({"error": "Failed to convert JPG images to PDF."}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -360,50 +308,14 @@ class ConvertURLToPDFView(APIView):
         else:
             landscape_allow_bool = False
 
-        landscape_allow_bool = landscape_allow and landscape_allow.lower() == "true"
-
-        if margin == "none":
-            top_margin = 0
-            bottom_margin = 0
-            left_margin = 0
-            right_margin = 0
-        elif margin == "small":
-            top_margin = 0.5
-            bottom_margin = 0.5
-            left_margin = 0.5
-            right_margin = 0.5
-        elif margin == "large":
-            top_margin = 1
-            bottom_margin = 1
-            left_margin = 1
-            right_margin = 1
-
         if url_to_fetch and paper_format:
             try:
-                with sync_playwright() as p:
-                    browser_type = p.chromium
-                    browser = browser_type.launch(headless=True)
-                    context = browser.new_context()
-                    page = context.new_page()
-                    page.goto(url_to_fetch)
-                    page.wait_for_load_state("networkidle")
-
-                    pdf = page.pdf(
-                        format=paper_format,
-                        print_background=True,
-                        margin={
-                            "top": f"{top_margin}cm",
-                            "bottom": f"{bottom_margin}cm",
-                            "left": f"{left_margin}cm",
-                            "right": f"{right_margin}cm",
-                        },
-                        landscape = landscape_allow_bool,
-                    )
-
-                # Return the converted PDF file directly
-                response = HttpResponse(pdf, content_type="application/pdf")
-                response['Content-Disposition'] = 'attachment; filename="converted.pdf"'
-                return response
+                pdf = render_url_to_pdf(
+                    url_to_fetch, paper_format, MARGINS.get(margin, 0), landscape_allow_bool
+                )
+
+                # Stream the converted PDF file directly
+                return stream_output(request, BytesIO(pdf), "application/pdf", "converted.pdf")
 
             except Exception as e:
                 return Response({"error": f"Error processing files: {str(e)}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -436,16 +348,15 @@ class PDFTOExcelAPI(APIView):
                 temp_pdf_path = temp_pdf.name
 
                 tables, image_list, text_content = extract_tables_and_content(temp_pdf_path)
-                excel_bytes = write_to_excel(tables, image_list, text_content)
+                output = spooled_output()
+                write_to_excel(tables, image_list, text_content, output=output)
 
             os.unlink(temp_pdf_path)
 
             excel_filename = f"converted_{uuid.uuid4()}.xlsx"
 
-            # Return the converted Excel file directly
-            response = HttpResponse(excel_bytes, content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-            response['Content-Disposition'] = f'attachment; filename="{excel_filename}"'
-            return response
+            # Stream the converted Excel file directly
+            return stream_output(request, output, 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', excel_filename)
 
         except Exception as e:
             return Response({"error": "Failed to convert PDF to Excel."}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -456,3 +367,43 @@ class PDFTOExcelAPI(APIView):
             "instructions": "Send a POST request with 'file' as the key and a PDF file as the value."
         })
     
+
+
+class PipelineAPIView(APIView):
+    parser_classes = (MultiPartParser, FormParser)
+
+    def post(self, request, format=None):
+        files = request.FILES.getlist('files')
+        if not files:
+            return Response({"error": "No files were submitted."}, status=status.HTTP_400_BAD_REQUEST)
+
+        for file in files:
+            if not file.name.lower().endswith('.pdf'):
+                return Response({"error": f"{file.name} is not a PDF file."}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            steps = pipeline.validate(json.loads(request.POST.get("steps", "")))
+        except (ValueError, pipeline.PipelineError) as e:
+            return Response({"error": f"Invalid steps: {str(e)}"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            artifacts = [pipeline.Artifact(file.name, data=file.read()) for file in files]
+            single, many = pipeline.single_or_many(pipeline.run(artifacts, steps))
+        except pipeline.PipelineError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            return Response({"error": f"Pipeline failed: {str(e)}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        if single is not None:
+            # Stream the final artifact directly
+            return stream_output(request, BytesIO(single.data), single.content_type, single.name)
+        return stream_zip(iter_zip(pipeline.zip_entries(many)), "pipeline_results.zip")
+
+    def get(self, request, format=None):
+        return Response({
+            "message": "This endpoint runs several operations on PDF files in one request.",
+            "instructions": "Send a POST request with 'files' (one or more PDF files) and 'steps', a JSON list such as "
+                            '[{"op": "merge"}, {"op": "compress", "quality": "ebook"}, {"op": "split", "split_type": "fixed_range", "pages_per_file": 2}]. '
+                            "Operations: merge, split, compress, to_jpg, to_word, to_excel (the last three only as the final step). "
+                            "A single result is returned as is, several results as a ZIP archive."
+        })
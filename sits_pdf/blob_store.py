@@ -0,0 +1,168 @@
+"""
+    Content-addressed storage for uploaded and generated files.
+
+    Blobs are keyed by the SHA-256 digest of their content, so the session only
+    has to keep the digest and a little metadata, and identical uploads are
+    written to disk once.
+"""
+
+import hashlib
+import os
+import tempfile
+import time
+from typing import IO, Iterable, Optional
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+DEFAULT_BACKEND = "sits_pdf.blob_store.FileSystemBlobStore"
+CHUNK_SIZE = 64 * 1024
+
+
+class BlobNotFound(KeyError):
+    """Raised when no blob is stored under the requested digest"""
+
+    pass
+
+
+class BlobStore:
+    """Interface of a content-addressed blob store.
+
+    Subclasses implement ``put_chunks``, ``open``, ``exists``, ``size``,
+    ``delete`` and ``prune``; everything else is built on top of them.
+    """
+
+    def put(self, data: bytes) -> str:
+        """Store ``data`` and return its hex digest."""
+        return self.put_chunks((data,))
+
+    def put_file(self, fileobj: IO[bytes]) -> str:
+        """Store the remaining content of a binary file object."""
+        if hasattr(fileobj, "chunks"):  # django UploadedFile
+            return self.put_chunks(fileobj.chunks(CHUNK_SIZE))
+        return self.put_chunks(iter(lambda: fileobj.read(CHUNK_SIZE), b""))
+
+    def put_chunks(self, chunks: Iterable[bytes]) -> str:
+        raise NotImplementedError
+
+    def get(self, digest: str) -> bytes:
+        """Read the whole blob into memory."""
+        with self.open(digest) as f:
+            return f.read()
+
+    def open(self, digest: str) -> IO[bytes]:
+        raise NotImplementedError
+
+    def exists(self, digest: str) -> bool:
+        raise NotImplementedError
+
+    def size(self, digest: str) -> int:
+        raise NotImplementedError
+
+    def delete(self, digest: str) -> None:
+        raise NotImplementedError
+
+    def prune(self, max_age: float) -> int:
+        """Delete blobs older than ``max_age`` seconds, returning their count."""
+        raise NotImplementedError
+
+
+class FileSystemBlobStore(BlobStore):
+    """Blob store keeping one file per digest below ``root``.
+
+    Files are sharded into sub-directories by the first two hex characters of
+    the digest, e.g. ``root/ab/abcdef...``. Writes go to a temporary file in
+    the same directory first and are then renamed into place, so concurrent
+    writers of the same content never expose a partial blob.
+    """
+
+    def __init__(self, root: str):
+        self.root = os.fspath(root)
+        os.makedirs(self.root, exist_ok=True)
+
+    def path(self, digest: str) -> str:
+        if len(digest) != 64 or not all(c in "0123456789abcdef" for c in digest):
+            raise BlobNotFound(digest)
+        return os.path.join(self.root, digest[:2], digest)
+
+    def put_chunks(self, chunks: Iterable[bytes]) -> str:
+        sha = hashlib.sha256()
+        fd, temp_path = tempfile.mkstemp(dir=self.root, suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for chunk in chunks:
+                    sha.update(chunk)
+                    f.write(chunk)
+
+            digest = sha.hexdigest()
+            target = self.path(digest)
+            if os.path.exists(target):
+                # duplicate upload: keep the existing copy, refresh its age
+                os.utime(target)
+                os.unlink(temp_path)
+            else:
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                os.replace(temp_path, target)
+            return digest
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+            raise
+
+    def open(self, digest: str) -> IO[bytes]:
+        try:
+            return open(self.path(digest), "rb")
+        except FileNotFoundError:
+            raise BlobNotFound(digest)
+
+    def exists(self, digest: str) -> bool:
+        try:
+            return os.path.exists(self.path(digest))
+        except BlobNotFound:
+            return False
+
+    def size(self, digest: str) -> int:
+        try:
+            return os.path.getsize(self.path(digest))
+        except FileNotFoundError:
+            raise BlobNotFound(digest)
+
+    def delete(self, digest: str) -> None:
+        try:
+            os.unlink(self.path(digest))
+        except (FileNotFoundError, BlobNotFound):
+            pass
+
+    def prune(self, max_age: float) -> int:
+        """Delete blobs not written or re-uploaded in the last ``max_age``
+        seconds, returning the number of removed files."""
+        deadline = time.time() - max_age
+        removed = 0
+        for dirpath, _, filenames in os.walk(self.root):
+            for name in filenames:
+                path = os.path.join(dirpath, name)
+                try:
+                    if os.path.getmtime(path) < deadline:
+                        os.unlink(path)
+                        removed += 1
+                except FileNotFoundError:
+                    continue
+        return removed
+
+
+_store: Optional[BlobStore] = None
+
+
+def get_blob_store() -> BlobStore:
+    """Return the process-wide blob store configured by ``BLOB_STORE_BACKEND``
+    and ``BLOB_STORE_ROOT``."""
+    global _store
+    if _store is None:
+        backend = getattr(settings, "BLOB_STORE_BACKEND", DEFAULT_BACKEND)
+        root = getattr(
+            settings,
+            "BLOB_STORE_ROOT",
+            os.path.join(settings.MEDIA_ROOT, "blobs"),
+        )
+        _store = import_string(backend)(root)
+    return _store
@@ -0,0 +1,202 @@
+"""
+    Pool of long-lived headless Chromium browsers for web page rendering.
+
+    The Playwright sync API is bound to the thread that started it, so every
+    browser lives in its own worker thread and requests are handed over
+    through a queue. The number of workers caps the concurrent renders, each
+    request gets a fresh isolated browser context, and a browser is replaced
+    after a fixed number of pages to bound the memory it accumulates.
+
+    Job workers split ``BROWSER_POOL_SIZE`` between them (at least one browser
+    each, launched on first use) instead of each running a full pool, see
+    ``get_browser_pool``.
+"""
+
+import logging
+import queue
+import threading
+from concurrent.futures import Future, TimeoutError
+from typing import List, NamedTuple, Optional
+
+from django.conf import settings
+from playwright.sync_api import sync_playwright
+
+from .jobs import pool_share
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SIZE = 2
+DEFAULT_MAX_PAGES = 50
+DEFAULT_TIMEOUT = 60
+DEFAULT_VIEWPORT = {"width": 1280, "height": 800}
+
+
+class RenderResult(NamedTuple):
+    screenshot: Optional[bytes]
+    pdfs: List[bytes]
+
+
+class RenderAbandoned(Exception):
+    """Raised in a worker when the caller stopped waiting for the render"""
+
+    pass
+
+
+class _RenderRequest(NamedTuple):
+    url: str
+    screenshot_width: Optional[int]
+    pdf_options: List[dict]
+    timeout: float
+    future: Future
+    abandoned: threading.Event
+
+
+def render_page(browser, request: _RenderRequest) -> RenderResult:
+    """Load ``request.url`` once in a new context, then take the screenshot and
+    print every requested PDF variant from that same page. The render stops
+    between steps, closing its context, once the caller has given up."""
+
+    def check():
+        if request.abandoned.is_set():
+            raise RenderAbandoned(request.url)
+
+    viewport = dict(DEFAULT_VIEWPORT)
+    if request.screenshot_width:
+        viewport["width"] = request.screenshot_width
+    context = browser.new_context(viewport=viewport)
+    try:
+        page = context.new_page()
+        page.set_default_timeout(request.timeout * 1000)
+        page.goto(request.url, wait_until="networkidle")
+
+        screenshot = None
+        if request.screenshot_width is not None:
+            check()
+            screenshot = page.screenshot(full_page=True, type="png")
+        pdfs = []
+        for options in request.pdf_options:
+            check()
+            pdfs.append(page.pdf(**options))
+        return RenderResult(screenshot, pdfs)
+    finally:
+        context.close()
+
+
+class _BrowserWorker(threading.Thread):
+    """Thread owning one Chromium instance, relaunched every ``max_pages``."""
+
+    def __init__(self, tasks: queue.Queue, max_pages: int, name: str):
+        super().__init__(name=name, daemon=True)
+        self.tasks = tasks
+        self.max_pages = max_pages
+
+    def run(self):
+        with sync_playwright() as p:
+            browser = None
+            pages = 0
+            while True:
+                request = self.tasks.get()
+                if request is None:
+                    break
+                if not request.future.set_running_or_notify_cancel():
+                    continue
+                try:
+                    if browser is None or pages >= self.max_pages or not browser.is_connected():
+                        if browser is not None:
+                            logger.info(f"{self.name}: recycling browser after {pages} pages")
+                            self._close(browser)
+                        browser = p.chromium.launch(headless=True)
+                        pages = 0
+                    pages += 1
+                    request.future.set_result(render_page(browser, request))
+                except Exception as e:
+                    request.future.set_exception(e)
+            if browser is not None:
+                self._close(browser)
+
+    @staticmethod
+    def _close(browser):
+        try:
+            browser.close()
+        except Exception as e:
+            logger.warning(f"Error closing browser: {e}")
+
+
+class BrowserPool:
+    """Run page renders on ``size`` warm browsers, see ``render``."""
+
+    def __init__(
+        self,
+        size: int = DEFAULT_SIZE,
+        max_pages: int = DEFAULT_MAX_PAGES,
+        timeout: float = DEFAULT_TIMEOUT,
+    ):
+        self.size = size
+        self.max_pages = max_pages
+        self.timeout = timeout
+        self._tasks: queue.Queue = queue.Queue()
+        self._workers: List[_BrowserWorker] = []
+        self._lock = threading.Lock()
+
+    def _start(self):
+        with self._lock:
+            self._workers = [w for w in self._workers if w.is_alive()]
+            for i in range(len(self._workers), self.size):
+                worker = _BrowserWorker(self._tasks, self.max_pages, f"browser-{i}")
+                worker.start()
+                self._workers.append(worker)
+
+    def render(
+        self,
+        url: str,
+        screenshot_width: Optional[int] = None,
+        pdf_options: Optional[List[dict]] = None,
+        timeout: Optional[float] = None,
+    ) -> RenderResult:
+        """Load ``url`` once and return a full page PNG screenshot at
+        ``screenshot_width`` (if given) plus one PDF per entry of
+        ``pdf_options`` (keyword arguments of Playwright's ``page.pdf``).
+
+        On timeout a queued render is cancelled, and a running one is told to
+        stop and close its page before raising ``TimeoutError``."""
+        self._start()
+        timeout = timeout or self.timeout
+        future: Future = Future()
+        abandoned = threading.Event()
+        self._tasks.put(
+            _RenderRequest(url, screenshot_width, pdf_options or [], timeout, future, abandoned)
+        )
+        try:
+            # the page timeout applies to each step, leave room for a slow launch
+            return future.result(timeout=timeout * 3)
+        except TimeoutError:
+            if not future.cancel():
+                abandoned.set()
+            raise
+
+    def shutdown(self):
+        with self._lock:
+            for _ in self._workers:
+                self._tasks.put(None)
+            for worker in self._workers:
+                worker.join()
+            self._workers = []
+
+
+_pool: Optional[BrowserPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_browser_pool() -> BrowserPool:
+    """Return the process-wide pool configured by ``BROWSER_POOL_SIZE``,
+    ``BROWSER_MAX_PAGES`` and ``BROWSER_TIMEOUT``. In a job worker the pool
+    only gets the worker's share of ``BROWSER_POOL_SIZE``."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = BrowserPool(
+                pool_share(getattr(settings, "BROWSER_POOL_SIZE", DEFAULT_SIZE)),
+                getattr(settings, "BROWSER_MAX_PAGES", DEFAULT_MAX_PAGES),
+                getattr(settings, "BROWSER_TIMEOUT", DEFAULT_TIMEOUT),
+            )
+        return _pool
@@ -7,6 +7,7 @@ import fitz
 from .Element import Element
 from .share import (IText, TextDirection)
 from .algorithm import (solve_rects_intersection, graph_bfs)
+from .spatial import (group_intersected, interval_pairs, merge_intervals, connected_components)
 
 
 class BaseCollection:
@@ -127,6 +128,49 @@ class Collection(BaseCollection, IText):
         groups = [self.__class__([self._instances[i] for i in group]) for group in groups]
         return groups
 
+
+    def group_by_intersection(self, fun=None, dx:float=0.0, dy:float=0.0):
+        """Group instances whose bboxes intersect, with a tolerance, and fulfill an optional
+        criterion. Same result as ``group()`` for any criterion implying the intersection, in
+        near-linear time with a spatial index.
+
+        Args:
+            fun (function, optional): with 2 arguments representing 2 instances (Element)
+                and return bool. Defaults to None, i.e. intersection only.
+            dx (float, optional): x-tolerance to define intersection. Defaults to 0.0.
+            dy (float, optional): y-tolerance to define intersection. Defaults to 0.0.
+
+        Returns:
+            list: a list of grouped ``Collection`` instances.
+        """
+        instances = self._instances
+        connected = (lambda i, j: fun(instances[i], instances[j])) if fun else None
+        groups = group_intersected([e.bbox for e in instances], connected, dx, dy)
+        return [self.__class__([instances[i] for i in group]) for group in groups]
+
+
+    def _group_by_projection(self, fun, idx:int, factor:float=None):
+        '''Group instances aligned along one axis, i.e. ``fun(a,b)`` implies the projections of
+        the bboxes on x-axis (``idx=0``) or y-axis (``idx=1``) overlap. With ``factor=0``, the
+        criterion is exactly the overlap (with the tolerance used by ``Element``).'''
+        instances = self._instances
+        intervals = [(e.bbox[idx], e.bbox[idx+2]) for e in instances]
+        eps = 1e-3
+        if factor==0.0:
+            groups = merge_intervals(intervals, eps)
+        else:
+            connected = lambda i, j: fun(instances[i], instances[j])
+            groups = connected_components(len(instances), interval_pairs(intervals, eps), connected)
+        return [self.__class__([instances[i] for i in group]) for group in groups]
+
+
+    def _projection_axis(self, vertical_idx:int, horizontal_idx:int, text_direction:bool):
+        '''Axis index of the alignment check, or None if it differs between instances.'''
+        if not text_direction: return horizontal_idx
+        vertical = set(e.is_vertical_text for e in self._instances)
+        if len(vertical)>1: return None
+        return vertical_idx if True in vertical else horizontal_idx
+
     
     def group_by_connectivity(self, dx:float, dy:float):
         """Collect connected instances into same group.
@@ -171,7 +215,8 @@ class Collection(BaseCollection, IText):
         '''Group elements into columns based on the bbox.'''
         # split in columns
         fun = lambda a,b: a.vertically_align_with(b, factor=factor, text_direction=text_direction)
-        groups = self.group(fun)
+        axis = self._projection_axis(1, 0, text_direction)
+        groups = self.group(fun) if axis is None else self._group_by_projection(fun, axis, factor)
         
         # increase in x-direction if sort
         if sorted: 
@@ -185,7 +230,8 @@ class Collection(BaseCollection, IText):
         '''Group elements into rows based on the bbox.'''
         # split in rows
         fun = lambda a,b: a.horizontally_align_with(b, factor=factor, text_direction=text_direction)
-        groups = self.group(fun)
+        axis = self._projection_axis(0, 1, text_direction)
+        groups = self.group(fun) if axis is None else self._group_by_projection(fun, axis, factor)
 
         # increase in y-direction if sort
         if sorted: 
@@ -198,7 +244,11 @@ class Collection(BaseCollection, IText):
     def group_by_physical_rows(self, sorted:bool=False, text_direction:bool=False):
         '''Group lines into physical rows.'''
         fun = lambda a,b: a.in_same_row(b)
-        groups = self.group(fun)
+        horizontal = set(e.is_horizontal_text for e in self._instances)
+        if len(horizontal)>1:
+            groups = self.group(fun)
+        else:
+            groups = self._group_by_projection(fun, 1 if True in horizontal else 0)
 
         # increase in y-direction if sort
         if sorted: 
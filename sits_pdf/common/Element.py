@@ -10,39 +10,59 @@ CS. If final coordinates are provided, should update it after creating an empty
 
     Element().update_bbox(final_bbox)
 
+The rotation matrix of the page being restored is context-local, see ``Element.rotation``, so
+pages can be processed in concurrent threads. Outside that context no rotation is applied, e.g.
+when restoring a stored layout which is in real page CS already.
+
 .. note::
     An exception is ``page.get_drawings()``, the coordinates are converted to real page CS already.
 '''
 
 import copy
+from contextlib import contextmanager
+from contextvars import ContextVar
 import fitz
 from .share import IText
 from . import constants
 
 
+# all coordinates are related to un-rotated page in PyMuPDF
+# e.g. Matrix(0.0, 1.0, -1.0, 0.0, 842.0, 0.0)
+_rotation_matrix = ContextVar('rotation_matrix', default=fitz.Identity)
+
+
 class Element(IText):
     '''Boundary box with attribute in fitz.Rect type.'''
+    # subclasses created in large numbers (e.g. Char, TextSpan, Line) declare their own slots,
+    # others still get an instance dict
+    __slots__ = ('bbox', '_parent')
 
-    # all coordinates are related to un-rotated page in PyMuPDF
-    # e.g. Matrix(0.0, 1.0, -1.0, 0.0, 842.0, 0.0)
-    ROTATION_MATRIX = fitz.Matrix(0.0) # rotation angle = 0 degree by default
-
-
-    @classmethod
-    def set_rotation_matrix(cls, rotation_matrix):
-        """Set global rotation matrix.
+    @staticmethod
+    @contextmanager
+    def rotation(rotation_matrix):
+        """Apply page rotation matrix to elements created from source dict in this context.
 
         Args:
-            Rotation_matrix (fitz.Matrix): target matrix
+            rotation_matrix (fitz.Matrix): Rotation matrix of the page; no rotation if None.
         """
-        if rotation_matrix and isinstance(rotation_matrix, fitz.Matrix):
-            cls.ROTATION_MATRIX = rotation_matrix
+        if not isinstance(rotation_matrix, fitz.Matrix): rotation_matrix = fitz.Identity
+        token = _rotation_matrix.set(rotation_matrix)
+        try:
+            yield
+        finally:
+            _rotation_matrix.reset(token)
+
+
+    @classmethod
+    def rotation_matrix(cls):
+        '''Rotation matrix of the page being restored in current context.'''
+        return _rotation_matrix.get()
 
 
     @classmethod
     def pure_rotation_matrix(cls):
         '''Pure rotation matrix used for calculating text direction after rotation.'''
-        a,b,c,d,e,f = cls.ROTATION_MATRIX
+        a,b,c,d,e,f = _rotation_matrix.get()
         return fitz.Matrix(a,b,c,d,0,0)
 
 
@@ -54,7 +74,7 @@ class Element(IText):
         # NOTE: Any coordinates provided in raw is in original page CS 
         # (without considering page rotation).
         if 'bbox' in (raw or {}):
-            rect = fitz.Rect(raw['bbox']) * Element.ROTATION_MATRIX
+            rect = fitz.Rect(raw['bbox']) * _rotation_matrix.get()
             self.update_bbox(rect)
 
 
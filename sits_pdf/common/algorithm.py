@@ -207,40 +207,50 @@ def recursive_xy_cut(img_binary:np.array,
     
     Returns:
         list: bbox (x0, y0, x1, y1) of split blocks.
+
+    .. note::
+        The projection profiles of any sub-region are taken from one integral image of the whole
+        image, and the recursion runs on an explicit stack in the same depth-first order.
     '''
-    def xy_cut(arr:np.array, top_left:tuple, res:list, 
-                    min_w:float, min_h:float, min_dx:float, min_dy:float):
-        x0, y0 = top_left
-        h, w = arr.shape
-        # cut along x-direction
-        projection = np.count_nonzero(arr==255, axis=1)
-        pos_y = _split_projection_profile(projection, min_w, min_dy)
-        if not pos_y: return        
+    # integral image: S[i, j] = count of interesting pixels in img_binary[:i, :j]
+    h, w = img_binary.shape
+    S = np.zeros((h+1, w+1), dtype=np.int32)
+    S[1:, 1:] = (img_binary==255).cumsum(axis=0, dtype=np.int32).cumsum(axis=1, dtype=np.int32)
+
+    # stack of regions (x0, y0, x1, y1) to cut, or bbox-es in result
+    res = []
+    stack = [(False, (0, 0, w, h))]
+    while stack:
+        is_result, (x0, y0, x1, y1) = stack.pop()
+        if is_result:
+            res.append((x0, y0, x1, y1))
+            continue
+
+        # cut along x-direction: count per row
+        cumulative = S[y0:y1+1, x1] - S[y0:y1+1, x0]
+        pos_y = _split_projection_profile(cumulative[1:]-cumulative[:-1], min_w, min_dy)
+        if not pos_y: continue
 
         # cut along y-direction for each part
-        arr_y0, arr_y1 = pos_y
-        for r0, r1 in zip(arr_y0, arr_y1):
-            x_arr = arr[r0:r1, 0:w]
-            projection = np.count_nonzero(x_arr==255, axis=0)
-            pos_x = _split_projection_profile(projection, min_h, min_dx)
+        items = []
+        for r0, r1 in zip(*pos_y):
+            r0, r1 = y0+r0, y0+r1
+            cumulative = S[r1, x0:x1+1] - S[r0, x0:x1+1]
+            pos_x = _split_projection_profile(cumulative[1:]-cumulative[:-1], min_h, min_dx)
             if not pos_x: continue
             
             # determined the block bbox
             arr_x0, arr_x1 = pos_x
             if len(arr_x0)==1:
-                res.append((x0+arr_x0[0], y0+r0, x0+arr_x1[0], y0+r1))
+                items.append((True, (x0+arr_x0[0], r0, x0+arr_x1[0], r1)))
                 continue
             
             # xy-cut recursively if the count of blocks > 1
             for c0, c1 in zip(arr_x0, arr_x1):
-                y_arr = arr[r0:r1, c0:c1]
-                top_left = (x0+c0, y0+r0)
-                xy_cut(y_arr, top_left, res, min_w, min_h, min_dx, min_dy)
+                items.append((False, (x0+c0, r0, x0+c1, r1)))
+
+        stack.extend(reversed(items))
 
-    # do xy-cut recursively
-    res = []
-    xy_cut(arr=img_binary, top_left=(0, 0), res=res, 
-            min_w=min_w, min_h=min_h, min_dx=min_dx, min_dy=min_dy)
     return res
 
 
@@ -263,25 +273,22 @@ def _split_projection_profile(arr_values:np.array, min_value:float, min_gap:floa
         min_gap (float): Ignore the gap if less than this value.
 
     Returns:
-        tuple: Start indexes and end indexes of split groups.
+        tuple: Lists of start indexes and end indexes of split groups.
     '''
     # all indexes with projection height exceeding the threshold
-    arr_index = np.where(arr_values>min_value)[0]
-    if not len(arr_index): return
+    arr_index = np.flatnonzero(arr_values>min_value)
+    if not arr_index.size: return
 
     # find zero intervals between adjacent projections
     # |  |                    ||
     # ||||<- zero-interval -> |||||
-    arr_diff = arr_index[1:] - arr_index[0:-1]
-    arr_diff_index = np.where(arr_diff>min_gap)[0]
-    arr_zero_intvl_start = arr_index[arr_diff_index]
-    arr_zero_intvl_end = arr_index[arr_diff_index+1]
+    arr_diff_index = np.flatnonzero(arr_index[1:]-arr_index[:-1] > min_gap)
 
     # convert to index of projection range:
     # the start index of zero interval is the end index of projection
-    arr_start = np.insert(arr_zero_intvl_end, 0, arr_index[0])
-    arr_end = np.append(arr_zero_intvl_start, arr_index[-1])
-    arr_end += 1 # end index will be excluded as index slice
+    arr_start = [int(arr_index[0])] + arr_index[arr_diff_index+1].tolist()
+    arr_end = arr_index[arr_diff_index].tolist() + [int(arr_index[-1])]
+    arr_end = [i+1 for i in arr_end] # end index will be excluded as index slice
 
     return arr_start, arr_end
 
@@ -299,11 +306,14 @@ def inner_contours(img_binary:np.array, bbox:tuple, min_w:float, min_h:float):
         list: A list of bbox-es of inner contours.
     '''
     
-    # find both external and inner contours of current region
+    # find both external and inner contours of current region: the region with a blank border,
+    # so contours are the same as in the whole image with everything else blank
     x0, y0, x1, y1 = bbox
-    arr = np.zeros(img_binary.shape, dtype=np.uint8)
-    arr[y0:y1, x0:x1] = img_binary[y0:y1, x0:x1]
-    contours, hierarchy = cv.findContours(arr, cv.RETR_TREE, cv.CHAIN_APPROX_SIMPLE)
+    arr = np.zeros((y1-y0+2, x1-x0+2), dtype=np.uint8)
+    arr[1:-1, 1:-1] = img_binary[y0:y1, x0:x1]
+    contours, hierarchy = cv.findContours(arr, cv.RETR_TREE, cv.CHAIN_APPROX_SIMPLE, 
+                                            offset=(x0-1, y0-1))
+    if hierarchy is None: return []
 
     # check first three level contours:    
     # * level-0, i.e. table bbox
@@ -315,41 +325,33 @@ def inner_contours(img_binary:np.array, bbox:tuple, min_w:float, min_h:float):
     level_1 = np.where(np.isin(hierarchy[0,:,3], level_0))[0]    
     level_2 = np.where(np.isin(hierarchy[0,:,3], level_1))[0]
 
+    def bboxes(indexes):
+        '''(n, 4) array of contour bbox-es (x0, y0, x1, y1) no less than min_w x min_h.'''
+        rects = np.array([cv.boundingRect(contours[i]) for i in indexes], dtype=np.int64).reshape(-1, 4)
+        rects = rects[(rects[:,2]>=min_w) & (rects[:,3]>=min_h)]
+        rects[:,2:] += rects[:,:2]
+        return rects
+
+    def contains(A, B):
+        '''Matrix ``M[i, j]``: whether bbox ``A[i]`` contains bbox ``B[j]``.'''
+        return (B[None,:,0]>=A[:,None,0]) & (B[None,:,1]>=A[:,None,1]) & \
+                (B[None,:,2]<=A[:,None,2]) & (B[None,:,3]<=A[:,None,3])
+
     # In general, we focus on only level 2, but considering edge case: level 2 contours 
     # might be counted as level 1 incorrectly, e.g. test/samples/demo-table-close-underline.pdf. 
     # So, get first the concerned level 1 contours, i.e. those contained by other level 1 contour.
-    def contains(bbox1, bbox2):
-        x0, y0, x1, y1 = bbox1
-        u0, v0, u1, v1 = bbox2
-        return u0>=x0 and v0>=y0 and u1<=x1 and v1<=y1
-
-    level_1_bbox_list, res_level_1, res = [], [], []
-    for i in level_1:
-        x, y, w, h = cv.boundingRect(contours[i])
-        if w<min_w or h<min_h: continue
-        level_1_bbox_list.append((x, y, x+w, y+h))
-
-    for bbox1 in level_1_bbox_list:
-        for bbox2 in level_1_bbox_list:
-            if bbox1==bbox2: continue # skip itself
-            if contains(bbox1, bbox2):
-                res_level_1.append(bbox2)
-                res.append(bbox2)
+    # NOTE: a level 1 bbox is counted once for each other level 1 bbox containing it.
+    level_1_bboxes = bboxes(level_1)
+    equal = (level_1_bboxes[:,None,:]==level_1_bboxes[None,:,:]).all(axis=2)
+    _, index = np.nonzero(contains(level_1_bboxes, level_1_bboxes) & ~equal)
+    res_level_1 = level_1_bboxes[index]
 
     # now level 2: with contours contained in `res_level_1` excluded
-    def contained_in_concerned_level_1(bbox):
-        for level_1_bbox in res_level_1:
-            if contains(level_1_bbox, bbox): return True
-        return False
-
-    for i in level_2:
-        x, y, w, h = cv.boundingRect(contours[i])
-        level_2_bbox = (x, y, x+w, y+h)
-        if w<min_w or h<min_h: continue
-        if contained_in_concerned_level_1(level_2_bbox): continue
-        res.append(level_2_bbox)
+    level_2_bboxes = bboxes(level_2)
+    excluded = contains(res_level_1, level_2_bboxes).any(axis=0)
+    res = np.concatenate((res_level_1, level_2_bboxes[~excluded]))
     
-    return res
+    return [tuple(int(x) for x in bbox) for bbox in res]
 
 
 def xy_project_profile(img_source:np.array, img_binary:np.array, gap:int=5, dw:int=None, dh:int=None):   
@@ -13,6 +13,7 @@ from docx.oxml.xmlchemy import BaseOxmlElement, OneAndOnlyOne
 from docx.enum.text import WD_COLOR_INDEX
 from docx.image.exceptions import UnrecognizedImageError
 from docx.table import _Cell
+from docx.text.paragraph import Paragraph
 from docx.opc.constants import RELATIONSHIP_TYPE
 from .share import rgb_value
 
@@ -80,6 +81,41 @@ def delete_paragraph(paragraph):
     paragraph._p = paragraph._element = None
 
 
+def last_paragraph(container, before:Paragraph=None):
+    '''Last paragraph of ``container``, or the last one preceding paragraph ``before``.
+
+    ``container.paragraphs`` collects every paragraph of the XML tree on each access, while
+    this helper walks back from the end, so it takes constant time when building a document.
+
+    Args:
+        container (Document, _Cell): ``python-docx`` block container.
+        before (Paragraph, optional): Search before this paragraph. Defaults to None.
+
+    Returns:
+        Paragraph: The paragraph, or None if not found.
+    '''
+    parent = getattr(container, '_body', container) # Document -> _Body
+    element = parent._element[-1] if before is None else before._p.getprevious()
+    while element is not None and element.tag!=qn('w:p'): element = element.getprevious()
+    return None if element is None else Paragraph(element, parent)
+
+
+def next_paragraph(container, after:Paragraph=None):
+    '''First paragraph of ``container``, or the first one following paragraph ``after``.
+
+    Args:
+        container (Document, _Cell): ``python-docx`` block container.
+        after (Paragraph, optional): Search after this paragraph. Defaults to None.
+
+    Returns:
+        Paragraph: The paragraph, or None if not found.
+    '''
+    parent = getattr(container, '_body', container)
+    element = parent._element[0] if after is None else after._p.getnext()
+    while element is not None and element.tag!=qn('w:p'): element = element.getnext()
+    return None if element is None else Paragraph(element, parent)
+
+
 def reset_paragraph_format(p, line_spacing:float=1.05):
     '''Reset paragraph format, especially line spacing.
 
@@ -377,6 +413,34 @@ def indent_table(table, indent:float):
         tbl_pr[0].append(e)
 
 
+class TableGrid:
+    '''Rows and cells of a new ``python-docx`` table, collected once.
+
+    ``Table.cell()`` and ``Table.rows[i]`` build the list of all cells / rows on each call, which
+    makes filling a table quadratic in its cell count. The grid is built once and kept up to date
+    when cells are merged, so ``cell(i, j)`` returns what ``Table.cell(i, j)`` would.
+    '''
+    def __init__(self, table):
+        self.table = table
+        self.rows = list(table.rows)
+        self.num_cols = len(table.columns)
+        cells = table._cells
+        n = self.num_cols
+        self._cells = [cells[i:i+n] for i in range(0, len(cells), n)]
+
+
+    def cell(self, i:int, j:int):
+        return self._cells[i][j]
+
+
+    def merge(self, i:int, j:int, n_row:int, n_col:int):
+        '''Merge ``n_row`` x ``n_col`` cells starting from cell ``(i, j)``.'''
+        merged = self._cells[i][j].merge(self._cells[i+n_row-1][j+n_col-1])
+        for m in range(i, i+n_row):
+            for n in range(j, j+n_col): self._cells[m][n] = merged
+        return merged
+
+
 def set_cell_margins(cell:_Cell, **kwargs):
     '''Set cell margins. Provided values are in twentieths of a point (1/1440 of an inch).
     
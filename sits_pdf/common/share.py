@@ -58,6 +58,8 @@ class TextAlignment(Enum):
 
 class IText:
     '''Text related interface considering text direction.'''
+    __slots__ = ()
+
     @property
     def text_direction(self):
         '''Text direction is from left to right by default.'''
@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+
+'''Spatial indexes to find close bboxes without comparing every pair.
+
+* ``GridIndex`` buckets 2D bboxes into a uniform grid, so candidates for intersection (with
+  tolerance) are searched in the cells a bbox covers only.
+* ``interval_pairs`` sweeps sorted 1D intervals, e.g. bbox projections for row/column grouping.
+* ``connected_components`` groups indexes from candidate pairs with union-find, so the exact
+  (and possibly expensive) criterion is skipped for pairs already in the same group.
+
+Candidate pairs use closed intervals, i.e. touching bboxes are candidates, so any criterion
+implying that two bboxes intersect gets the same groups as checking every pair.
+'''
+
+import math
+from collections import defaultdict
+
+
+# a bbox covering more cells than this is compared with every bbox instead
+MAX_CELLS_PER_BBOX = 64
+
+
+class GridIndex:
+    '''Uniform grid of bboxes ``(x0, y0, x1, y1)``.'''
+
+    def __init__(self, bboxes:list, cell_size:float=None):
+        '''
+        Args:
+            bboxes (list): bbox-like items, indexed by position.
+            cell_size (float, optional): Grid cell size. Defaults to None, i.e. twice the median
+                of the bbox sizes.
+        '''
+        self.bboxes = [tuple(bbox) for bbox in bboxes]
+        if cell_size is None:
+            sizes = sorted(max(x1-x0, y1-y0) for x0, y0, x1, y1 in self.bboxes)
+            cell_size = 2.0 * sizes[len(sizes)//2] if sizes else 1.0
+        self.cell_size = max(cell_size, 1.0)
+        self._cells = defaultdict(list)
+        self._large = [] # indexes of bboxes spanning too many cells
+        for i, bbox in enumerate(self.bboxes):
+            cells = self._cell_range(bbox)
+            if cells is None:
+                self._large.append(i)
+            else:
+                for key in cells: self._cells[key].append(i)
+
+
+    def _cell_range(self, bbox, dx:float=0.0, dy:float=0.0, limit:bool=True):
+        x0, y0, x1, y1 = bbox
+        s = self.cell_size
+        i0, i1 = math.floor((x0-dx)/s), math.floor((x1+dx)/s)
+        j0, j1 = math.floor((y0-dy)/s), math.floor((y1+dy)/s)
+        if limit and (i1-i0+1)*(j1-j0+1) > MAX_CELLS_PER_BBOX: return None
+        return [(i, j) for i in range(i0, i1+1) for j in range(j0, j1+1)]
+
+
+    def query(self, bbox, dx:float=0.0, dy:float=0.0):
+        '''Indexes of bboxes touching ``bbox`` expanded by ``dx``/``dy``.'''
+        x0, y0, x1, y1 = bbox[0]-dx, bbox[1]-dy, bbox[2]+dx, bbox[3]+dy
+        cells = self._cell_range(bbox, dx, dy)
+        if cells is None:
+            candidates = range(len(self.bboxes))
+        else:
+            candidates = {i for key in cells for i in self._cells.get(key, ())}
+            candidates.update(self._large)
+        res = []
+        for i in candidates:
+            u0, v0, u1, v1 = self.bboxes[i]
+            if u0<=x1 and x0<=u1 and v0<=y1 and y0<=v1: res.append(i)
+        return res
+
+
+    def pairs(self, dx:float=0.0, dy:float=0.0):
+        '''Yield index pairs ``(i, j)``, ``i<j``, of bboxes touching each other when the first
+        one is expanded by ``dx``/``dy``.'''
+        for i, bbox in enumerate(self.bboxes):
+            for j in self.query(bbox, dx, dy):
+                if j > i: yield i, j
+
+
+def interval_pairs(intervals:list, tolerance:float=0.0):
+    '''Yield index pairs ``(i, j)``, ``i<j``, of intervals ``(start, end)`` overlapping or
+    separated by no more than ``tolerance``.
+
+    Performance::
+
+        O(n log n + k) time, where k is the count of pairs.
+    '''
+    order = sorted(range(len(intervals)), key=lambda i: intervals[i][0])
+    active = [] # indexes whose interval may still reach the next start
+    for i in order:
+        start, end = intervals[i]
+        active = [j for j in active if intervals[j][1] + tolerance >= start]
+        for j in active: yield (j, i) if j < i else (i, j)
+        active.append(i)
+
+
+def merge_intervals(intervals:list, tolerance:float=0.0):
+    '''Group indexes of intervals connected by overlapping, or by gaps no more than
+    ``tolerance``.
+
+    Performance::
+
+        O(n log n) time.
+    '''
+    order = sorted(range(len(intervals)), key=lambda i: intervals[i][0])
+    groups, end = [], None
+    for i in order:
+        start, stop = intervals[i]
+        if end is None or start > end + tolerance:
+            groups.append([i])
+            end = stop
+        else:
+            groups[-1].append(i)
+            end = max(end, stop)
+    return _sorted_groups(groups)
+
+
+def connected_components(num:int, pairs, connected=None):
+    '''Group ``num`` indexes into connected components.
+
+    Args:
+        num (int): Count of vertices.
+        pairs (iterable): Candidate edges ``(i, j)``.
+        connected (function, optional): ``connected(i, j)`` confirms a candidate edge. Defaults
+            to None, i.e. every candidate is an edge.
+
+    Returns:
+        list: Lists of indexes in ascending order, sorted by the first index.
+    '''
+    parent = list(range(num))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for i, j in pairs:
+        ri, rj = find(i), find(j)
+        if ri == rj: continue # already in same group
+        if connected is None or connected(i, j):
+            parent[max(ri, rj)] = min(ri, rj)
+
+    groups = defaultdict(list)
+    for i in range(num): groups[find(i)].append(i)
+    return _sorted_groups(groups.values())
+
+
+def group_intersected(bboxes:list, connected=None, dx:float=0.0, dy:float=0.0):
+    '''Group indexes of ``bboxes`` touching each other (with tolerance ``dx``/``dy``) and
+    fulfilling ``connected(i, j)`` if given.'''
+    index = GridIndex(bboxes)
+    return connected_components(len(bboxes), index.pairs(dx, dy), connected)
+
+
+def _sorted_groups(groups):
+    groups = [sorted(group) for group in groups]
+    groups.sort(key=lambda group: group[0])
+    return groups
@@ -17,11 +17,17 @@ but more generic properties are required further:
 
     * Then, we have to use the default properties, i.e. ascender and descender, extracted by
       ``PyMuPDF`` directly, but this value isn't so accurate.
+
+The same fonts are embedded in many documents, so the properties derived from a font buffer are
+kept in a bounded process-wide cache keyed by the hash of the buffer.
 '''
 
+import bisect
+import hashlib
 import os
 from io import BytesIO
-from collections import namedtuple
+from collections import (namedtuple, OrderedDict)
+from threading import Lock
 from fontTools.ttLib import TTFont
 from ..common.Collection import BaseCollection
 from ..common.constants import (CJK_CODEPAGE_BITS, CJK_UNICODE_RANGE_BITS, CJK_UNICODE_RANGES)
@@ -32,6 +38,12 @@ Font = namedtuple('Font', [ 'descriptor',     # font descriptor
                             'name',           # real font name
                             'line_height'])   # standard line height ratio
 
+# number of fonts kept in the process-wide cache
+FONT_CACHE_SIZE = 1024
+
+_font_cache = OrderedDict()
+_font_cache_lock = Lock()
+
 
 class Fonts(BaseCollection):
     '''Extracted fonts properties from PDF.'''
@@ -56,44 +68,69 @@ class Fonts(BaseCollection):
 
 
     @classmethod
-    def extract(cls, fitz_doc):
+    def extract(cls, fitz_doc, pages:list=None):
         '''Extract fonts from PDF and get properties.
         * Only embedded fonts (v.s. the base 14 fonts) can be extracted.
         * The extracted fonts may be invalid due to reason from PDF file itself.
+
+        Args:
+            fitz_doc (fitz.Document): ``PyMuPDF`` Document instance.
+            pages (list, optional): Indexes of the pages to collect fonts from. Defaults to
+                None, i.e. all pages.
         '''
         # get unique font references
         xrefs = set()
-        for page in fitz_doc:
-            for f in page.get_fonts(): xrefs.add(f[0])
+        for i in (range(len(fitz_doc)) if pages is None else pages):
+            for f in fitz_doc[i].get_fonts(): xrefs.add(f[0])
 
         # process xref one by one
         fonts = []
         for xref in xrefs:
             basename, ext, _, buffer = fitz_doc.extract_font(xref)
             if not basename: continue
+            fonts.append(cls._cached_font(decode(basename), ext, buffer))
 
-            basename = decode(basename)
-            name = cls._normalized_font_name(basename)
+        return cls(fonts)
 
-            try:
-                # supported fonts: open/true type only
-                # - n/a: base 14 fonts
-                # - cff: Adobe Compact File Format, i.e. Type 1 font
-                assert ext not in ('n/a', 'cff'), "base font or not supported font"
 
-                # try to get more font metrics with fonttool
-                tt = TTFont(BytesIO(buffer))
-                name = cls.get_font_family_name(tt)
-                line_height = cls.get_line_height_factor(tt)
-            except Exception:
-                line_height = None
+    @classmethod
+    def _cached_font(cls, basename:str, ext:str, buffer:bytes):
+        '''Font properties of a font buffer, parsed once per process.'''
+        key = (hashlib.sha1(buffer or b'').hexdigest(), basename, ext)
+        with _font_cache_lock:
+            font = _font_cache.get(key)
+            if font is not None:
+                _font_cache.move_to_end(key)
+                return font
+
+        font = cls._parse_font(basename, ext, buffer)
+        with _font_cache_lock:
+            _font_cache[key] = font
+            if len(_font_cache) > FONT_CACHE_SIZE: _font_cache.popitem(last=False)
+        return font
 
-            fonts.append(Font(
-                descriptor=cls._to_descriptor(name),
-                name=name,
-                line_height=line_height))
 
-        return cls(fonts)
+    @classmethod
+    def _parse_font(cls, basename:str, ext:str, buffer:bytes):
+        name = cls._normalized_font_name(basename)
+        try:
+            # supported fonts: open/true type only
+            # - n/a: base 14 fonts
+            # - cff: Adobe Compact File Format, i.e. Type 1 font
+            assert ext not in ('n/a', 'cff'), "base font or not supported font"
+
+            # try to get more font metrics with fonttool: tables are decompiled on first
+            # access, so only name, head, hhea, OS/2 (and cmap for some fonts) are read
+            tt = TTFont(BytesIO(buffer), lazy=True)
+            name = cls.get_font_family_name(tt)
+            line_height = cls.get_line_height_factor(tt)
+        except Exception:
+            line_height = None
+
+        return Font(
+            descriptor=cls._to_descriptor(name),
+            name=name,
+            line_height=line_height)
 
 
     @staticmethod
@@ -231,10 +268,13 @@ class Fonts(BaseCollection):
             return False
         if not cmap: return False
 
-        for unicode_range in CJK_UNICODE_RANGES:
-            for x in range(unicode_range[0], unicode_range[1]+1):
-                if int(x) in cmap:
-                    return True
+        # any code point within a range: search the sorted code points instead of testing
+        # every code point of the ranges
+        code_points = sorted(cmap)
+        for start, end in CJK_UNICODE_RANGES:
+            i = bisect.bisect_left(code_points, start)
+            if i < len(code_points) and code_points[i] <= end:
+                return True
 
         # default, return False if the above checks did not identify a CJK font
         return False
@@ -0,0 +1,179 @@
+"""
+    Ghostscript based PDF compression.
+
+    The interpreter binary is discovered once per process (explicit setting,
+    ``PATH``, then the default Windows install directory), every run has a
+    timeout, and batches are compressed by a bounded number of concurrent
+    Ghostscript processes so multi-file jobs scale with the available cores.
+    Job workers split that bound between them, see ``get_ghostscript_pool``.
+"""
+
+import glob
+import logging
+import os
+import shutil
+import subprocess
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from multiprocessing import cpu_count
+from threading import Lock
+from typing import Callable, Iterable, List, Optional, Union
+
+from django.conf import settings
+
+from .jobs import pool_share
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TIMEOUT = 120
+EXECUTABLES = ("gs", "gswin64c", "gswin32c")
+WINDOWS_PATTERNS = (
+    "C:/Program Files/gs/gs*/bin/gswin64c.exe",
+    "C:/Program Files (x86)/gs/gs*/bin/gswin32c.exe",
+)
+
+
+class GhostscriptError(RuntimeError):
+    """Raised when a Ghostscript run fails"""
+
+    pass
+
+
+class GhostscriptNotFound(GhostscriptError):
+    """Raised when no Ghostscript executable can be located"""
+
+    pass
+
+
+class GhostscriptTimeout(GhostscriptError):
+    """Raised when a Ghostscript run exceeds its time limit"""
+
+    pass
+
+
+_gs_path: Optional[str] = None
+
+
+def find_ghostscript() -> str:
+    """Path of the Ghostscript executable: ``GHOSTSCRIPT_PATH`` if set,
+    otherwise the first of ``gs``/``gswin64c``/``gswin32c`` on ``PATH``,
+    otherwise the newest version in the default Windows install location."""
+    global _gs_path
+    if _gs_path is None:
+        path = getattr(settings, "GHOSTSCRIPT_PATH", None)
+        if not path:
+            path = next(filter(None, map(shutil.which, EXECUTABLES)), None)
+        if not path:
+            candidates = sorted(
+                (p for pattern in WINDOWS_PATTERNS for p in glob.glob(pattern)),
+                reverse=True,
+            )
+            path = candidates[0] if candidates else None
+        if not path or not os.path.exists(path):
+            raise GhostscriptNotFound(
+                "Ghostscript not found, install it or set GHOSTSCRIPT_PATH."
+            )
+        _gs_path = path
+    return _gs_path
+
+
+def compress(pdf_bytes: bytes, quality: str = "ebook", timeout: float = DEFAULT_TIMEOUT) -> bytes:
+    """Rewrite a PDF with the ``pdfwrite`` device and ``/quality`` preset.
+
+    Raises ``GhostscriptTimeout`` when the run takes longer than ``timeout``
+    seconds (the process is killed), ``GhostscriptError`` on failure.
+    """
+    command = [
+        find_ghostscript(),
+        "-sDEVICE=pdfwrite",
+        "-dCompatibilityLevel=1.4",
+        f"-dPDFSETTINGS=/{quality}",
+        "-dSAFER",
+        "-dNOPAUSE",
+        "-dQUIET",
+        "-dBATCH",
+        "-sOutputFile=%stdout%",  # Output to stdout to capture in memory
+        "-",
+    ]
+    try:
+        process = subprocess.run(
+            command,
+            input=pdf_bytes,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            timeout=timeout,
+        )
+    except subprocess.TimeoutExpired:
+        raise GhostscriptTimeout(f"Ghostscript did not finish within {timeout}s")
+
+    if process.returncode != 0:
+        raise GhostscriptError(f"Ghostscript failed with error: {process.stderr.decode()}")
+    return process.stdout
+
+
+class GhostscriptPool:
+    """Run up to ``max_workers`` Ghostscript processes at a time.
+
+    Ghostscript does the work in child processes, so a thread per running
+    interpreter is enough to keep all of them busy.
+    """
+
+    def __init__(self, max_workers: int = 0, timeout: float = DEFAULT_TIMEOUT):
+        self.max_workers = max_workers or cpu_count()
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="ghostscript"
+        )
+
+    def submit(self, pdf_bytes: bytes, quality: str = "ebook", func: Callable = None):
+        """Schedule one file, return a ``Future`` of the compressed bytes.
+        ``func(pdf_bytes, quality, timeout)`` replaces ``compress`` if given."""
+        return self._executor.submit(func or compress, pdf_bytes, quality, self.timeout)
+
+    def compress_many(
+        self,
+        files: Iterable[bytes],
+        quality: str = "ebook",
+        func: Callable = None,
+        on_done: Callable[[int, Union[bytes, Exception]], None] = None,
+    ) -> List[Union[bytes, Exception]]:
+        """Compress all ``files`` concurrently. The result list is in input
+        order and holds the exception instead of the bytes for files that
+        failed, so one bad file does not cost the rest of the batch.
+        ``on_done(index, result)`` is called as each file finishes."""
+        futures = {
+            self.submit(pdf_bytes, quality, func): i for i, pdf_bytes in enumerate(files)
+        }
+        results = [None] * len(futures)
+        for future in as_completed(futures):
+            i = futures[future]
+            try:
+                results[i] = future.result()
+            except Exception as e:
+                logger.warning(f"Compressing file {i + 1} failed: {str(e)}")
+                results[i] = e
+            if on_done:
+                on_done(i, results[i])
+        return results
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+
+
+_pool: Optional[GhostscriptPool] = None
+_pool_lock = Lock()
+
+
+def get_ghostscript_pool() -> GhostscriptPool:
+    """Return the process-wide pool configured by ``GHOSTSCRIPT_MAX_WORKERS``
+    (0: one per core) and ``GHOSTSCRIPT_TIMEOUT``. In a job worker the pool
+    only gets the worker's share of ``GHOSTSCRIPT_MAX_WORKERS``, so all job
+    workers together stay within the bound."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            max_workers = getattr(settings, "GHOSTSCRIPT_MAX_WORKERS", 0) or cpu_count()
+            _pool = GhostscriptPool(
+                pool_share(max_workers),
+                getattr(settings, "GHOSTSCRIPT_TIMEOUT", DEFAULT_TIMEOUT),
+            )
+        return _pool
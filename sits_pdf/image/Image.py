@@ -35,6 +35,7 @@ class Image(Element):
         # source image bytes
         # - image bytes passed from PyMuPDF -> use it directly
         # - base64 encoded string restored from json file -> encode to bytes and decode with base64 -> image bytes 
+        # - bytes restored from packed layouts, see ``LayoutPack``
         image = raw.get('image', b'')
         self.image = image if isinstance(image, bytes) else base64.b64decode(image.encode())
         
@@ -61,16 +62,16 @@ class Image(Element):
 
 
     def store(self):
-        '''Store image with base64 encode.
+        '''Store image with raw bytes.
 
-        * Encode image bytes with base64 -> base64 bytes
-        * Decode base64 bytes -> str -> so can be serialized in json format
+        Image bytes are kept as they are, so that packed layouts store each image once without
+        encoding; JSON serialization encodes them with base64, see ``LayoutPack.json_default``.
         '''
         res = super().store()
         res.update({
             'width': self.width,
             'height': self.height,
-            'image': base64.b64encode(self.image).decode() # serialize image with base64
+            'image': self.image
         })
 
         return res
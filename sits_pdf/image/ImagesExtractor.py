@@ -6,24 +6,42 @@ Both raster images and vector graphics are considered:
   and ``Page.get_images()``. Note the process for png images with alpha channel.
 * Vector graphics are actually composed of a group of paths, represented by operators like
   ``re``, ``m``, ``l`` and ``c``. They're detected by finding the contours with ``opencv``.
+
+Both vector graphics and some images are clipped from the page rendered without text. Text is
+hidden in a copy of the page, so the source document is left untouched. The copy is rendered at
+most once per resolution, and only when first needed: at zoom 1.0 to detect vector graphics, at
+the clip resolution when something is actually clipped; every clip is a crop of a raster.
+A page too large for a raster of ``MAX_RASTER_PIXELS`` at the clip resolution, e.g. a poster
+or a drawing sheet, is rendered per clip instead.
 '''
 
 import logging
+import math
 import fitz
-from ..common.Collection import Collection
 from ..common.share import BlockType
 from ..common.algorithm import (recursive_xy_cut, inner_contours, xy_project_profile)
+from ..common.spatial import group_intersected
+
+
+# largest page raster kept for cropping clips, i.e. 60MB in BGR
+MAX_RASTER_PIXELS = 20_000_000
 
 
 class ImagesExtractor:
-    def __init__(self, page:fitz.Page) -> None:
+    def __init__(self, page:fitz.Page, cache:dict=None) -> None:
         '''Extract images from PDF page.
         
         Args:
             page (fitz.Page): pdf page to extract images.
+            cache (dict, optional): Recovered images shared by pages of the same document, see
+                ``_recover_image``. Defaults to None, i.e. used by this page only.
         '''
         self._page = page
-    
+        self._cache = {} if cache is None else cache
+        self._text_free_doc = None # type: fitz.Document
+        self._rasters = {}         # zoom -> page without text, BGR array
+        self._binary = None        # binary image of page without text at zoom 1.0
+
 
     def clip_page_to_pixmap(self, bbox:fitz.Rect=None, zoom:float=3.0):
         '''Clip page pixmap (without text) according to ``bbox``.
@@ -37,27 +55,13 @@ class ImagesExtractor:
         Returns:
             fitz.Pixmap: The extracted pixmap.
         '''        
-        # hide text 
-        self._hide_page_text(self._page)
-        
-        if bbox is None:
-            clip_bbox = self._page.rect
-        
-        # transform to the final bbox when page is rotated
-        elif self._page.rotation:
-            clip_bbox = bbox * self._page.rotation_matrix
-            
-        else:
-            clip_bbox = bbox
-        
-        clip_bbox = clip_bbox & self._page.rect
-        
         # improve resolution
         # - https://pymupdf.readthedocs.io/en/latest/faq.html#how-to-increase-image-resolution
         # - https://github.com/pymupdf/PyMuPDF/issues/181
         matrix = fitz.Matrix(zoom, zoom)
 
-        return self._page.get_pixmap(clip=clip_bbox, matrix=matrix) # type: fitz.Pixmap
+        page = self._text_free_page()
+        return page.get_pixmap(clip=self._final_clip_bbox(bbox), matrix=matrix) # type: fitz.Pixmap
 
 
     def clip_page_to_dict(self, bbox:fitz.Rect=None, clip_image_res_ratio:float=3.0):
@@ -70,8 +74,11 @@ class ImagesExtractor:
         Returns:
             list: A list of image raw dict.
         '''
-        pix = self.clip_page_to_pixmap(bbox=bbox, zoom=clip_image_res_ratio)
-        return self._to_raw_dict(pix, bbox)
+        import cv2 as cv
+        img = self._clip_raster(bbox, clip_image_res_ratio)
+        _, im_png = cv.imencode('.png', img)
+        h, w = img.shape[:2]
+        return self._to_raw_dict(im_png.tobytes(), w, h, bbox)
 
 
     def extract_images(self, clip_image_res_ratio:float=3.0):
@@ -96,7 +103,7 @@ class ImagesExtractor:
         # https://github.com/dothinking/pdf2docx/issues/123
 
         # step 1: collect images: [(bbox, item), ..., ]
-        ic = Collection()
+        ic = []
         for item in self._page.get_images(full=True):
             item = list(item)
             item[-1] = 0            
@@ -115,8 +122,8 @@ class ImagesExtractor:
                 ic.append((bbox, item))
 
         # step 2: group by intersection
-        fun = lambda a, b: a[0].intersects(b[0])
-        groups = ic.group(fun)
+        fun = lambda i, j: ic[i][0].intersects(ic[j][0])
+        groups = [[ic[i] for i in group] for group in group_intersected([bbox for bbox, _ in ic], fun)]
 
         # step 3: check each group
         images = []
@@ -152,13 +159,8 @@ class ImagesExtractor:
                 
                 # normal images
                 else:
-                    # recover image, e.g., handle image with mask, or CMYK color space
-                    pix = self._recover_pixmap(doc, item)
-
-                    # rotate image with opencv if page is rotated
-                    raw_dict = self._to_raw_dict(pix, bbox)
-                    if rotation: 
-                        raw_dict['image'] = self._rotate_image(pix, -rotation)
+                    width, height, image = self._recover_image(doc, item, rotation)
+                    raw_dict = self._to_raw_dict(image, width, height, bbox)
 
             images.append(raw_dict)
 
@@ -179,13 +181,8 @@ class ImagesExtractor:
         '''
         import cv2 as cv
 
-        # clip page and convert to opencv image
-        pixmap = self.clip_page_to_pixmap(zoom=1.0)
-        src = self._pixmap_to_cv_image(pixmap)
-
-        # gray and binary
-        gray = cv.cvtColor(src, cv.COLOR_BGR2GRAY)
-        _, binary = cv.threshold(gray, 253, 255, cv.THRESH_BINARY_INV)
+        # binary image of page without text
+        binary = self._binary_image()
         
         # external bbox: split images with recursive xy cut
         external_bboxes = recursive_xy_cut(binary, min_dx=min_svg_gap_dx, min_dy=min_svg_gap_dy)        
@@ -200,6 +197,8 @@ class ImagesExtractor:
         # plot detected images for debug
         debug = False
         if debug:
+            src = self._clip_raster(zoom=1.0).copy()
+
             # plot projection profile for each sub-image
             for i, (x0, y0, x1, y1) in enumerate(external_bboxes):
                 arr = xy_project_profile(src[y0:y1, x0:x1, :], binary[y0:y1, x0:x1])
@@ -221,25 +220,110 @@ class ImagesExtractor:
 
 
     @staticmethod
-    def _to_raw_dict(image:fitz.Pixmap, bbox:fitz.Rect):
-        '''Store Pixmap ``image`` to raw dict.
+    def _to_raw_dict(image:bytes, width:int, height:int, bbox:fitz.Rect):
+        '''Store encoded image to raw dict.
 
         Args:
-            image (fitz.Pixmap): Pixmap to store.
-            bbox (fitz.Rect): Boundary box the pixmap.
+            image (bytes): Encoded image, e.g. png.
+            width (int): Image width in pixel.
+            height (int): Image height in pixel.
+            bbox (fitz.Rect): Boundary box the image.
 
         Returns:
-            dict: Raw dict of the pixmap.
+            dict: Raw dict of the image.
         '''
         return {
             'type': BlockType.IMAGE.value,
             'bbox': tuple(bbox),
-            'width': image.width,
-            'height': image.height,
-            'image': image.tobytes()
+            'width': width,
+            'height': height,
+            'image': image
         }
 
 
+    def _final_clip_bbox(self, bbox:fitz.Rect=None):
+        '''Clip area in final page CS of ``bbox`` in un-rotated page CS.'''
+        if bbox is None:
+            clip_bbox = self._page.rect
+        
+        # transform to the final bbox when page is rotated
+        elif self._page.rotation:
+            clip_bbox = bbox * self._page.rotation_matrix
+            
+        else:
+            clip_bbox = bbox
+        
+        return clip_bbox & self._page.rect
+
+
+    def _text_free_page(self):
+        '''Copy of the page with text hidden, created once. Hiding text rewrites the content
+        streams, including form xobjects shared with other pages, so it is done in a standalone
+        document rather than in the source one.'''
+        if self._text_free_doc is None:
+            doc = fitz.Document()
+            doc.insert_pdf(self._page.parent, from_page=self._page.number, to_page=self._page.number)
+            self._hide_page_text(doc[0])
+            self._text_free_doc = doc
+        return self._text_free_doc[0]
+
+
+    def _clip_raster(self, bbox:fitz.Rect=None, zoom:float=1.0):
+        '''Clip page (without text) rendered once, see ``clip_page_to_pixmap``.
+
+        Args:
+            bbox (fitz.Rect, optional): Target area to clip in un-rotated page CS. Defaults to None,
+                i.e. entire page.
+            zoom (float, optional): Resolution ratio. Defaults to 1.0.
+
+        Returns:
+            numpy.ndarray: BGR image; a view of the page raster if rendered at ``zoom`` exactly.
+        '''
+        import cv2 as cv
+
+        # reuse a raster of this or a higher resolution, otherwise render one at ``zoom`` exactly,
+        # unless it exceeds the pixel budget: render the clip area alone then
+        k = min((z for z in self._rasters if z>=zoom), default=None)
+        if k is None:
+            page = self._text_free_page()
+            if page.rect.width * page.rect.height * zoom**2 > MAX_RASTER_PIXELS:
+                clip = self._final_clip_bbox(bbox)
+                return self._to_bgr(page.get_pixmap(clip=clip, matrix=fitz.Matrix(zoom, zoom)))
+            self._rasters[zoom] = self._to_bgr(page.get_pixmap(matrix=fitz.Matrix(zoom, zoom)))
+            k = zoom
+        raster = self._rasters[k]
+
+        # crop by pixels covering the clip area, then scale to the requested resolution
+        x0, y0, x1, y1 = self._final_clip_bbox(bbox)
+        H, W = raster.shape[:2]
+        c0, c1 = max(math.floor(x0*k), 0), min(math.ceil(x1*k), W)
+        r0, r1 = max(math.floor(y0*k), 0), min(math.ceil(y1*k), H)
+        img = raster[r0:max(r1, r0+1), c0:max(c1, c0+1)]
+        if k==zoom: return img
+
+        w = max(math.ceil(x1*zoom)-math.floor(x0*zoom), 1)
+        h = max(math.ceil(y1*zoom)-math.floor(y0*zoom), 1)
+        return cv.resize(img, (w, h), interpolation=cv.INTER_AREA)
+
+
+    @staticmethod
+    def _to_bgr(pix:fitz.Pixmap):
+        '''BGR array of an RGB pixmap, without encoding it.'''
+        import cv2 as cv
+        import numpy as np
+        img = np.frombuffer(pix.samples, np.uint8).reshape(pix.height, pix.width, pix.n)
+        return cv.cvtColor(img, cv.COLOR_RGB2BGR)
+
+
+    def _binary_image(self):
+        '''Binary image of page without text at zoom 1.0 for contour detection, created once.'''
+        import cv2 as cv
+        if self._binary is None:
+            gray = cv.cvtColor(self._clip_raster(zoom=1.0), cv.COLOR_BGR2GRAY)
+            _, self._binary = cv.threshold(gray, 253, 255, cv.THRESH_BINARY_INV)
+        return self._binary
+
+
     @staticmethod
     def _rotate_image(pixmap:fitz.Pixmap, rotation:int):
         '''Rotate image represented by image bytes.
@@ -307,6 +391,31 @@ class ImagesExtractor:
                                              .replace(b'Td', b'Td 3 Tr')
             doc.update_stream(xref, stream)
    
+    def _recover_image(self, doc:fitz.Document, item:list, rotation:int):
+        '''Recover and encode image ``item``. Images shared by pages, e.g. logo or background, are
+        processed once per document: the result is cached with key ``(xref, smask, rotation)``, and
+        all occurrences refer to the same bytes.
+
+        Args:
+            doc (fitz.Document): pdf document.
+            item (list): image instance of ``page.get_images()``.
+            rotation (int): Page rotation.
+
+        Returns:
+            tuple: ``(width, height, image bytes)``.
+        '''
+        key = (item[0], item[1], rotation)
+        image = self._cache.get(key)
+        if image is None:
+            # recover image, e.g., handle image with mask, or CMYK color space
+            pix = self._recover_pixmap(doc, item)
+
+            # rotate image with opencv if page is rotated
+            data = self._rotate_image(pix, -rotation) if rotation else pix.tobytes()
+            image = self._cache[key] = (pix.width, pix.height, data)
+        return image
+
+
     @staticmethod
     def _recover_pixmap(doc:fitz.Document, item:list):
         """Restore pixmap with soft mask considered.
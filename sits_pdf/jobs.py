@@ -0,0 +1,437 @@
+"""
+    Local background job engine for heavy conversions.
+
+    Jobs are persisted in a small SQLite database so that queued work survives
+    a restart, and are executed by a pool of worker processes. Inputs and
+    results are passed around as blob store digests, never as raw bytes.
+
+    Several web processes may share the database. A worker claims a job by
+    switching it from queued to running in one conditional UPDATE, and renews
+    a lease (the ``heartbeat`` timestamp) while it runs, so only jobs whose
+    owner stopped renewing for ``JOBS_LEASE_SECONDS`` are run again.
+"""
+
+import json
+import logging
+import multiprocessing
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import cpu_count
+from threading import Lock
+from typing import Optional
+
+from django.conf import settings
+
+from .blob_store import get_blob_store
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+DEFAULT_LEASE = 60
+DEFAULT_MAX_AGE = 7 * 24 * 3600
+
+# params naming their inputs by blob digest, i.e. fixing the job's result
+_CONTENT_PARAMS = ("pdf_hash", "pdf_hashes")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    params TEXT NOT NULL,
+    status TEXT NOT NULL,
+    stage TEXT NOT NULL DEFAULT '',
+    step INTEGER NOT NULL DEFAULT 0,
+    total INTEGER NOT NULL DEFAULT 0,
+    result_hash TEXT,
+    result_name TEXT,
+    result_type TEXT,
+    meta TEXT,
+    error TEXT,
+    owner TEXT,
+    heartbeat REAL,
+    created REAL NOT NULL,
+    updated REAL NOT NULL
+)
+"""
+
+# columns added after the first release, for tables created before them
+_ADDED_COLUMNS = {"owner": "TEXT", "heartbeat": "REAL"}
+
+
+class JobNotFound(KeyError):
+    """Raised when no job exists with the requested id"""
+
+    pass
+
+
+class JobQueue:
+    """SQLite backed persistent job table.
+
+    Every call opens its own short-lived connection, so an instance can be
+    shared by the web process and the pool workers.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = os.fspath(db_path)
+        os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(_SCHEMA)
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+            for name, kind in _ADDED_COLUMNS.items():
+                if name not in columns:
+                    conn.execute(f"ALTER TABLE jobs ADD COLUMN {name} {kind}")
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def create(self, kind: str, params: dict) -> str:
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, kind, params, status, created, updated) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, kind, json.dumps(params, sort_keys=True), QUEUED, now, now),
+            )
+        return job_id
+
+    def find_active(self, kind: str, params: dict, done: bool = True) -> Optional[str]:
+        """Id of a queued or running job with identical input, or of a
+        finished one if ``done``."""
+        statuses = (QUEUED, RUNNING, DONE) if done else (QUEUED, RUNNING)
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT id FROM jobs WHERE kind=? AND params=? "
+                f"AND status IN ({', '.join('?' * len(statuses))}) "
+                "ORDER BY created DESC LIMIT 1",
+                (kind, json.dumps(params, sort_keys=True), *statuses),
+            ).fetchone()
+        return row["id"] if row else None
+
+    def get(self, job_id: str) -> dict:
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id=?", (job_id,)).fetchone()
+        if row is None:
+            raise JobNotFound(job_id)
+        job = dict(row)
+        job["params"] = json.loads(job["params"])
+        job["meta"] = json.loads(job["meta"]) if job["meta"] else {}
+        return job
+
+    def update(self, job_id: str, **fields):
+        if "meta" in fields:
+            fields["meta"] = json.dumps(fields["meta"])
+        fields["updated"] = time.time()
+        columns = ", ".join(f"{name}=?" for name in fields)
+        with self._connect() as conn:
+            conn.execute(
+                f"UPDATE jobs SET {columns} WHERE id=?", (*fields.values(), job_id)
+            )
+
+    def claim(self, job_id: str, owner: str) -> bool:
+        """Mark a queued job as running by ``owner``. Only one caller wins."""
+        now = time.time()
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status=?, owner=?, heartbeat=?, stage=?, updated=? "
+                "WHERE id=? AND status=?",
+                (RUNNING, owner, now, "Starting...", now, job_id, QUEUED),
+            )
+        return cursor.rowcount == 1
+
+    def renew(self, job_id: str, owner: str):
+        """Extend the lease of a job ``owner`` is running."""
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET heartbeat=? WHERE id=? AND owner=? AND status=?",
+                (time.time(), job_id, owner, RUNNING),
+            )
+
+    def requeue_expired(self, lease: float) -> list:
+        """Put running jobs whose lease is older than ``lease`` seconds back
+        in the queue, and return their ids."""
+        deadline = time.time() - lease
+        expired = "status=? AND (heartbeat IS NULL OR heartbeat<?)"
+        requeued = []
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT id FROM jobs WHERE {expired}", (RUNNING, deadline)
+            ).fetchall()
+            for row in rows:
+                # the owner may renew in between, so check the lease again
+                cursor = conn.execute(
+                    f"UPDATE jobs SET status=?, owner=NULL WHERE id=? AND {expired}",
+                    (QUEUED, row["id"], RUNNING, deadline),
+                )
+                if cursor.rowcount == 1:
+                    requeued.append(row["id"])
+        return requeued
+
+    def queued(self) -> list:
+        """Ids of jobs waiting for a worker, oldest first."""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT id FROM jobs WHERE status=? ORDER BY created", (QUEUED,)
+            ).fetchall()
+        return [row["id"] for row in rows]
+
+    def purge(self, max_age: float) -> int:
+        """Drop finished jobs older than ``max_age`` seconds."""
+        deadline = time.time() - max_age
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "DELETE FROM jobs WHERE status IN (?, ?) AND updated<?",
+                (DONE, FAILED, deadline),
+            )
+        return cursor.rowcount
+
+
+class JobEngine:
+    """Dispatch persisted jobs to a process pool.
+
+    A worker dying (e.g. killed for running out of memory) breaks the whole
+    pool: it is then replaced by a new one, and jobs that were only waiting
+    in it are dispatched again once.
+    """
+
+    def __init__(
+        self,
+        queue: JobQueue,
+        max_workers: int = 0,
+        lease: float = DEFAULT_LEASE,
+        max_age: float = DEFAULT_MAX_AGE,
+    ):
+        self.queue = queue
+        self.max_workers = max_workers or cpu_count()
+        self.lease = lease
+        self.max_age = max_age
+        self._executor = None
+        self._lock = Lock()
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=pool_context(),
+                    initializer=init_worker,
+                    initargs=(self.max_workers,),
+                )
+            return self._executor
+
+    def submit(self, kind: str, params: dict) -> str:
+        """Queue a job and return its id at once. An identical job that is
+        still queued or running is reused instead, and so is a finished one
+        if its inputs are blobs: other inputs, e.g. a web page, may change."""
+        done = any(name in params for name in _CONTENT_PARAMS)
+        job_id = self.queue.find_active(kind, params, done)
+        if job_id:
+            job = self.queue.get(job_id)
+            if job["status"] != DONE or get_blob_store().exists(job["result_hash"]):
+                return job_id
+        job_id = self.queue.create(kind, params)
+        self._dispatch(job_id)
+        return job_id
+
+    def recover(self):
+        """Dispatch queued jobs, including running ones whose owner died,
+        i.e. stopped renewing its lease. A job already claimed elsewhere is
+        skipped by the worker, so dispatching it twice is harmless. Finished
+        jobs older than ``max_age`` are dropped."""
+        purged = self.queue.purge(self.max_age)
+        if purged:
+            logger.info(f"Purged {purged} finished jobs")
+        requeued = self.queue.requeue_expired(self.lease)
+        if requeued:
+            logger.warning(f"Re-queued {len(requeued)} jobs with an expired lease")
+        for job_id in self.queue.queued():
+            self._dispatch(job_id)
+
+    def wait(self, job_id: str, timeout: float = None, interval: float = 0.2) -> dict:
+        """Block until the job is finished, mainly for scripts and tests."""
+        deadline = None if timeout is None else time.time() + timeout
+        while True:
+            job = self.queue.get(job_id)
+            if job["status"] in (DONE, FAILED):
+                return job
+            if deadline is not None and time.time() > deadline:
+                return job
+            time.sleep(interval)
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+
+    def _dispatch(self, job_id: str, retries: int = 1):
+        executor = self.executor
+        try:
+            future = executor.submit(run_job, self.queue.db_path, job_id, self.lease)
+        except RuntimeError as e:  # BrokenProcessPool, or shut down meanwhile
+            self._retry(job_id, executor, retries, e)
+            return
+        future.add_done_callback(lambda f: self._on_done(job_id, f, executor, retries))
+
+    def _on_done(self, job_id: str, future, executor: ProcessPoolExecutor, retries: int):
+        # run_job records its own failures, so only a crashed worker ends up here
+        if future.cancelled():
+            return
+        exc = future.exception()
+        if exc is None:
+            return
+        if isinstance(exc, BrokenProcessPool):
+            if self.queue.get(job_id)["status"] == QUEUED:
+                # never started, it was waiting in the pool when a worker died
+                self._retry(job_id, executor, retries, exc)
+                return
+            self._reset(executor)
+        logger.error(f"Worker crashed while running job {job_id}: {exc}")
+        self.queue.update(job_id, status=FAILED, error=str(exc))
+
+    def _retry(self, job_id: str, executor: ProcessPoolExecutor, retries: int, exc: Exception):
+        """Dispatch a job again on a new pool, or fail it if out of retries."""
+        self._reset(executor)
+        if retries > 0:
+            logger.warning(f"Process pool broken ({exc}), dispatching job {job_id} again")
+            self._dispatch(job_id, retries - 1)
+        else:
+            logger.error(f"Could not run job {job_id}: {exc}")
+            self.queue.update(job_id, status=FAILED, error=str(exc))
+
+    def _reset(self, executor: ProcessPoolExecutor):
+        """Drop a broken pool, unless a new one replaced it already, so that
+        the next dispatch starts a new one."""
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+# processes of the pool this process works in, 1 outside of process pools
+_pool_processes = 1
+
+
+def pool_context():
+    """Start method of every process pool of the app. Pools are created lazily
+    by the multi-threaded server, whose browser and Ghostscript threads or
+    request threads may hold locks at that moment: a forked worker would
+    inherit them held forever. Workers are started by a fork server instead,
+    or spawned where there is none (Windows)."""
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("forkserver")
+    return multiprocessing.get_context("spawn")
+
+
+def init_worker(num_processes: int = 1):
+    """Configure Django in a new worker process. Used as the
+    ``initializer`` of every process pool of the app; ``num_processes`` is the
+    size of the pool, see ``pool_share``."""
+    global _pool_processes
+    _pool_processes = num_processes
+
+    import django
+    from django.apps import apps
+
+    if not apps.ready:
+        django.setup()
+
+
+def pool_share(limit: int) -> int:
+    """Part of a per-host ``limit`` (e.g. concurrent Ghostscript processes)
+    this process may use: all of it outside of process pools, an equal share
+    of it in each worker of a pool, at least 1."""
+    return max(1, limit // _pool_processes)
+
+
+def run_job(db_path: str, job_id: str, lease: float = DEFAULT_LEASE):
+    """Execute one job inside a pool worker and record the outcome. Nothing
+    is done if another worker claimed the job first."""
+    from .tasks import TASKS
+
+    queue = JobQueue(db_path)
+    owner = f"{socket.gethostname()}:{os.getpid()}"
+    if not queue.claim(job_id, owner):
+        return
+    job = queue.get(job_id)
+
+    def progress(step: int, total: int, stage: str):
+        queue.update(job_id, step=step, total=total, stage=stage)
+
+    stop = threading.Event()
+
+    def renew_lease():
+        while not stop.wait(lease / 4):
+            queue.renew(job_id, owner)
+
+    threading.Thread(target=renew_lease, name=f"lease-{job_id}", daemon=True).start()
+    try:
+        task = TASKS[job["kind"]]
+        data, file_name, file_type, meta = task(job["params"], progress)
+        store = get_blob_store()
+        result_hash = store.put(data) if isinstance(data, bytes) else store.put_chunks(data)
+        queue.update(
+            job_id,
+            status=DONE,
+            stage="Finished",
+            result_hash=result_hash,
+            result_name=file_name,
+            result_type=file_type,
+            meta=meta or {},
+        )
+    except Exception as e:
+        logger.error(f"Job {job_id} ({job['kind']}) failed: {str(e)}", exc_info=True)
+        queue.update(job_id, status=FAILED, error=str(e))
+    finally:
+        stop.set()
+
+
+def job_progress(job: dict) -> float:
+    """Completion ratio in [0, 1] of a job record."""
+    if job["status"] == DONE:
+        return 1.0
+    if not job["total"]:
+        return 0.0
+    return min(job["step"] / job["total"], 1.0)
+
+
+_engine: Optional[JobEngine] = None
+_engine_lock = Lock()
+
+
+def get_job_queue() -> JobQueue:
+    """Return the job table at ``JOBS_DB_PATH``, without starting an engine."""
+    return JobQueue(
+        getattr(settings, "JOBS_DB_PATH", os.path.join(settings.BASE_DIR, "jobs.sqlite3"))
+    )
+
+
+def get_job_engine() -> JobEngine:
+    """Return the process-wide job engine configured by ``JOBS_DB_PATH``,
+    ``JOBS_MAX_WORKERS``, ``JOBS_LEASE_SECONDS`` and ``JOBS_MAX_AGE``. Queued
+    jobs and jobs of dead workers are resumed on first use."""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = JobEngine(
+                get_job_queue(),
+                getattr(settings, "JOBS_MAX_WORKERS", 0),
+                getattr(settings, "JOBS_LEASE_SECONDS", DEFAULT_LEASE),
+                getattr(settings, "JOBS_MAX_AGE", DEFAULT_MAX_AGE),
+            )
+            _engine.recover()
+        return _engine
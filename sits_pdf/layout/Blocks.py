@@ -10,7 +10,7 @@ from ..common import constants
 from ..common.Collection import ElementCollection
 from ..common.share import (BlockType, lower_round, rgb_value)
 from ..common.Block import Block
-from ..common.docx import (reset_paragraph_format, delete_paragraph)
+from ..common.docx import (reset_paragraph_format, delete_paragraph, last_paragraph)
 from ..text.TextBlock import TextBlock
 from ..text.TextSpan import TextSpan
 from ..text.Line import Line
@@ -337,7 +337,7 @@ class Blocks(ElementCollection):
                 # so, delete it right here.
                 # https://github.com/dothinking/pdf2docx/issues/76 
                 if cell_layout:
-                    delete_paragraph(doc.paragraphs[-1])
+                    delete_paragraph(last_paragraph(doc))
        
         # NOTE: If a table is at the end of a page, a new paragraph will be automatically 
         # added by the rending engine, e.g. MS Word, which resulting in an unexpected
@@ -387,7 +387,7 @@ class Blocks(ElementCollection):
         '''
         # group lines by overlap
         fun = lambda a, b: a.get_main_bbox(b, threshold=line_overlap_threshold)
-        groups = self.group(fun)
+        groups = self.group_by_intersection(fun)
         
         # delete overlapped lines
         for group in filter(lambda group: len(group)>1, groups):
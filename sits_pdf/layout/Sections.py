@@ -6,7 +6,7 @@
 from docx.enum.section import WD_SECTION
 from docx.shared import Pt
 from ..common.Collection import BaseCollection
-from ..common.docx import reset_paragraph_format
+from ..common.docx import (reset_paragraph_format, last_paragraph, next_paragraph)
 from .Section import Section
 from ..common import constants
 
@@ -32,8 +32,8 @@ class Sections(BaseCollection):
         '''Create sections in docx.'''        
         if not self: return
 
-        # mark paragraph index before creating current page
-        n = len(doc.paragraphs)
+        # mark last paragraph before creating current page
+        mark = last_paragraph(doc)
 
         def create_dummy_paragraph_for_section(section):
             p = doc.add_paragraph()
@@ -66,9 +66,10 @@ class Sections(BaseCollection):
             # NOTE: the after space doesn't work if last paragraph is 
             # image only (without any text). In this case, set after
             # space for the section break.
-            p = doc.paragraphs[-2] # -1 is the section break
+            p_break = last_paragraph(doc)
+            p = last_paragraph(doc, before=p_break) # p_break is the section break
             if not p.text.strip() and 'graphicData' in p._p.xml:
-                p = doc.paragraphs[-1]
+                p = p_break
             pf = p.paragraph_format
             pf.space_after = Pt(section.before_space)
             
@@ -79,8 +80,10 @@ class Sections(BaseCollection):
         # create floating images
         # ---------------------------------------------------
         # lazy: assign all float images to first paragraph of current page
+        if not self.parent.float_images: return
+        p = next_paragraph(doc, after=mark)
         for image in self.parent.float_images:
-            image.make_docx(doc.paragraphs[n])
+            image.make_docx(p)
 
 
     def plot(self, page):
@@ -0,0 +1,38 @@
+"""
+    Delete stored files and job records nobody asked for lately. Meant to be
+    run periodically, e.g. daily from cron::
+
+        python manage.py prune_storage
+"""
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from sits_pdf.blob_store import get_blob_store
+from sits_pdf.jobs import DEFAULT_MAX_AGE, get_job_queue
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete blobs older than BLOB_STORE_MAX_AGE and finished jobs older "
+        "than JOBS_MAX_AGE seconds."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--max-age",
+            type=float,
+            help="age in seconds, overriding both settings",
+        )
+
+    def handle(self, *args, max_age, **options):
+        def age(setting):
+            if max_age is not None:
+                return max_age
+            return getattr(settings, setting, DEFAULT_MAX_AGE)
+
+        purged = get_job_queue().purge(age("JOBS_MAX_AGE"))
+        self.stdout.write(f"Deleted {purged} finished jobs.")
+
+        removed = get_blob_store().prune(age("BLOB_STORE_MAX_AGE"))
+        self.stdout.write(f"Deleted {removed} blobs.")
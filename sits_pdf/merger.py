@@ -14,6 +14,7 @@ from typing import (
     cast,
 )
 
+from .metrics import stage
 from .support._encryption import Encryption
 from .support._page import PageObject
 from .support._reader import PdfReader
@@ -86,6 +87,7 @@ class PdfMerger:
         self.close()
 
     @deprecation_bookmark(bookmark="outline_item", import_bookmarks="import_outline")
+    @stage("merge_read")
     def merge(
         self,
         page_number: Optional[int] = None,
@@ -204,6 +206,7 @@ class PdfMerger:
     ) -> None:
         self.merge(len(self.pages), fileobj, outline_item, pages, import_outline)
 
+    @stage("merge_write")
     def write(self, fileobj: Union[Path, StrByteType]) -> None:
         if self.output is None:
             raise RuntimeError(ERR_CLOSED_WRITER)
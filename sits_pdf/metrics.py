@@ -0,0 +1,301 @@
+"""
+    Per-request performance instrumentation.
+
+    ``TimingMiddleware`` opens a record for every request; code running on the
+    request thread (views, ``Converter``, ``PdfMerger``, ``convert_from_bytes``)
+    adds named stages to it with ``stage`` and byte counts with ``add_bytes``.
+    Both are no-ops outside a request, e.g. in job worker processes. When the
+    response has been sent, the record is written as one JSON log line on the
+    ``sits_pdf.metrics`` logger and folded into in-process histograms, keyed by
+    operation (the URL name or route), served by the local ``metrics`` view.
+"""
+
+import bisect
+import json
+import logging
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+from django.conf import settings
+from django.contrib.sessions.middleware import SessionMiddleware
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+# upper bounds of the duration buckets, in milliseconds
+DURATION_BUCKETS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000)
+
+_current: ContextVar[Optional["RequestRecord"]] = ContextVar("request_record", default=None)
+
+
+class RequestRecord:
+    """Stage timings and byte counts collected while serving one request."""
+
+    def __init__(self, method: str, path: str):
+        self.method = method
+        self.path = path
+        self.operation = None
+        self.status = None
+        self.started = time.perf_counter()
+        self.duration = None
+        self.stages: Dict[str, dict] = {}
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.rss_peak_kb = None
+        self.rss_growth_kb = None
+        self.tracemalloc_peak = None
+
+    def add_stage(self, name: str, seconds: float):
+        entry = self.stages.setdefault(name, {"ms": 0.0, "count": 0})
+        entry["ms"] += seconds * 1000
+        entry["count"] += 1
+
+    def as_dict(self) -> dict:
+        return {
+            "operation": self.operation,
+            "method": self.method,
+            "path": self.path,
+            "status": self.status,
+            "ms": round(self.duration * 1000, 2),
+            "stages": {
+                name: {"ms": round(entry["ms"], 2), "count": entry["count"]}
+                for name, entry in self.stages.items()
+            },
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "rss_peak_kb": self.rss_peak_kb,
+            "rss_growth_kb": self.rss_growth_kb,
+            "tracemalloc_peak": self.tracemalloc_peak,
+        }
+
+
+@contextmanager
+def stage(name: str):
+    """Time the enclosed block as stage ``name`` of the current request.
+    Repeated stages are summed; stages may nest."""
+    record = _current.get()
+    if record is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record.add_stage(name, time.perf_counter() - start)
+
+
+def add_bytes(bytes_in: int = 0, bytes_out: int = 0):
+    """Count payload bytes the request read or produced outside of the HTTP
+    body, e.g. files downloaded from Dropbox or Google Drive."""
+    record = _current.get()
+    if record is not None:
+        record.bytes_in += bytes_in
+        record.bytes_out += bytes_out
+
+
+class Histogram:
+    """Counts of observed durations per fixed bucket, plus sum and max."""
+
+    def __init__(self, bounds=DURATION_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def as_dict(self) -> dict:
+        buckets = {str(bound): count for bound, count in zip(self.bounds, self.counts)}
+        buckets["+Inf"] = self.counts[-1]
+        return {
+            "count": sum(self.counts),
+            "sum": round(self.total, 2),
+            "max": round(self.max, 2),
+            "buckets": buckets,
+        }
+
+
+class OperationStats:
+    """Aggregated records of one operation."""
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.rss_peak_kb = 0
+        self.tracemalloc_peak = 0
+        self.duration = Histogram()
+        self.stages: Dict[str, Histogram] = {}
+
+    def add(self, record: RequestRecord):
+        self.requests += 1
+        if record.status is None or record.status >= 500:
+            self.errors += 1
+        self.bytes_in += record.bytes_in
+        self.bytes_out += record.bytes_out
+        self.rss_peak_kb = max(self.rss_peak_kb, record.rss_peak_kb or 0)
+        self.tracemalloc_peak = max(self.tracemalloc_peak, record.tracemalloc_peak or 0)
+        self.duration.observe(record.duration * 1000)
+        for name, entry in record.stages.items():
+            self.stages.setdefault(name, Histogram()).observe(entry["ms"])
+
+    def as_dict(self) -> dict:
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "rss_peak_kb": self.rss_peak_kb,
+            "tracemalloc_peak": self.tracemalloc_peak,
+            "duration_ms": self.duration.as_dict(),
+            "stages_ms": {name: h.as_dict() for name, h in self.stages.items()},
+        }
+
+
+_operations: Dict[str, OperationStats] = {}
+_operations_lock = threading.Lock()
+
+
+def snapshot() -> dict:
+    """Histograms of every operation seen by this process."""
+    with _operations_lock:
+        return {name: stats.as_dict() for name, stats in sorted(_operations.items())}
+
+
+def _max_rss_kb() -> Optional[int]:
+    # ru_maxrss is in kilobytes on Linux, in bytes on macOS
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def _operation(request) -> str:
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return "unresolved"
+    return match.url_name or match.route
+
+
+class TimingMiddleware:
+    """Record every request, see the module docstring.
+
+    Peak RSS is the process high-water mark, reported together with how much
+    this request raised it. With ``METRICS_TRACEMALLOC`` the tracemalloc peak
+    is reset at the start of each request; it is process-wide, so concurrent
+    requests count in each other's peak, and tracing slows allocations down.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.trace = getattr(settings, "METRICS_TRACEMALLOC", False)
+        if self.trace and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def __call__(self, request):
+        record = RequestRecord(request.method, request.path)
+        try:
+            record.bytes_in = int(request.META.get("CONTENT_LENGTH") or 0)
+        except ValueError:
+            pass
+        rss_before = _max_rss_kb()
+        if self.trace:
+            tracemalloc.reset_peak()
+
+        token = _current.set(record)
+        try:
+            if request.content_type == "multipart/form-data":
+                # parse the upload now so that it is timed on its own
+                with stage("decode_upload"):
+                    request.FILES
+            response = self.get_response(request)
+        except BaseException:
+            self._finish(request, record, rss_before)
+            raise
+        finally:
+            _current.reset(token)
+
+        record.status = response.status_code
+        if getattr(response, "file_to_stream", None) is not None:
+            # leave the file to the server's wsgi.file_wrapper (sendfile)
+            record.bytes_out += int(response.get("Content-Length") or 0)
+            self._finish_on_close(response, request, record, rss_before)
+        elif response.streaming and not getattr(response, "is_async", False):
+            response.streaming_content = self._stream(
+                response.streaming_content, request, record, rss_before
+            )
+        else:
+            if not response.streaming:
+                record.bytes_out += len(response.content)
+            self._finish(request, record, rss_before)
+        return response
+
+    def _stream(self, chunks, request, record, rss_before):
+        """Count the streamed bytes and finish the record once the body has
+        been sent. Stages of lazily generated content still count because
+        the record is current while each chunk is produced."""
+        chunks = iter(chunks)
+        try:
+            while True:
+                token = _current.set(record)
+                try:
+                    chunk = next(chunks, None)
+                finally:
+                    _current.reset(token)
+                if chunk is None:
+                    break
+                record.bytes_out += len(chunk)
+                yield chunk
+        finally:
+            self._finish(request, record, rss_before)
+
+    def _finish_on_close(self, response, request, record, rss_before):
+        """Finish the record when the server closes a file response, i.e.
+        once the file has been sent, without touching the file itself."""
+        close = response.close
+        finished = False
+
+        def close_and_finish():
+            nonlocal finished
+            try:
+                close()
+            finally:
+                if not finished:
+                    finished = True
+                    self._finish(request, record, rss_before)
+
+        response.close = close_and_finish
+
+    def _finish(self, request, record, rss_before):
+        record.duration = time.perf_counter() - record.started
+        record.operation = _operation(request)
+        rss_after = _max_rss_kb()
+        if rss_after is not None:
+            record.rss_peak_kb = rss_after
+            record.rss_growth_kb = rss_after - rss_before
+        if self.trace and tracemalloc.is_tracing():
+            record.tracemalloc_peak = tracemalloc.get_traced_memory()[1]
+
+        with _operations_lock:
+            _operations.setdefault(record.operation, OperationStats()).add(record)
+        logger.info(json.dumps(record.as_dict()))
+
+
+class TimedSessionMiddleware(SessionMiddleware):
+    """``SessionMiddleware`` timing the session save as the ``session_write``
+    stage. Must sit inside ``TimingMiddleware``."""
+
+    def process_response(self, request, response):
+        with stage("session_write"):
+            return super().process_response(request, response)
@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+
+'''Persistent cache of parsed page layouts.
+
+A page is fingerprinted by its content stream, the object graph of its resources (fonts, images,
+form xobjects), its geometry and links, plus the parsing settings which affect the layout. The
+stored layout (``Page.store()``) of a fingerprint is restored instead of parsing the page again,
+so repeated conversions of the same template skip extraction, clean up, section parsing and
+table detection for unchanged pages.
+
+Object numbers are replaced by their order of appearance when hashing the resources, so the
+same page produced in another file with different object numbering still hits the cache.
+
+Entries are packed layouts (see ``LayoutPack``) under ``root/ab/<key>.layout``. A hit refreshes
+the file modification time, and the least recently used entries are removed once the total size
+exceeds ``max_size``.
+'''
+
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+from collections import deque
+import fitz
+from .LayoutPack import LayoutPack, pack_layout
+
+
+# bump to invalidate entries stored by an older layout engine
+CACHE_VERSION = 2
+
+# file extension of entries, and of the JSON entries of version 1 to evict
+ENTRY_SUFFIX = '.layout'
+LEGACY_SUFFIX = '.json'
+
+# settings which don't change the parsed layout
+IGNORED_SETTINGS = ('debug', 'debug_doc', 'debug_filename', 'ignore_page_error',
+                    'multi_processing', 'cpu_count')
+
+_REFERENCE = re.compile(r'(\d+) \d+ R\b')
+
+
+def _settings_fingerprint(settings:dict):
+    relevant = {k: v for k, v in settings.items() if k not in IGNORED_SETTINGS}
+    return json.dumps(relevant, sort_keys=True, default=str)
+
+
+def _page_resources(doc:fitz.Document, xref:int):
+    '''Source of the resources dict of page ``xref``, inherited from the page tree if needed.'''
+    visited = set()
+    while xref and xref not in visited:
+        visited.add(xref)
+        kind, value = doc.xref_get_key(xref, 'Resources')
+        if kind != 'null': return value
+        kind, value = doc.xref_get_key(xref, 'Parent')
+        xref = int(value.split()[0]) if kind == 'xref' else 0
+    return ''
+
+
+def _hash_object_graph(doc:fitz.Document, source:str, sha):
+    '''Hash the objects reachable from PDF object ``source``, breadth first. References are
+    replaced by the visiting order of the referenced object.'''
+    order, pending = {}, deque()
+
+    def canonical(m):
+        xref = int(m.group(1))
+        if xref not in order:
+            order[xref] = len(order)
+            pending.append(xref)
+        return f'@{order[xref]}'
+
+    sha.update(_REFERENCE.sub(canonical, source).encode())
+    while pending:
+        xref = pending.popleft()
+        sha.update(_REFERENCE.sub(canonical, doc.xref_object(xref, compressed=True)).encode())
+        if doc.xref_is_stream(xref):
+            sha.update(doc.xref_stream_raw(xref) or b'')
+
+
+def page_fingerprint(page:fitz.Page, settings:dict):
+    '''Key identifying the parsed layout of ``page`` under ``settings``.
+
+    Args:
+        page (fitz.Page): Source page.
+        settings (dict): Parsing parameters.
+
+    Returns:
+        str: Hex digest.
+    '''
+    sha = hashlib.sha256()
+    sha.update(f'{CACHE_VERSION}|{_settings_fingerprint(settings)}'.encode())
+    sha.update(f'|{tuple(page.mediabox)}|{tuple(page.cropbox)}|{page.rotation}|'.encode())
+    sha.update(page.read_contents())
+    _hash_object_graph(page.parent, _page_resources(page.parent, page.xref), sha)
+    links = [{k: v for k, v in link.items() if k not in ('xref', 'id')} for link in page.get_links()]
+    sha.update(json.dumps(links, sort_keys=True, default=str).encode())
+    return sha.hexdigest()
+
+
+class LayoutCache:
+    '''Size bounded on-disk LRU cache of ``Page.store()`` results.'''
+
+    def __init__(self, root:str, max_size:int=512*1024*1024):
+        '''
+        Args:
+            root (str): Cache directory, created if missing.
+            max_size (int, optional): Total size of entries in bytes. Defaults to 512 MiB.
+        '''
+        self.root = os.fspath(root)
+        self.max_size = max_size
+        self._size = None # estimated total size, computed on first store
+        os.makedirs(self.root, exist_ok=True)
+
+
+    def __getstate__(self):
+        # the size estimate is per process
+        return {'root': self.root, 'max_size': self.max_size, '_size': None}
+
+
+    def path(self, key:str):
+        return os.path.join(self.root, key[:2], f'{key}{ENTRY_SUFFIX}')
+
+
+    def get(self, key:str):
+        '''Stored layout of ``key``, or None.'''
+        path = self.path(key)
+        try:
+            with open(path, 'rb') as f:
+                content = f.read()
+        except OSError:
+            return None
+        try:
+            data = LayoutPack(content).page(0)
+        except (ValueError, IndexError):
+            # corrupted or foreign entry: a miss, and stored again once parsed
+            logging.warning('Layout cache: dropping unreadable entry %s', key)
+            self._remove(path)
+            return None
+        try:
+            os.utime(path) # mark as recently used
+        except OSError:
+            pass
+        return data
+
+
+    def put(self, key:str, data:dict):
+        '''Store layout ``data`` under ``key``, then evict old entries if the cache is full.'''
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        content = pack_layout([data])
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.part')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(content)
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path): os.unlink(temp_path)
+            raise
+
+        if self._size is None: self._size = sum(size for _, size, _ in self._entries())
+        else: self._size += len(content)
+        if self._size > self.max_size: self.evict()
+
+
+    def evict(self):
+        '''Remove least recently used entries until the cache is at 90% of ``max_size``.'''
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        target = self.max_size * 0.9
+        removed = 0
+        for _, size, path in entries:
+            if total <= target: break
+            self._remove(path)
+            total -= size
+            removed += 1
+        self._size = total
+        if removed: logging.info('Layout cache: evicted %d entries', removed)
+
+
+    @staticmethod
+    def _remove(path:str):
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+
+
+    def _entries(self):
+        '''``(mtime, size, path)`` of every entry.'''
+        for dirpath, _, filenames in os.walk(self.root):
+            for name in filenames:
+                if not name.endswith((ENTRY_SUFFIX, LEGACY_SUFFIX)): continue
+                path = os.path.join(dirpath, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                yield stat.st_mtime, stat.st_size, path
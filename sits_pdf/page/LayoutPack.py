@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+
+'''Binary container of stored page layouts (``Page.store()``).
+
+Each page is a pickle frame, while image bytes are moved out of the pages into a table of frames
+keyed by content: an image repeated on many pages, e.g. a logo, is stored once and is never base64
+encoded. Reading is lazy: only the index is parsed up front, a page is decoded when it is
+requested and an image when a decoded page refers to it.
+
+Stored layouts consist of builtin types only, so frames are loaded by an unpickler refusing to
+import anything, i.e. a frame can't create arbitrary objects.
+
+Layout of the bytes::
+
+    b'P2DL' | version (uint8) | index size (uint32, little endian) | index | frames
+
+The index is the JSON object ``{"meta": {...}, "pages": [[offset, size], ...], "images": [[offset,
+size], ...]}``, offsets counting from the first frame. An image in a page frame is the persistent
+id ``i``, its position in the image table.
+'''
+
+import base64
+import io
+import json
+import pickle
+import struct
+
+
+MAGIC = b'P2DL'
+VERSION = 1
+
+_HEADER = struct.Struct('<4sBI')
+_PROTOCOL = 5
+
+
+def json_default(obj):
+    '''``default`` function of ``json.dumps()`` for stored layouts: image bytes as base64 text,
+    which is decoded again when an ``Image`` is restored.'''
+    if isinstance(obj, (bytes, bytearray)): return base64.b64encode(obj).decode()
+    raise TypeError(f'Object of type {type(obj).__name__} is not JSON serializable')
+
+
+def pack_layout(pages:list, **meta):
+    '''Pack stored page layouts.
+
+    Args:
+        pages (list): ``Page.store()`` results.
+        meta (dict): JSON serializable document properties, e.g. ``page_cnt``.
+
+    Returns:
+        bytes: Packed layouts, to read with ``LayoutPack``.
+    '''
+    images = {} # image bytes -> position in image table
+    frames = []
+    for page in pages:
+        f = io.BytesIO()
+        _PagePickler(f, images).dump(page)
+        frames.append(f.getvalue())
+    num_pages = len(frames)
+    frames.extend(images) # in insertion order, i.e. by position
+
+    entries, offset = [], 0
+    for frame in frames:
+        entries.append([offset, len(frame)])
+        offset += len(frame)
+    index = {'meta': meta, 'pages': entries[:num_pages], 'images': entries[num_pages:]}
+    index = json.dumps(index, separators=(',', ':')).encode('utf-8')
+
+    return b''.join([_HEADER.pack(MAGIC, VERSION, len(index)), index, *frames])
+
+
+class _PagePickler(pickle.Pickler):
+    '''Pickle a stored page with its image bytes replaced by positions in an image table.'''
+
+    def __init__(self, file, images:dict):
+        super().__init__(file, protocol=_PROTOCOL)
+        self.images = images
+
+    def persistent_id(self, obj):
+        if type(obj) is bytes: return self.images.setdefault(obj, len(self.images))
+        return None
+
+
+class _PageUnpickler(pickle.Unpickler):
+    '''Load a page frame, resolving image positions with ``LayoutPack.image``.'''
+
+    def __init__(self, file, pack):
+        super().__init__(file)
+        self.pack = pack
+
+    def persistent_load(self, pid):
+        return self.pack.image(pid)
+
+    def find_class(self, module, name):
+        raise pickle.UnpicklingError(f'Packed layouts can not refer to {module}.{name}.')
+
+
+class LayoutPack:
+    '''Lazy reader of ``pack_layout()`` results. Iterating it yields the stored pages.'''
+
+    def __init__(self, data:bytes):
+        '''
+        Args:
+            data (bytes): Packed layouts, kept without copying.
+
+        Raises:
+            ValueError: Not packed layouts, packed by another version, or corrupted index.
+        '''
+        self._data = memoryview(data)
+        if not LayoutPack.is_packed(self._data):
+            raise ValueError('Not a packed layout.')
+        _, version, size = _HEADER.unpack_from(self._data)
+        if version != VERSION:
+            raise ValueError(f'Unsupported packed layout version {version}.')
+        start = _HEADER.size
+        try:
+            index = json.loads(str(self._data[start:start+size], 'utf-8'))
+            self.meta = dict(index['meta'])
+            self._pages = [(int(o), int(n)) for o, n in index['pages']]
+            self._images = [(int(o), int(n)) for o, n in index['images']]
+        except Exception as e:
+            raise ValueError(f'Corrupted packed layout index: {e}')
+        self._base = start + size
+        self._decoded_images = {}
+
+        frames = self._pages + self._images # contiguous
+        if frames and self._base + sum(frames[-1]) != len(self._data):
+            raise ValueError('Truncated packed layout.')
+
+
+    @staticmethod
+    def is_packed(data:bytes):
+        '''Whether ``data`` starts like packed layouts.'''
+        return len(data)>=_HEADER.size and bytes(data[:len(MAGIC)])==MAGIC
+
+
+    def __len__(self): return len(self._pages)
+
+
+    def __iter__(self): return (self.page(i) for i in range(len(self._pages)))
+
+
+    def page(self, i:int):
+        '''Stored layout of the ``i``-th packed page.
+
+        Raises:
+            ValueError: Corrupted page frame, whatever the unpickler failed with.
+        '''
+        offset, size = self._pages[i]
+        start = self._base + offset
+        try:
+            return _PageUnpickler(io.BytesIO(self._data[start:start+size]), self).load()
+        except Exception as e:
+            raise ValueError(f'Corrupted packed page {i}: {e!r}')
+
+
+    def image(self, i:int):
+        '''Bytes of the ``i``-th image, shared by all pages referring to it.'''
+        if type(i) is not int or not 0 <= i < len(self._images):
+            raise ValueError(f'Invalid packed image reference {i!r}.')
+        image = self._decoded_images.get(i)
+        if image is None:
+            offset, size = self._images[i]
+            start = self._base + offset
+            image = self._decoded_images[i] = self._data[start:start+size].tobytes()
+        return image
@@ -22,18 +22,20 @@ class Pages(BaseCollection):
         # ---------------------------------------------
         # 0. extract fonts properties, especially line height ratio
         # ---------------------------------------------
-        fonts = Fonts.extract(fitz_doc)
+        fonts = Fonts.extract(fitz_doc, [page.id for page in self if not page.skip_parsing])
 
         # ---------------------------------------------
         # 1. extract and then clean up raw page
         # ---------------------------------------------
         pages, raw_pages = [], []
         words_found = False
+        images = {} # images shared by pages are recovered once
         for page in self:
             if page.skip_parsing: continue
 
             # init and extract data from PDF
-            raw_page = RawPageFactory.create(page_engine=fitz_doc[page.id], backend='PyMuPDF')
+            raw_page = RawPageFactory.create(page_engine=fitz_doc[page.id], backend='PyMuPDF',
+                                             image_cache=images)
             raw_page.restore(**settings)
 
             # check if any words are extracted since scanned pdf may be directed
@@ -16,6 +16,7 @@ from ..layout.Blocks import Blocks
 from ..font.Fonts import Fonts
 from ..text.TextSpan import TextSpan
 from ..common.share import debug_plot
+from ..common.Element import Element
 from ..common import constants
 from ..common.Collection import Collection
 
@@ -49,6 +50,13 @@ class RawPage(BasePage, ABC):
         '''
 
 
+    @property
+    def rotation_matrix(self):
+        '''Matrix transforming un-rotated page CS of source data to real page CS,
+        or None if the page is not rotated.'''
+        return None
+
+
     @property
     def text(self):
         '''All extracted text in this page, with images considered as ``<image>``.
@@ -65,8 +73,10 @@ class RawPage(BasePage, ABC):
     def restore(self, **settings):
         '''Initialize layout extracted with ``PyMuPDF``.'''
         raw_dict = self.extract_raw_dict(**settings)
-        self.blocks.restore(raw_dict.get('blocks', []))
-        self.shapes.restore(raw_dict.get('shapes', []))
+        # Element converts source coordinates with the rotation of this page
+        with Element.rotation(self.rotation_matrix):
+            self.blocks.restore(raw_dict.get('blocks', []))
+            self.shapes.restore(raw_dict.get('shapes', []))
         return self.blocks
 
 
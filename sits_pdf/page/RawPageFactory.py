@@ -13,11 +13,11 @@ class RawPageFactory:
     }
 
     @classmethod
-    def create(cls, page_engine, backend:str='pymupdf'):
-        '''Create RawPage class with specified backend.'''
+    def create(cls, page_engine, backend:str='pymupdf', **kwargs):
+        '''Create RawPage class with specified backend. ``kwargs`` are passed to the page class.'''
         klass = cls.MAP.get(backend.upper(), None)
         if not klass:
             raise TypeError(f'Page with pdf engine "{backend}" is not implemented yet.')
         else:
-            return klass(page_engine=page_engine)
+            return klass(page_engine=page_engine, **kwargs)
         
\ No newline at end of file
@@ -5,18 +5,29 @@ A wrapper of PyMuPDF Page as page engine.
 '''
 
 import logging
+from itertools import groupby
 from .RawPage import RawPage
 from ..image.ImagesExtractor import ImagesExtractor
 from ..shape.Paths import Paths
 from ..common.constants import FACTOR_A_HALF
-from ..common.Element import Element
 from ..common.share import (RectType, debug_plot)
 from ..common.algorithm import get_area
+from ..common.spatial import GridIndex
 
 
 class RawPageFitz(RawPage):
     '''A wrapper of ``fitz.Page`` to extract source contents.'''
 
+    def __init__(self, page_engine=None, image_cache:dict=None):
+        '''
+        Args:
+            page_engine (fitz.Page): Source pdf page.
+            image_cache (dict, optional): Images recovered from other pages of the same document.
+        '''
+        super().__init__(page_engine)
+        self.image_cache = {} if image_cache is None else image_cache
+
+
     def extract_raw_dict(self, **settings):
         raw_dict = {}
         if not self.page_engine: return raw_dict
@@ -30,20 +41,26 @@ class RawPageFitz(RawPage):
         text_blocks = self._preprocess_text(**settings)
         raw_dict['blocks'] = text_blocks
 
-        image_blocks = self._preprocess_images(**settings)
+        # images and vector graphics are clipped from the page rendered without text, once per
+        # resolution actually needed
+        extractor = ImagesExtractor(self.page_engine, self.image_cache)
+        image_blocks = self._preprocess_images(extractor, **settings)
         raw_dict['blocks'].extend(image_blocks)
         
-        shapes, images =  self._preprocess_shapes(**settings)
+        shapes, images =  self._preprocess_shapes(extractor, **settings)
         raw_dict['shapes'] = shapes
         raw_dict['blocks'].extend(images)
 
-        hyperlinks = self._preprocess_hyperlinks()
-        raw_dict['shapes'].extend(hyperlinks)        
-       
-        # Element is a base class processing coordinates, so set rotation matrix globally
-        Element.set_rotation_matrix(self.page_engine.rotation_matrix)
+        if settings['extract_hyperlinks']:
+            hyperlinks = self._preprocess_hyperlinks()
+            raw_dict['shapes'].extend(hyperlinks)
 
         return raw_dict
+
+
+    @property
+    def rotation_matrix(self):
+        return self.page_engine.rotation_matrix if self.page_engine else None
     
 
     def _preprocess_text(self, **settings):
@@ -78,27 +95,26 @@ class RawPageFitz(RawPage):
             f = lambda span: span['type']!=3  # find displayed text and ignore it
         else:
             f = lambda span: span['type']==3  # find hidden text and ignore it
-        filtered_spans = list(filter(f, spans))
-        
-        def span_area(bbox):
-            x0, y0, x1, y1 = bbox
-            return (x1-x0) * (y1-y0)
+        # index filtered spans by font, then by position
+        indexes = {}
+        for font, group in groupby(sorted(filter(f, spans), key=lambda span: span['font']),
+                                   key=lambda span: span['font']):
+            bboxes = [span['bbox'] for span in group]
+            indexes[font] = (bboxes, GridIndex(bboxes))
+
+        def is_filtered(span):
+            x0, y0, x1, y1 = span['bbox']
+            area = (x1-x0) * (y1-y0)
+            if area<=0 or span['font'] not in indexes: return False
+            bboxes, index = indexes[span['font']]
+            return any(get_area(span['bbox'], bboxes[i]) / area >= FACTOR_A_HALF \
+                        for i in index.query(span['bbox']))
 
         # filter blocks by checking span intersection: mark the entire block if 
         # any span is matched
         blocks = []
         for block in text_blocks:
-            intersected = False
-            for line in block['lines']:
-                for span in line['spans']:
-                    for filter_span in filtered_spans:
-                        intersected_area = get_area(span['bbox'], filter_span['bbox'])
-                        if intersected_area / span_area(span['bbox']) >= FACTOR_A_HALF \
-                            and span['font']==filter_span['font']:
-                            intersected = True
-                            break
-                    if intersected: break # skip further span check if found
-                if intersected: break     # skip further line check
+            intersected = any(is_filtered(span) for line in block['lines'] for span in line['spans'])
 
             # keep block if no any intersection with filtered span
             if not intersected: blocks.append(block)
@@ -106,27 +122,30 @@ class RawPageFitz(RawPage):
         return blocks
 
 
-    def _preprocess_images(self, **settings):
+    def _preprocess_images(self, extractor:ImagesExtractor, **settings):
         '''Extract image blocks. Image block extracted by ``page.get_text('rawdict')`` doesn't 
         contain alpha channel data, so it has to get page images by ``page.get_images()`` and 
         then recover them. Note that ``Page.get_images()`` contains each image only once, i.e., 
         ignore duplicated occurrences.
         '''
         # ignore image if ocr-ed pdf: get ocr-ed text only
-        if settings['ocr']==2: return []
+        if settings['ocr']==2 or not settings['extract_images']: return []
         
-        return ImagesExtractor(self.page_engine).extract_images(settings['clip_image_res_ratio'])
+        return extractor.extract_images(settings['clip_image_res_ratio'])
 
 
-    def _preprocess_shapes(self, **settings):
+    def _preprocess_shapes(self, extractor:ImagesExtractor, **settings):
         '''Identify iso-oriented paths and convert vector graphic paths to pixmap.'''
+        if not settings['extract_shapes']: return [], []
         paths = self._init_paths(**settings)
         return paths.to_shapes_and_images(
             settings['min_svg_gap_dx'], 
             settings['min_svg_gap_dy'], 
             settings['min_svg_w'], 
             settings['min_svg_h'], 
-            settings['clip_image_res_ratio'])
+            settings['clip_image_res_ratio'],
+            settings['extract_images'],
+            extractor)
     
 
     @debug_plot('Source Paths')
@@ -1,3 +1,4 @@
+from io import BytesIO
 from .support._reader import PdfReader
 from .support._writer import PdfWriter
 
@@ -34,4 +35,35 @@ def extract_between_pages(input_pdf, start_page, end_page):
             writer.add_page(pdf.pages[i])
 
         with open('output.pdf', 'wb') as outf:
-            writer.write(outf)
\ No newline at end of file
+            writer.write(outf)
+
+def write_pages(pdf, page_indexes):
+    writer = PdfWriter()
+    for i in page_indexes:
+        writer.add_page(pdf.pages[i])
+    output = BytesIO()
+    writer.write(output)
+    return output.getvalue()
+
+def iter_fixed_range_files(pdf, pages_per_file, basename):
+    # yield (name, pdf bytes) one part at a time, e.g. for zip_stream.iter_zip
+    num_pages = len(pdf.pages)
+    for i, start in enumerate(range(0, num_pages, pages_per_file)):
+        end = min(start + pages_per_file, num_pages)
+        yield f'{basename}_part_{i+1}.pdf', write_pages(pdf, range(start, end))
+
+def iter_single_page_files(pdf):
+    for i in range(len(pdf.pages)):
+        yield f'page_{i+1}.pdf', write_pages(pdf, [i])
+
+def parse_page_ranges(spec):
+    # "1-3, 5" -> [1, 2, 3, 5], page numbers are 1-based
+    numbers = []
+    for page_range in spec.split(','):
+        page_range = page_range.strip()
+        if '-' in page_range:
+            start, end = map(int, page_range.split('-'))
+            numbers.extend(range(start, end + 1))
+        else:
+            numbers.append(int(page_range))
+    return numbers
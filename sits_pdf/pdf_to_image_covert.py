@@ -10,10 +10,11 @@ import types
 import shutil
 import subprocess
 from subprocess import Popen, PIPE, TimeoutExpired
-from typing import Any, Union, Tuple, List, Dict, Callable
+from typing import Any, Union, Tuple, List, Dict, Callable, Iterator
 from pathlib import PurePath
 from PIL import Image
 
+from .metrics import stage
 from .pdf_to_image.generators import uuid_generator, counter_generator, ThreadSafeGenerator
 
 from .pdf_to_image.parsers import (
@@ -222,6 +223,7 @@ def convert_from_path(
     return images
 
 
+@stage("render")
 def convert_from_bytes(
     pdf_file: bytes,
     dpi: int = 200,
@@ -333,6 +335,54 @@ def convert_from_bytes(
         os.remove(temp_filename)
 
 
+def iter_images_from_bytes(
+    pdf_file: bytes,
+    dpi: int = 200,
+    chunk_size: int = 1,
+    userpw: str = None,
+    poppler_path: Union[str, PurePath] = r"C:\poppler-24.08.0\Library\bin",
+    **kwargs,
+) -> Iterator[Image.Image]:
+    """Lazily render a PDF page by page.
+
+    Unlike ``convert_from_bytes``, the PDF is written to a temporary file once
+    and poppler is run on ``chunk_size`` pages at a time, so only one chunk of
+    decoded images is alive at any moment. Extra keyword arguments are passed
+    on to ``convert_from_path``.
+
+    :param pdf_file: Bytes of the PDF that you want to convert
+    :type pdf_file: bytes
+    :param dpi: Image quality in DPI, defaults to 200
+    :type dpi: int, optional
+    :param chunk_size: Number of pages rendered per poppler call, defaults to 1
+    :type chunk_size: int, optional
+    :return: A generator of Pillow images, one for each page
+    :rtype: Iterator[Image.Image]
+    """
+    fh, temp_filename = tempfile.mkstemp()
+    try:
+        with open(temp_filename, "wb") as f:
+            f.write(pdf_file)
+        page_count = pdfinfo_from_path(
+            temp_filename, userpw=userpw, poppler_path=poppler_path
+        )["Pages"]
+        for first_page in range(1, page_count + 1, chunk_size):
+            with stage("render"):
+                images = convert_from_path(
+                    temp_filename,
+                    dpi=dpi,
+                    first_page=first_page,
+                    last_page=min(first_page + chunk_size - 1, page_count),
+                    userpw=userpw,
+                    poppler_path=poppler_path,
+                    **kwargs,
+                )
+            yield from images
+    finally:
+        os.close(fh)
+        os.remove(temp_filename)
+
+
 def _build_command(
     args: List,
     output_folder: str,
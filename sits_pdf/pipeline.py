@@ -0,0 +1,260 @@
+"""
+    Server-side chains of PDF operations.
+
+    A pipeline is an ordered list of steps (merge, split, compress, to_jpg,
+    to_word, to_excel) applied to the uploaded files. Between steps a PDF is
+    kept as the list of parsed pages it is made of, so merging and splitting
+    only move ``PageObject`` references around; a document is serialized
+    once, when a step needs its bytes or when it is the final artifact.
+"""
+
+import itertools
+import os
+import tempfile
+from io import BytesIO
+from typing import Iterable, Iterator, List
+
+from .ghostscript import get_ghostscript_pool
+from .pdf_split_utils import parse_page_ranges
+from .pdf_to_image_covert import iter_images_from_bytes
+from .support._reader import PdfReader
+from .support._writer import PdfWriter
+from .tasks import iter_unique_names
+from .views import (
+    DOCX_TYPE,
+    PROFILES,
+    XLSX_TYPE,
+    compress_pdf_in_memory,
+    convert_pdf_to_docx,
+    encode_jpeg,
+    extract_tables_and_content,
+    write_to_excel,
+)
+
+PDF_TYPE = "application/pdf"
+MAX_STEPS = 20
+
+SPLIT_TYPES = ("custom", "fixed_range", "all_pages", "selected_pages")
+# Ghostscript -dPDFSETTINGS presets
+QUALITIES = ("screen", "ebook", "printer", "prepress", "default")
+# rasterization resolution of to_jpg, requested values are clamped to it
+MIN_DPI, MAX_DPI = 72, 600
+
+
+class PipelineError(ValueError):
+    """Raised for an invalid pipeline definition"""
+
+    pass
+
+
+class Artifact:
+    """A named file flowing through the pipeline.
+
+    PDFs hold either their bytes, their pages, or both: the reader is parsed
+    from the bytes on first use and the bytes are written from the pages on
+    first use, so each representation is built at most once.
+    """
+
+    def __init__(self, name: str, content_type: str = PDF_TYPE, data: bytes = None, pages: list = None):
+        self.name = name
+        self.content_type = content_type
+        self._data = data
+        self._pages = pages
+
+    @property
+    def pages(self) -> list:
+        if self._pages is None:
+            self._pages = list(PdfReader(BytesIO(self._data)).pages)
+        return self._pages
+
+    @property
+    def data(self) -> bytes:
+        if self._data is None:
+            writer = PdfWriter()
+            for page in self._pages:
+                writer.add_page(page)
+            output = BytesIO()
+            writer.write(output)
+            self._data = output.getvalue()
+        return self._data
+
+    @property
+    def stem(self) -> str:
+        return os.path.splitext(self.name)[0]
+
+
+def merge(artifacts: List[Artifact], params: dict) -> List[Artifact]:
+    pages = [page for artifact in artifacts for page in artifact.pages]
+    return [Artifact(params.get("filename", "merged.pdf"), pages=pages)]
+
+
+def split(artifacts: List[Artifact], params: dict) -> List[Artifact]:
+    split_type = params.get("split_type")
+    result = []
+    for artifact in artifacts:
+        pages = artifact.pages
+        if split_type == "custom":
+            start, end = int(params["start_page"]), int(params["end_page"])
+            if not 1 <= start <= end <= len(pages):
+                raise PipelineError(f"Invalid page range {start}-{end} for {artifact.name}")
+            result.append(Artifact(f"{artifact.stem}_pages_{start}_{end}.pdf", pages=pages[start - 1 : end]))
+        elif split_type == "fixed_range":
+            size = int(params["pages_per_file"])
+            if size < 1:
+                raise PipelineError("pages_per_file must be positive")
+            for i, start in enumerate(range(0, len(pages), size)):
+                result.append(Artifact(f"{artifact.stem}_part_{i+1}.pdf", pages=pages[start : start + size]))
+        elif split_type == "all_pages":
+            for i, page in enumerate(pages):
+                result.append(Artifact(f"{artifact.stem}_page_{i+1}.pdf", pages=[page]))
+        elif split_type == "selected_pages":
+            numbers = parse_page_ranges(params["pages_to_extract"])
+            if not all(1 <= n <= len(pages) for n in numbers):
+                raise PipelineError(f"Invalid page number for {artifact.name}")
+            result.append(Artifact(f"{artifact.stem}_extracted.pdf", pages=[pages[n - 1] for n in numbers]))
+        else:
+            raise PipelineError(f"Invalid split type {split_type!r}")
+    return result
+
+
+def compress(artifacts: List[Artifact], params: dict) -> List[Artifact]:
+    quality = params.get("quality", "ebook")
+    results = get_ghostscript_pool().compress_many(
+        (artifact.data for artifact in artifacts), quality=quality, func=compress_pdf_in_memory
+    )
+    for artifact, result in zip(artifacts, results):
+        if isinstance(result, Exception):
+            raise result
+    return [Artifact(artifact.name, data=result) for artifact, result in zip(artifacts, results)]
+
+
+def to_jpg(artifacts: List[Artifact], params: dict) -> Iterator[Artifact]:
+    # pages are rendered lazily, one poppler chunk at a time
+    dpi = int(params.get("dpi", 200))
+    for artifact in artifacts:
+        for i, image in enumerate(iter_images_from_bytes(artifact.data, dpi=dpi)):
+            yield Artifact(f"{artifact.stem}_page_{i+1}.jpg", "image/jpeg", data=encode_jpeg(image))
+
+
+def to_word(artifacts: List[Artifact], params: dict) -> Iterator[Artifact]:
+    profile = params.get("profile", "full")
+    for artifact in artifacts:
+        data = convert_pdf_to_docx(artifact.data, profile=profile)
+        yield Artifact(f"{artifact.stem}.docx", DOCX_TYPE, data=data)
+
+
+def to_excel(artifacts: List[Artifact], params: dict) -> Iterator[Artifact]:
+    for artifact in artifacts:
+        with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as temp_pdf:
+            temp_pdf.write(artifact.data)
+        try:
+            tables, image_list, text_content = extract_tables_and_content(temp_pdf.name)
+            data = write_to_excel(tables, image_list, text_content)
+        finally:
+            os.unlink(temp_pdf.name)
+        yield Artifact(f"{artifact.stem}.xlsx", XLSX_TYPE, data=data)
+
+
+STEPS = {
+    "merge": merge,
+    "split": split,
+    "compress": compress,
+    "to_jpg": to_jpg,
+    "to_word": to_word,
+    "to_excel": to_excel,
+}
+
+# steps whose output is no longer a PDF, only allowed last
+FINAL_STEPS = ("to_jpg", "to_word", "to_excel")
+
+
+def _positive_int(step: dict, key: str, number: int) -> int:
+    try:
+        value = int(step[key])
+    except (KeyError, TypeError, ValueError):
+        value = 0
+    if value < 1:
+        raise PipelineError(f"{key} must be a positive integer in step {number}")
+    return value
+
+
+def _validate_params(step: dict, number: int) -> dict:
+    """Checked and normalized copy of the parameters of step ``number``."""
+    op = step["op"]
+    step = dict(step)
+    if op == "split":
+        split_type = step.get("split_type")
+        if split_type not in SPLIT_TYPES:
+            raise PipelineError(f"Invalid split type in step {number}")
+        if split_type == "custom":
+            start = step["start_page"] = _positive_int(step, "start_page", number)
+            end = step["end_page"] = _positive_int(step, "end_page", number)
+            if start > end:
+                raise PipelineError(f"start_page is after end_page in step {number}")
+        elif split_type == "fixed_range":
+            step["pages_per_file"] = _positive_int(step, "pages_per_file", number)
+        elif split_type == "selected_pages":
+            try:
+                numbers = parse_page_ranges(str(step["pages_to_extract"]))
+            except (KeyError, ValueError):
+                numbers = []
+            if not numbers or min(numbers) < 1:
+                raise PipelineError(f"Invalid pages_to_extract in step {number}")
+    elif op == "compress":
+        if step.setdefault("quality", "ebook") not in QUALITIES:
+            raise PipelineError(f"Invalid quality in step {number}")
+    elif op == "to_jpg":
+        step.setdefault("dpi", 200)
+        step["dpi"] = min(max(_positive_int(step, "dpi", number), MIN_DPI), MAX_DPI)
+    elif op == "to_word":
+        if step.get("profile", "full") not in PROFILES:
+            raise PipelineError(f"Invalid profile in step {number}")
+    return step
+
+
+def validate(steps: list) -> List[dict]:
+    """Check a pipeline definition, a list of ``{"op": name, **params}``, and
+    return it with normalized parameters, e.g. integer page numbers."""
+    if not isinstance(steps, list) or not steps:
+        raise PipelineError("steps must be a non-empty list")
+    if len(steps) > MAX_STEPS:
+        raise PipelineError(f"At most {MAX_STEPS} steps are allowed")
+    checked = []
+    for i, step in enumerate(steps):
+        if not isinstance(step, dict) or step.get("op") not in STEPS:
+            raise PipelineError(f"Unknown operation in step {i + 1}")
+        if step["op"] in FINAL_STEPS and i != len(steps) - 1:
+            raise PipelineError(f"{step['op']} must be the last step")
+        checked.append(_validate_params(step, i + 1))
+    return checked
+
+
+def run(artifacts: List[Artifact], steps: list) -> Iterator[Artifact]:
+    """Apply ``steps`` in order. The output of the last step is returned
+    lazily so that it can be streamed as it is produced."""
+    current: Iterable[Artifact] = artifacts
+    for step in validate(steps):
+        params = {key: value for key, value in step.items() if key != "op"}
+        current = STEPS[step["op"]](list(current), params)
+    return iter(current)
+
+
+def single_or_many(artifacts: Iterator[Artifact]):
+    """Return ``(artifact, None)`` when there is exactly one artifact, else
+    ``(None, iterator over all of them)``."""
+    first = next(artifacts, None)
+    if first is None:
+        raise PipelineError("The pipeline produced no output")
+    second = next(artifacts, None)
+    if second is None:
+        return first, None
+    return None, itertools.chain((first, second), artifacts)
+
+
+def zip_entries(artifacts: Iterable[Artifact]) -> Iterator[tuple]:
+    """``(name, data)`` pairs for ``iter_zip``, numbering repeated names.
+    Artifacts are consumed one at a time."""
+    artifacts, named = itertools.tee(artifacts)
+    names = iter_unique_names(artifact.name for artifact in named)
+    for name, artifact in zip(names, artifacts):
+        yield name, artifact.data
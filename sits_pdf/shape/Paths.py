@@ -14,6 +14,7 @@ import fitz
 from ..image.ImagesExtractor import ImagesExtractor
 from ..common.share import lazyproperty
 from ..common.Collection import  Collection
+from ..common.spatial import GridIndex
 from .Path import Path
 
 
@@ -73,8 +74,27 @@ class Paths(Collection):
         return shapes
 
 
+    def to_shapes_outside_svg(self):
+        '''Convert iso-oriented paths to shapes, except those within the bbox of a non-iso-oriented
+        path, i.e. most likely part of a vector graphic. A cheap alternative to the contour
+        detection of ``to_shapes_and_images()`` when vector graphics are dropped anyway.
+
+        Returns:
+            list: A list of ``Shape`` raw dicts.
+        '''
+        svg_bboxes = [path.bbox for path in self._instances if not path.is_iso_oriented]
+        index = GridIndex(svg_bboxes)
+        shapes = []
+        for path in self._instances:
+            if not path.is_iso_oriented: continue
+            if any(svg_bboxes[i].contains(path.bbox) for i in index.query(path.bbox)): continue
+            shapes.extend(path.to_shapes())
+        return shapes
+
+
     def to_shapes_and_images(self, min_svg_gap_dx:float=15, min_svg_gap_dy:float=15, 
-                                min_w:float=2, min_h:float=2, clip_image_res_ratio:float=3.0):
+                                min_w:float=2, min_h:float=2, clip_image_res_ratio:float=3.0,
+                                clip_images:bool=True, images_extractor:ImagesExtractor=None):
         '''Convert paths to iso-oriented shapes or images. The semantic type of path is either table/text style or 
         vector graphic. This method is to:
         * detect svg regions -> exist at least one non-iso-oriented path
@@ -87,6 +107,11 @@ class Paths(Collection):
             min_w (float): Ignore contours if the bbox width is less than this value.
             min_h (float): Ignore contours if the bbox height is less than this value.
             clip_image_res_ratio (float, optional): Resolution ratio of clipped bitmap. Defaults to 3.0.
+            clip_images (bool, optional): Clip page to images for vector graphics. Defaults to True.
+                Otherwise, vector graphics are ignored without rendering the page, see
+                ``to_shapes_outside_svg()``.
+            images_extractor (ImagesExtractor, optional): Extractor of the parent page, sharing the
+                page raster with other clips. Defaults to None, i.e. create a new one.
 
         Returns:
             tuple: (list of shape raw dict, list of image raw dict).
@@ -97,9 +122,12 @@ class Paths(Collection):
             iso_shapes.extend(self.to_shapes())
             return iso_shapes, []
 
+        # no images wanted: skip rendering the page for contour detection
+        if not clip_images: return self.to_shapes_outside_svg(), []
+
         # detect svg with python opencv
         images = []
-        ie = ImagesExtractor(self.parent.page_engine)
+        ie = images_extractor or ImagesExtractor(self.parent.page_engine)
         groups = ie.detect_svg_contours(min_svg_gap_dx, min_svg_gap_dy, min_w, min_h)
 
         # `bbox` is the external bbox of current region, while `inner_bboxes` are the inner contours
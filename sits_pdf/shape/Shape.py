@@ -41,7 +41,7 @@ Data structure::
 
 .. note::
     These coordinates are relative to real page CS since they're extracted from ``page.get_drawings()``,
-    which is based on real page CS. So, needn't to multiply Element.ROTATION_MATRIX when initializing
+    which is based on real page CS. So, needn't to apply the page rotation matrix when initializing
     from source dict.
 '''
 
@@ -205,7 +205,8 @@ class Shapes(ElementCollection):
         # group by color and connectivity (with margin considered)
         def f(a, b):
             return a.color==b.color and a.bbox.intersects(b.get_expand_bbox(constants.TINY_DIST))
-        groups = Collection(normal_shapes).group(f)
+        groups = Collection(normal_shapes).group_by_intersection(
+            f, dx=constants.TINY_DIST, dy=constants.TINY_DIST)
 
         merged_shapes = []
         for group in groups:
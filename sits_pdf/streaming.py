@@ -0,0 +1,168 @@
+"""
+    Chunked file responses with ``Content-Length`` and HTTP Range support.
+
+    Results are served from a file object (a blob store file or a spooled
+    temporary file) in fixed size chunks, so the memory used per download
+    does not depend on the size of the artifact.
+
+    The same download URL may serve another file after each conversion, so
+    responses carry an ``ETag`` (the blob digest) and a range is only served
+    if the client's ``If-Range`` still names that content; a resumed download
+    never joins two different files.
+"""
+
+import os
+import re
+import tempfile
+
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+
+from .blob_store import get_blob_store
+
+CHUNK_SIZE = 64 * 1024
+SPOOL_MAX_SIZE = 8 * 1024 * 1024
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def spooled_output():
+    """Temporary buffer for building a response body, kept in memory while
+    small and moved to disk once it grows past ``SPOOL_MAX_SIZE``."""
+    return tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+
+
+def parse_range(header, size):
+    """Parse a single ``bytes=start-end`` range against a body of ``size``
+    bytes. Return ``(start, end)`` inclusive, ``None`` if the header should be
+    ignored, or raise ``ValueError`` if the range cannot be satisfied."""
+    if not header:
+        return None
+    match = _RANGE_RE.match(header.strip())
+    if not match:
+        return None  # multiple or malformed ranges: serve the full body
+
+    start, end = match.groups()
+    if not start and not end:
+        return None
+    if not start:  # suffix range, e.g. bytes=-500
+        length = int(end)
+        if not length:
+            raise ValueError(header)
+        return max(size - length, 0), size - 1
+
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    if start >= size or start > end:
+        raise ValueError(header)
+    return start, end
+
+
+def if_range_matches(header, etag=None, last_modified=None):
+    """Whether an ``If-Range`` header allows serving a range of the body with
+    entity tag ``etag`` and modification time ``last_modified`` (seconds).
+    Weak tags and dates that are not an exact match never do."""
+    if not header:
+        return True
+    header = header.strip()
+    if header.startswith(('"', "W/")):
+        return etag is not None and header == quote_etag(etag)
+    date = parse_http_date_safe(header)
+    return date is not None and last_modified is not None and int(last_modified) == date
+
+
+def _iter_range(fileobj, start, length):
+    try:
+        fileobj.seek(start)
+        while length > 0:
+            chunk = fileobj.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+    finally:
+        fileobj.close()
+
+
+def stream_file(
+    request, fileobj, content_type, filename, size=None, etag=None, last_modified=None
+):
+    """Stream a seekable binary file object as an attachment. The file is
+    closed once the response has been sent. ``etag`` and ``last_modified``
+    (seconds) identify the content for resumed downloads, see
+    ``if_range_matches``."""
+    if size is None:
+        position = fileobj.tell()
+        fileobj.seek(0, 2)
+        size = fileobj.tell() - position
+        fileobj.seek(position)
+
+    try:
+        byte_range = None
+        if if_range_matches(request.headers.get("If-Range"), etag, last_modified):
+            byte_range = parse_range(request.headers.get("Range"), size)
+    except ValueError:
+        fileobj.close()
+        response = HttpResponse(status=416)
+        response["Content-Range"] = f"bytes */{size}"
+        return response
+
+    if byte_range is None:
+        fileobj.seek(0)
+        response = FileResponse(fileobj, content_type=content_type)
+        response.block_size = CHUNK_SIZE
+        response["Content-Length"] = str(size)
+    else:
+        start, end = byte_range
+        length = end - start + 1
+        response = StreamingHttpResponse(
+            _iter_range(fileobj, start, length), status=206, content_type=content_type
+        )
+        response["Content-Length"] = str(length)
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+
+    response["Accept-Ranges"] = "bytes"
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    if etag is not None:
+        response["ETag"] = quote_etag(etag)
+    if last_modified is not None:
+        response["Last-Modified"] = http_date(last_modified)
+    return response
+
+
+def stream_blob(request, digest, content_type, filename):
+    """Stream a blob store entry, see ``stream_file``. The digest is the
+    entity tag."""
+    store = get_blob_store()
+    return stream_file(
+        request, store.open(digest), content_type, filename, size=store.size(digest), etag=digest
+    )
+
+
+def stream_path(request, path, content_type, filename):
+    """Stream a file on disk, see ``stream_file``, tagged by its modification
+    time and size."""
+    stat = os.stat(path)
+    return stream_file(
+        request,
+        open(path, "rb"),
+        content_type,
+        filename,
+        size=stat.st_size,
+        etag=f"{stat.st_mtime_ns:x}-{stat.st_size:x}",
+        last_modified=stat.st_mtime,
+    )
+
+
+def stream_output(request, output, content_type, filename):
+    """Stream a buffer filled from the start, e.g. by ``spooled_output``."""
+    output.seek(0)
+    return stream_file(request, output, content_type, filename)
+
+
+def stream_zip(chunks, filename):
+    """Send an archive produced by ``zip_stream.iter_zip`` while it is being
+    built. The total size is unknown up front, so no ``Content-Length``."""
+    response = StreamingHttpResponse(chunks, content_type="application/zip")
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
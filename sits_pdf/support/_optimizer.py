@@ -0,0 +1,467 @@
+import hashlib
+import logging
+import math
+import struct
+import zlib
+from io import BytesIO
+from typing import Dict, List, Optional, Set, Tuple
+
+from ._reader import PdfReader
+from ._utils import StreamType, _get_max_pdf_version_header, b_
+from ._writer import PdfWriter
+from .constants import FilterTypes as FT
+from .constants import ImageAttributes as IA
+from .constants import PageAttributes as PG
+from .constants import StreamAttributes as SA
+from .constants import TrailerKeys as TK
+from .generic import (
+    ArrayObject,
+    ContentStream,
+    DictionaryObject,
+    EncodedStreamObject,
+    IndirectObject,
+    NameObject,
+    NumberObject,
+    PdfObject,
+    StreamObject,
+)
+
+logger = logging.getLogger(__name__)
+
+Matrix = Tuple[float, float, float, float, float, float]
+
+IDENTITY: Matrix = (1, 0, 0, 1, 0, 0)
+
+# non-stream objects merged when byte-identical, streams are always candidates
+DEDUPLICATED_TYPES = ("/Font", "/FontDescriptor", "/Encoding", "/ExtGState")
+
+# an image is only resampled when that saves at least this share of its pixels
+MIN_DOWNSAMPLE = 0.9
+
+MAX_FORM_DEPTH = 8
+
+# objects packed into each object stream by write()
+OBJECTS_PER_STREAM = 100
+
+
+def _multiply(m: Matrix, n: Matrix) -> Matrix:
+    return (
+        m[0] * n[0] + m[1] * n[2],
+        m[0] * n[1] + m[1] * n[3],
+        m[2] * n[0] + m[3] * n[2],
+        m[2] * n[1] + m[3] * n[3],
+        m[4] * n[0] + m[5] * n[2] + n[4],
+        m[4] * n[1] + m[5] * n[3] + n[5],
+    )
+
+
+def _filters(obj: StreamObject) -> List[str]:
+    filters = obj.get(SA.FILTER)
+    if filters is None:
+        return []
+    if isinstance(filters, ArrayObject):
+        return [str(f) for f in filters]
+    return [str(filters)]
+
+
+def _encoded_stream(
+    src: StreamObject, data: bytes, filters: Optional[PdfObject]
+) -> EncodedStreamObject:
+    out = EncodedStreamObject()
+    for key, value in dict.items(src):
+        if key not in (SA.LENGTH, SA.FILTER, SA.DECODE_PARMS):
+            out[key] = value
+    if filters is not None:
+        out[NameObject(SA.FILTER)] = filters
+    out._data = data
+    return out
+
+
+class PdfOptimizer:
+    """
+    Rewrite the object graph of a :class:`PdfWriter` to make it smaller.
+
+    Run :meth:`optimize` after the pages have been added and before writing.
+    Objects are only ever replaced by smaller, equivalent ones:
+
+    - JPEG images placed at more than ``image_dpi`` are resampled with Pillow,
+    - Flate streams are re-deflated at ``level``, raw streams get deflated,
+    - byte-identical streams, fonts and graphic states are merged,
+    - objects no longer reachable from the catalog are dropped.
+
+    :meth:`write` then stores all non-stream objects in compressed object
+    streams with a cross-reference stream (PDF 1.5).
+    """
+
+    def __init__(
+        self,
+        writer: PdfWriter,
+        level: int = 9,
+        image_dpi: Optional[int] = None,
+        image_quality: int = 75,
+    ) -> None:
+        self.writer = writer
+        self.level = level
+        self.image_dpi = image_dpi
+        self.image_quality = image_quality
+
+    @property
+    def objects(self) -> List[Optional[PdfObject]]:
+        return self.writer._objects
+
+    def optimize(self) -> None:
+        # pull in anything still referenced from the source document
+        self.writer._sweep_indirect_references(self.writer._root)
+        if self.image_dpi:
+            self.downsample_images()
+        self.compress_streams()
+        self.deduplicate()
+        self.drop_unreachable()
+
+    # images -------------------------------------------------------------
+
+    def image_placements(self) -> Dict[int, Tuple[float, float]]:
+        """Largest size in points each image XObject is drawn at, by idnum."""
+        placements: Dict[int, Tuple[float, float]] = {}
+        for page in self.writer.pages:
+            contents = page.get_contents()
+            if contents is None:
+                continue
+            try:
+                self._scan_content(
+                    ContentStream(contents, self.writer),
+                    page.get(PG.RESOURCES),
+                    IDENTITY,
+                    placements,
+                    0,
+                )
+            except Exception as e:
+                logger.warning(f"Cannot scan page content for images: {e}")
+        return placements
+
+    def _scan_content(
+        self,
+        content: ContentStream,
+        resources: Optional[DictionaryObject],
+        ctm: Matrix,
+        placements: Dict[int, Tuple[float, float]],
+        depth: int,
+    ) -> None:
+        xobjects = {}
+        if resources is not None:
+            xobjects = resources.get_object().get("/XObject")
+            xobjects = {} if xobjects is None else xobjects.get_object()
+        stack = []
+        for operands, operator in content.operations:
+            if operator == b"q":
+                stack.append(ctm)
+            elif operator == b"Q":
+                ctm = stack.pop() if stack else IDENTITY
+            elif operator == b"cm" and len(operands) == 6:
+                ctm = _multiply(tuple(float(x) for x in operands), ctm)  # type: ignore
+            elif operator == b"Do" and operands:
+                ref = dict.get(xobjects, operands[0])
+                if not isinstance(ref, IndirectObject):
+                    continue
+                xobj = ref.get_object()
+                subtype = xobj.get(IA.SUBTYPE)
+                if subtype == "/Image":
+                    size = (math.hypot(ctm[0], ctm[1]), math.hypot(ctm[2], ctm[3]))
+                    known = placements.get(ref.idnum, (0.0, 0.0))
+                    placements[ref.idnum] = (max(known[0], size[0]), max(known[1], size[1]))
+                elif subtype == "/Form" and depth < MAX_FORM_DEPTH:
+                    matrix = xobj["/Matrix"] if "/Matrix" in xobj else None
+                    form_ctm = (
+                        _multiply(tuple(float(x) for x in matrix), ctm)  # type: ignore
+                        if matrix is not None and len(matrix) == 6
+                        else ctm
+                    )
+                    self._scan_content(
+                        ContentStream(xobj, self.writer),
+                        xobj.get(PG.RESOURCES) or resources,
+                        form_ctm,
+                        placements,
+                        depth + 1,
+                    )
+
+    def downsample_images(self) -> None:
+        """Resample JPEG images drawn at more than ``image_dpi``."""
+        try:
+            from PIL import Image
+        except ImportError:
+            logger.warning("Pillow is not installed, images are left unchanged")
+            return
+
+        for idnum, (width_pt, height_pt) in self.image_placements().items():
+            obj = self.objects[idnum - 1]
+            if not isinstance(obj, StreamObject) or _filters(obj) != [FT.DCT_DECODE]:
+                continue
+            width, height = int(obj[IA.WIDTH]), int(obj[IA.HEIGHT])
+            scale = max(
+                self.image_dpi * width_pt / 72 / width,
+                self.image_dpi * height_pt / 72 / height,
+            )
+            if scale > MIN_DOWNSAMPLE:
+                continue
+            try:
+                image = Image.open(BytesIO(obj._data))
+                if image.mode not in ("L", "RGB"):
+                    continue  # CMYK JPEGs in PDFs are often stored inverted
+                image = image.resize(
+                    (max(1, round(width * scale)), max(1, round(height * scale))),
+                    Image.LANCZOS,
+                )
+                output = BytesIO()
+                image.save(output, format="JPEG", quality=self.image_quality, optimize=True)
+            except Exception as e:
+                logger.warning(f"Cannot resample image {idnum}: {e}")
+                continue
+
+            data = output.getvalue()
+            if len(data) < len(obj._data):
+                new = _encoded_stream(obj, data, NameObject(FT.DCT_DECODE))
+                new[NameObject(IA.WIDTH)] = NumberObject(image.width)
+                new[NameObject(IA.HEIGHT)] = NumberObject(image.height)
+                new[NameObject(IA.BITS_PER_COMPONENT)] = NumberObject(8)
+                self._replace(idnum, new)
+
+    # streams ------------------------------------------------------------
+
+    def compress_streams(self) -> None:
+        """Deflate raw streams and re-deflate Flate streams at ``level``."""
+        for i, obj in enumerate(self.objects):
+            if not isinstance(obj, StreamObject):
+                continue
+            filters = _filters(obj)
+            try:
+                if not filters:
+                    raw = obj._data
+                elif filters == [FT.FLATE_DECODE] and SA.DECODE_PARMS not in obj:
+                    raw = zlib.decompress(obj._data)
+                else:
+                    continue  # predictors and other codecs are left alone
+            except zlib.error:
+                continue  # damaged data, keep it byte for byte
+
+            data = zlib.compress(raw, self.level)
+            if len(data) < len(obj._data):
+                self._replace(i + 1, _encoded_stream(obj, data, NameObject(FT.FLATE_DECODE)))
+
+    # deduplication ------------------------------------------------------
+
+    @staticmethod
+    def fingerprint(obj: PdfObject) -> bytes:
+        output = BytesIO()
+        for key in sorted(dict.keys(obj)):
+            if key == SA.LENGTH:
+                continue
+            key.write_to_stream(output, None)
+            dict.__getitem__(obj, key).write_to_stream(output, None)
+        if isinstance(obj, StreamObject):
+            output.write(b"stream")
+            output.write(obj._data)
+        return hashlib.sha256(output.getvalue()).digest()
+
+    def _is_candidate(self, obj: Optional[PdfObject]) -> bool:
+        if isinstance(obj, StreamObject):
+            return True
+        return isinstance(obj, DictionaryObject) and obj.get("/Type") in DEDUPLICATED_TYPES
+
+    def deduplicate(self) -> int:
+        """Merge identical candidates. Repeated until stable, since merging
+        font files makes their descriptors, and then the fonts, identical."""
+        merged = 0
+        while True:
+            seen: Dict[bytes, int] = {}
+            mapping: Dict[int, int] = {}
+            for i, obj in enumerate(self.objects):
+                if not self._is_candidate(obj):
+                    continue
+                key = self.fingerprint(obj)
+                if key in seen:
+                    mapping[i + 1] = seen[key]
+                else:
+                    seen[key] = i + 1
+            if not mapping:
+                return merged
+            self._remap(mapping)
+            for idnum in mapping:
+                self.objects[idnum - 1] = None
+            merged += len(mapping)
+
+    # unreachable objects ------------------------------------------------
+
+    def _roots(self) -> List[IndirectObject]:
+        roots = [self.writer._root, self.writer._info]
+        if hasattr(self.writer, "_encrypt"):
+            roots.append(self.writer._encrypt)
+        return roots
+
+    def reachable(self) -> Set[int]:
+        found: Set[int] = set()
+        stack: List[PdfObject] = list(self._roots())
+        while stack:
+            obj = stack.pop()
+            if isinstance(obj, IndirectObject):
+                if obj.pdf is not self.writer or obj.idnum in found:
+                    continue
+                target = self.objects[obj.idnum - 1]
+                if target is None:
+                    continue
+                found.add(obj.idnum)
+                stack.append(target)
+            elif isinstance(obj, DictionaryObject):
+                stack.extend(dict.values(obj))
+            elif isinstance(obj, ArrayObject):
+                stack.extend(obj)
+        return found
+
+    def drop_unreachable(self) -> int:
+        """Drop unreferenced objects and renumber the remaining ones."""
+        keep = sorted(self.reachable())
+        dropped = sum(obj is not None for obj in self.objects) - len(keep)
+        mapping = {old: new for new, old in enumerate(keep, start=1)}
+        self._remap(mapping)
+
+        objects = [self.objects[old - 1] for old in keep]
+        for new, obj in enumerate(objects, start=1):
+            obj.indirect_reference = IndirectObject(new, 0, self.writer)
+        self.writer._objects = objects
+        self.writer._idnum_hash = {}
+
+        for name in ("_root", "_info", "_pages", "_encrypt"):
+            ref = getattr(self.writer, name, None)
+            if isinstance(ref, IndirectObject) and ref.idnum in mapping:
+                setattr(self.writer, name, IndirectObject(mapping[ref.idnum], 0, self.writer))
+        return dropped
+
+    # output -------------------------------------------------------------
+
+    def write(self, stream: StreamType) -> None:
+        """Write the document using object streams and a cross-reference
+        stream. Encrypted documents are written by the plain writer."""
+        if hasattr(self.writer, "_encrypt"):
+            self.writer.write_stream(stream)
+            return
+
+        # xref entries by idnum: (1, offset, 0) or (2, object stream, index)
+        entries: Dict[int, Tuple[int, int, int]] = {}
+        header = _get_max_pdf_version_header(self.writer.pdf_header, b"%PDF-1.5")
+        stream.write(header + b"\n%\xE2\xE3\xCF\xD3\n")
+
+        packed = []
+        for idnum, obj in enumerate(self.objects, start=1):
+            if obj is None:
+                continue
+            if isinstance(obj, StreamObject):
+                entries[idnum] = (1, stream.tell(), 0)
+                self._write_object(stream, idnum, obj)
+            else:
+                packed.append(idnum)
+
+        next_id = len(self.objects) + 1
+        for start in range(0, len(packed), OBJECTS_PER_STREAM):
+            chunk = packed[start : start + OBJECTS_PER_STREAM]
+            offsets = []
+            body = BytesIO()
+            for index, idnum in enumerate(chunk):
+                offsets.append(f"{idnum} {body.tell()}")
+                self.objects[idnum - 1].write_to_stream(body, None)
+                body.write(b"\n")
+                entries[idnum] = (2, next_id, index)
+            first = b_(" ".join(offsets)) + b"\n"
+
+            object_stream = EncodedStreamObject()
+            object_stream[NameObject("/Type")] = NameObject("/ObjStm")
+            object_stream[NameObject("/N")] = NumberObject(len(chunk))
+            object_stream[NameObject("/First")] = NumberObject(len(first))
+            object_stream[NameObject(SA.FILTER)] = NameObject(FT.FLATE_DECODE)
+            object_stream._data = zlib.compress(first + body.getvalue(), self.level)
+            entries[next_id] = (1, stream.tell(), 0)
+            self._write_object(stream, next_id, object_stream)
+            next_id += 1
+
+        xref_id = next_id
+        xref_offset = stream.tell()
+        entries[xref_id] = (1, xref_offset, 0)
+        rows = BytesIO()
+        for idnum in range(xref_id + 1):
+            kind, field2, field3 = entries.get(idnum, (0, 0, 65535 if idnum == 0 else 0))
+            rows.write(struct.pack(">BIH", kind, field2, field3))
+
+        xref = EncodedStreamObject()
+        xref[NameObject("/Type")] = NameObject("/XRef")
+        xref[NameObject(TK.SIZE)] = NumberObject(xref_id + 1)
+        xref[NameObject("/W")] = ArrayObject([NumberObject(1), NumberObject(4), NumberObject(2)])
+        xref[NameObject(TK.ROOT)] = self.writer._root
+        xref[NameObject(TK.INFO)] = self.writer._info
+        if hasattr(self.writer, "_ID"):
+            xref[NameObject(TK.ID)] = self.writer._ID
+        xref[NameObject(SA.FILTER)] = NameObject(FT.FLATE_DECODE)
+        xref._data = zlib.compress(rows.getvalue(), self.level)
+        self._write_object(stream, xref_id, xref)
+        stream.write(b_(f"startxref\n{xref_offset}\n%%EOF\n"))
+
+    @staticmethod
+    def _write_object(stream: StreamType, idnum: int, obj: PdfObject) -> None:
+        stream.write(b_(f"{idnum} 0 obj\n"))
+        obj.write_to_stream(stream, None)
+        stream.write(b"\nendobj\n")
+
+    # helpers ------------------------------------------------------------
+
+    def _replace(self, idnum: int, obj: PdfObject) -> None:
+        obj.indirect_reference = IndirectObject(idnum, 0, self.writer)
+        self.objects[idnum - 1] = obj
+
+    def _remap(self, mapping: Dict[int, int]) -> None:
+        """Point every reference to an idnum in ``mapping`` to its new value."""
+        visited: Set[int] = set()
+        stack: List[PdfObject] = [obj for obj in self.objects if obj is not None]
+        while stack:
+            obj = stack.pop()
+            if id(obj) in visited:
+                continue
+            visited.add(id(obj))
+            if isinstance(obj, DictionaryObject):
+                items = list(dict.items(obj))
+            elif isinstance(obj, ArrayObject):
+                items = list(enumerate(obj))
+            else:
+                continue
+            for key, value in items:
+                if isinstance(value, IndirectObject):
+                    if value.pdf is self.writer and value.idnum in mapping:
+                        new = IndirectObject(mapping[value.idnum], 0, self.writer)
+                        if isinstance(obj, DictionaryObject):
+                            dict.__setitem__(obj, key, new)
+                        else:
+                            obj[key] = new
+                elif isinstance(value, (DictionaryObject, ArrayObject)):
+                    stack.append(value)
+
+
+def optimize_pdf(
+    pdf_bytes: bytes,
+    level: int = 9,
+    image_dpi: Optional[int] = None,
+    image_quality: int = 75,
+) -> bytes:
+    """
+    Rebuild a PDF with :class:`PdfOptimizer` and return the new file.
+
+    Pages, outlines, named destinations and annotations are copied from the
+    source, objects only referenced by the dropped parts are left out.
+    """
+    reader = PdfReader(BytesIO(pdf_bytes), strict=False)
+    writer = PdfWriter()
+    writer.append(reader)
+    if reader.metadata:
+        writer.add_metadata(reader.metadata)
+
+    optimizer = PdfOptimizer(writer, level, image_dpi, image_quality)
+    optimizer.optimize()
+
+    output = BytesIO()
+    optimizer.write(output)
+    return output.getvalue()
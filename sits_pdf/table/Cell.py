@@ -63,8 +63,7 @@ class Cell(Layout):
         i, j = indexes
         docx_cell = table.cell(i, j)
         if n_row * n_col != 1:
-            _cell = table.cell(i + n_row - 1, j + n_col - 1)
-            docx_cell.merge(_cell)
+            docx_cell = table.merge(i, j, n_row, n_col)
         x0, y0, x1, y1 = self.bbox
         docx_cell.width = Pt(x1 - x0)
         if self.blocks:
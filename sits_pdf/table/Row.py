@@ -44,5 +44,5 @@ class Row(Element):
         docx_row = table.rows[idx_row]
         docx_row.height_rule = WD_ROW_HEIGHT.EXACTLY
         docx_row.height = Pt(self.height)
-        for idx_col in range(len(table.columns)):
+        for idx_col in range(table.num_cols):
             self._cells[idx_col].make_docx(table, (idx_row, idx_col))
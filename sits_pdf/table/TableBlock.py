@@ -89,5 +89,6 @@ class TableBlock(Block):
 
     def make_docx(self, table):
         docx.indent_table(table, self.left_space)
-        for idx_row in range(len(table.rows)):
-            self._rows[idx_row].make_docx(table, idx_row)
+        grid = docx.TableGrid(table)
+        for idx_row in range(len(grid.rows)):
+            self._rows[idx_row].make_docx(grid, idx_row)
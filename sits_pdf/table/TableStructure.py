@@ -3,6 +3,8 @@
 '''Parsing table structure based on strokes and fills.
 '''
 
+from bisect import bisect_left
+from itertools import accumulate
 import fitz
 from ..common.Element import Element
 from ..common.share import RectType
@@ -346,26 +348,30 @@ class TableStructure:
             y2  +--------h6--------+----h7---+
 
         '''
-        def group_strokes(stroke:Shape, strokes:dict):
-            # y-coordinate of h-strokes or x-coordinate of v-strokes
-            t = round(stroke.y0, 1) if stroke.horizontal else round(stroke.x0, 1)
-
-            # ignore minor error resulting from different stroke width
-            for t_ in strokes:
-                if abs(t-t_)>min_border_clearance: continue
-                t = (t_+t)/2.0 # average
-                strokes[t] = strokes.pop(t_)
-                strokes[t].append(stroke)
-                break
-            else:
-                strokes[t] = Shapes([stroke])
+        def group_strokes(strokes:list):
+            # sort by y-coordinate of h-strokes or x-coordinate of v-strokes, then sweep: a stroke
+            # joins current group if close to its coordinate, i.e. ignore minor error resulting
+            # from different stroke width
+            items = [(round(stroke.y0 if stroke.horizontal else stroke.x0, 1), stroke) for stroke in strokes]
+            items.sort(key=lambda item: item[0])
+
+            groups = {} # type: dict [float, Shapes]
+            t_, group = None, None
+            for t, stroke in items:
+                if group is not None and abs(t-t_)<=min_border_clearance:
+                    t_ = (t_+t)/2.0 # average
+                    group.append(stroke)
+                    continue
+                if group is not None: groups[t_] = group
+                t_, group = t, Shapes([stroke])
+            if group is not None: groups[t_] = group
+            return groups
         
-        h_strokes = {} # type: dict [float, Shapes]
-        v_strokes = {} # type: dict [float, Shapes]
+        # group horizontal/vertical strokes in each row/column
+        h_list, v_list = [], []
         X0, Y0, X1, Y1 = float('inf'), float('inf'), -float('inf'), -float('inf')
         for stroke in strokes:
-            # group horizontal/vertical strokes in each row/column
-            group_strokes(stroke, h_strokes if stroke.horizontal else v_strokes)
+            (h_list if stroke.horizontal else v_list).append(stroke)
 
             # update table region
             X0 = min(X0, stroke.x0)
@@ -373,6 +379,9 @@ class TableStructure:
             Y0 = min(Y0, stroke.y0)
             Y1 = max(Y1, stroke.y1)
 
+        h_strokes = group_strokes(h_list)
+        v_strokes = group_strokes(v_list)
+
         # at least 2 inner strokes exist
         if not h_strokes or not v_strokes: return None, None
 
@@ -414,26 +423,26 @@ class TableStructure:
         x_cols, y_rows = self.x_cols, self.y_rows
         # check cell merging status in each row
         merged_cells_rows = []  # type: list[list[int]]
-        ordered_strokes = [self.v_strokes[k] for k in x_cols]
+        ordered_strokes = TableStructure._index_borders([self.v_strokes[k] for k in x_cols], 'row')
         for row in self.cells:
             ref_y = (row[0].bbox.y0+row[0].bbox.y1)/2.0
-            row_structure = TableStructure._check_merged_cells(ref_y, ordered_strokes, 'row')
+            row_structure = TableStructure._check_merged_cells(ref_y, ordered_strokes)
             merged_cells_rows.append(row_structure)
 
         # check cell merging status in each column
         merged_cells_cols = []  # type: list[list[int]]
-        ordered_strokes = [self.h_strokes[k] for k in y_rows]
+        ordered_strokes = TableStructure._index_borders([self.h_strokes[k] for k in y_rows], 'column')
         for cell in self.cells[0]:
             ref_x = (cell.bbox.x0+cell.bbox.x1)/2.0
-            col_structure = TableStructure._check_merged_cells(ref_x, ordered_strokes, 'column')
+            col_structure = TableStructure._check_merged_cells(ref_x, ordered_strokes)
             merged_cells_cols.append(col_structure)
 
         # count merged cells in row and column directions
         for i in range(self.num_rows):
             for j in range(self.num_cols):
                 cell = self.cells[i][j]
-                n_col = TableStructure._count_merged_cells(merged_cells_rows[i][j:])
-                n_row = TableStructure._count_merged_cells(merged_cells_cols[j][i:])                
+                n_col = TableStructure._count_merged_cells(merged_cells_rows[i], j)
+                n_row = TableStructure._count_merged_cells(merged_cells_cols[j], i)
                 cell.merged_cells = (n_row, n_col)        
 
         # check whether merged region is valid
@@ -515,13 +524,38 @@ class TableStructure:
             borders[current].extend(segments)
 
     @staticmethod
-    def _check_merged_cells(ref:float, borders:list, direction:str='row'):
+    def _index_borders(borders:list, direction:str='row'):
+        '''Index borders for checking merged cells, see ``_check_merged_cells``.
+
+        Args:
+            * borders (list[Shapes]): A list of vertical (or horizontal) rects list in a column (or row).
+            * direction (str): ``row`` - check merged cells in row; ``column`` - check merged cells in a column.
+
+        Returns:
+            list: Sorted start coordinates and running maximum of end coordinates of the borders
+            in each column (or row) except the last one.
+        '''
+        res = []
+        for shapes in borders[0:-1]:
+            # reference coordinates depending on checking direction
+            if direction=='row':
+                ranges = sorted((border.y0, border.y1) for border in shapes)
+            else:
+                ranges = sorted((border.x0, border.x1) for border in shapes)
+            starts = [ref0 for ref0, _ in ranges]
+            ends = list(accumulate((ref1 for _, ref1 in ranges), max))
+            res.append((starts, ends))
+        return res
+
+
+    @staticmethod
+    def _check_merged_cells(ref:float, borders:list):
         '''Check merged cells in a row/column. 
         
         Args:
             * ref (float): y (or x) coordinate of horizontal (or vertical) passing-through line.
-            * borders (list[Shapes]): A list of vertical (or horizontal) rects list in a column (or row).
-            * direction (str): ``row`` - check merged cells in row; ``column`` - check merged cells in a column.
+            * borders (list): Vertical (or horizontal) borders in each column (or row), indexed
+                by ``_index_borders``.
 
         Taking cells in a row for example, give a horizontal line ``y=ref`` passing through this row, 
         check the intersection with vertical borders. The ``n-th`` cell is merged if no intersection 
@@ -538,54 +572,30 @@ class TableStructure:
                 +-----------+-----+
         '''
         res = [] # type: list[int]
-        for shapes in borders[0:-1]:
-            # NOTE: shapes MUST be sorted in reading order!!
-            # multi-lines exist in a row/column
-            for border in shapes:
-                # reference coordinates depending on checking direction
-                if direction=='row':
-                    ref0, ref1 = border.y0, border.y1
-                else:
-                    ref0, ref1 = border.x0, border.x1
-                # 1) intersection found
-                if ref0 < ref < ref1:
-                    res.append(1)
-                    break
-                
-                # 2) reference line locates below current border:
-                # still have a chance to find intersection with next border, but,
-                # no chance if this is the last border, see the else-clause
-                elif ref > ref1:
-                    continue
-
-                # 3) current border locates below the reference line:
-                # no intersection is possible any more
-                elif ref < ref0:
-                    res.append(0)
-                    break
-            
-            # see notes 2), no change any more
-            else:
-                res.append(0)
+        for starts, ends in borders:
+            # intersection found if any border starting above the reference line ends below it
+            i = bisect_left(starts, ref)
+            res.append(1 if i and ends[i-1]>ref else 0)
 
         return res
 
 
     @staticmethod
-    def _count_merged_cells(merging_status:list):
+    def _count_merged_cells(merging_status:list, start:int=0):
         '''Count merged cells, 
         e.g. ``[1,0,0,1]`` -> the second and third cells are merged into the first one.
         
         Args:
             merging_status (list): A list of 0-1 representing cell merging status.
+            start (int, optional): Index of the cell to count from. Defaults to 0.
         '''
         # it's merged by other cell
-        if merging_status[0]==0: return 0
+        if merging_status[start]==0: return 0
         
         # check a continuous sequence of 0 status
         num = 1
-        for val in merging_status[1:]:
-            if val==0:
+        for k in range(start+1, len(merging_status)):
+            if merging_status[k]==0:
                 num += 1
             else: 
                 break            
@@ -26,7 +26,7 @@ class TablesConstructor:
 
         def remove_overlap(instances: list):
             fun = lambda a, b: a.bbox.contains(b.bbox) or b.bbox.contains(a.bbox)
-            groups = Collection(instances).group(fun)
+            groups = Collection(instances).group_by_intersection(fun)
             unique_groups = []
             for group_instances in groups:
                 if len(group_instances) == 1:
@@ -0,0 +1,126 @@
+"""
+    Conversion tasks executed by the background job engine.
+
+    Each task receives the JSON parameters stored with the job and a
+    ``progress(step, total, stage)`` callback, and returns the result (bytes
+    or an iterable of chunks), the file name, the content type and a dict of
+    extra download page context.
+"""
+
+import os
+import tempfile
+import uuid
+
+from .blob_store import get_blob_store
+from .ghostscript import get_ghostscript_pool
+from .views import (
+    DOCX_TYPE,
+    XLSX_TYPE,
+    compress_pdf_in_memory,
+    convert_pdf_to_docx,
+    extract_tables_and_content,
+    format_size,
+    render_url_to_pdf,
+    write_to_excel,
+)
+from .zip_stream import iter_zip
+
+
+def pdf_to_word(params, progress):
+    pdf_bytes = get_blob_store().get(params["pdf_hash"])
+    # job workers already run one conversion per core
+    docx_bytes = convert_pdf_to_docx(pdf_bytes, progress=progress, multi_processing=False)
+    return docx_bytes, params["filename"].replace(".pdf", ".docx"), DOCX_TYPE, {}
+
+
+def pdf_to_excel(params, progress):
+    pdf_bytes = get_blob_store().get(params["pdf_hash"])
+
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as temp_pdf:
+        temp_pdf.write(pdf_bytes)
+        temp_pdf_path = temp_pdf.name
+
+    try:
+        progress(1, 2, "Extracting tables and content...")
+        tables, image_list, text_content = extract_tables_and_content(temp_pdf_path)
+        progress(2, 2, "Writing spreadsheet...")
+        excel_bytes = write_to_excel(tables, image_list, text_content)
+    finally:
+        os.unlink(temp_pdf_path)
+
+    return excel_bytes, f"converted_{uuid.uuid4()}.xlsx", XLSX_TYPE, {}
+
+
+def iter_unique_names(filenames, prefix=""):
+    """Prefix file names for an archive, numbering repeated names. Names are
+    produced as ``filenames`` is iterated, e.g. while streaming a zip."""
+    seen = {}
+    for filename in filenames:
+        name = f"{prefix}{filename}"
+        count = seen.get(name, 0)
+        seen[name] = count + 1
+        if count:
+            base, ext = os.path.splitext(name)
+            name = f"{base} ({count}){ext}"
+        yield name
+
+
+def unique_names(filenames, prefix=""):
+    """List of ``iter_unique_names``."""
+    return list(iter_unique_names(filenames, prefix))
+
+
+def compress(params, progress):
+    store = get_blob_store()
+    pdf_hashes = params["pdf_hashes"]
+    filenames = params.get("filenames") or [f"file_{i+1}.pdf" for i in range(len(pdf_hashes))]
+    files = [store.get(pdf_hash) for pdf_hash in pdf_hashes]
+    total = len(files)
+    finished = []
+
+    def on_done(i, result):
+        finished.append(i)
+        progress(len(finished), total, f"Compressed {len(finished)} of {total} files...")
+
+    progress(0, total, f"Compressing {total} file(s)...")
+    results = get_ghostscript_pool().compress_many(
+        files, quality="ebook", func=compress_pdf_in_memory, on_done=on_done
+    )
+    done = [i for i, result in enumerate(results) if not isinstance(result, Exception)]
+    if not done:
+        raise results[0]
+
+    original_size = sum(len(files[i]) for i in done)
+    compressed_size = sum(len(results[i]) for i in done)
+    compression_ratio = (1 - compressed_size / original_size) * 100
+    meta = {
+        "compressed_size": format_size(compressed_size),
+        "original_size": format_size(original_size),
+        "compression_ratio_percentage": f"{round(compression_ratio)}",
+        "failed_files": [filenames[i] for i in range(total) if i not in done],
+    }
+    if total == 1:
+        return results[0], "compress.pdf", "application/pdf", meta
+
+    names = unique_names([filenames[i] for i in done], prefix="compressed_")
+    archive = iter_zip(zip(names, (results[i] for i in done)))
+    return archive, "compressed_pdfs.zip", "application/zip", meta
+
+
+def html_to_pdf(params, progress):
+    progress(1, 1, "Rendering web page...")
+    pdf = render_url_to_pdf(
+        params["url"],
+        params["paper_format"],
+        params["margin"],
+        params.get("landscape", False),
+    )
+    return pdf, "converted.pdf", "application/pdf", {}
+
+
+TASKS = {
+    "pdf_to_word": pdf_to_word,
+    "pdf_to_excel": pdf_to_excel,
+    "compress": compress,
+    "html_to_pdf": html_to_pdf,
+}
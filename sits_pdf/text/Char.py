@@ -9,9 +9,13 @@ Data structure refer to this `link <https://pymupdf.readthedocs.io/en/latest/tex
         'c'     : str, 
         'origin': (x,y)
     }
+
+A page may have a huge number of chars, so ``Char`` has no instance dict and keeps its bbox as a
+plain tuple; ``Char.bbox`` creates a ``fitz.Rect`` on access.
 '''
 
 
+import fitz
 from ..common.constants import INVALID_CHARS
 from ..common.Element import Element
 from ..shape.Shape import Shape
@@ -19,6 +23,8 @@ from ..shape.Shape import Shape
 
 class Char(Element):
     '''Object representing a character.'''
+    __slots__ = ('c', 'origin', '_rect')
+
     def __init__(self, raw:dict=None):
         if raw is None: raw = {}
 
@@ -31,6 +37,13 @@ class Char(Element):
         super().__init__(raw) # NOTE: ignore parent element for Char instance
 
 
+    @property
+    def bbox(self): return fitz.Rect(self._rect)
+
+    @bbox.setter
+    def bbox(self, rect): self._rect = tuple(rect)
+
+
     def contained_in_rect(self, rect:Shape, horizontal:bool=True):
         """Detect whether it locates in a rect.
 
@@ -45,14 +58,19 @@ class Char(Element):
             It's considered as contained in the target rect if the intersection is larger than 
             half of the char bbox.
         """
+        # compare coordinates directly: called for each char and each potential style shape
+        x0, y0, x1, y1 = self._rect
+        u0, v0, u1, v1 = rect.bbox
+
         # char in rect?
-        if self.bbox in rect.bbox: return True
+        if u0<=x0<=x1<=u1 and v0<=y0<=y1<=v1: return True
 
         # intersection?
-        s = self.bbox & rect.bbox
-        if s.is_empty: return False
-        if horizontal: return s.width > 0.5*self.bbox.width
-        return s.height > 0.5*self.bbox.height
+        w = min(x1, u1) - max(x0, u0)
+        h = min(y1, v1) - max(y0, v0)
+        if w<=0 or h<=0: return False
+        if horizontal: return w > 0.5*(x1-x0)
+        return h > 0.5*(y1-y0)
 
 
     def store(self):
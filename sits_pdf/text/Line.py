@@ -30,6 +30,8 @@ from ..image.ImageSpan import ImageSpan
 
 class Line(Element):
     '''Object representing a line in text block.'''
+    __slots__ = ('wmode', 'dir', 'line_break', 'tab_stop', 'spans')
+
     def __init__(self, raw:dict=None):
         if raw is None: raw = {}
 
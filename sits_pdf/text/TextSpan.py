@@ -27,6 +27,7 @@ this `link <https://pymupdf.readthedocs.io/en/latest/textpage.html>`_::
     }
 '''
 
+from functools import lru_cache
 import fitz
 from docx.shared import Pt, RGBColor
 from docx.oxml.ns import qn
@@ -38,8 +39,36 @@ from ..common import docx
 from ..shape.Shape import Shape
 
 
+# count of (font, text) measurements kept for spans with unnamed fonts
+TEXT_EXTENT_CACHE_SIZE = 4096
+
+
+@lru_cache(maxsize=None)
+def _builtin_font(font_name:str):
+    '''Shared ``fitz.Font`` instance of a builtin font, loaded once per process.'''
+    return fitz.Font(font_name)
+
+
+@lru_cache(maxsize=TEXT_EXTENT_CACHE_SIZE)
+def _text_extent(font_name:str, text:str):
+    '''Length of ``text`` and vertical range of its rect relative to the baseline, when it is
+    written by ``fitz.TextWriter`` with given font and font size 1. All of them scale linearly
+    with the font size.
+
+    Returns:
+        tuple: ``(length, dy0, dy1)``.
+    '''
+    font = _builtin_font(font_name)
+    tw = fitz.TextWriter((0, 0, 1, 1))
+    rect, _ = tw.append((0, 0), text, font=font, fontsize=1)
+    return font.text_length(text, fontsize=1), rect.y0, rect.y1
+
+
 class TextSpan(Element):
     '''Object representing text span.'''
+    __slots__ = ('color', 'flags', 'chars', '_text', 'font', 'size', 'ascender', 'descender',
+                 'line_height', 'style', 'char_spacing')
+
     def __init__(self, raw:dict=None):
         raw = raw or {}
         self.color = raw.get('color', 0)
@@ -117,20 +146,16 @@ class TextSpan(Element):
         self.font = font_name
 
         # compute text length under new font with that size
-        font = fitz.Font(font_name)
-        new_length = font.text_length(self.text, fontsize=self.size)
+        length, dy0, dy1 = _text_extent(font_name, self.text)
+        new_length = length * self.size
         if new_length > self.bbox.width:
             self.size *= self.bbox.width / new_length
 
-        # estimate occupied rect when added with TextWriter
-        x0, y0, x1, y1 = self.bbox
-        tw = fitz.TextWriter((0, 0, x1, y1))
-        rect, _ = tw.append(
-            self.chars[0].origin, # the bottom left point of the first character
-            self.text,
-            font=font,
-            fontsize=self.size
-        )
+        # estimate occupied rect when added with TextWriter at the bottom left point of the first
+        # character, i.e. the measured rect scaled by font size and moved to that origin
+        x0, _, x1, _ = self.bbox
+        origin_y = self.chars[0].origin[1]
+        rect = fitz.Rect(x0, origin_y+dy0*self.size, x1, origin_y+dy1*self.size)
 
         # update span bbox
         # - x-direction: use original horizontal range
@@ -228,12 +253,10 @@ class TextSpan(Element):
             intsec.x1 = self.bbox.x1
 
         # calculate chars in the format rectangle
-        # combine an index with enumerate(), so the second element is the char
-        f = lambda items: items[1].contained_in_rect(rect, horizontal)
-        index_chars = list(filter(f, enumerate(self.chars)))
+        index_chars = [i for i, char in enumerate(self.chars) if char.contained_in_rect(rect, horizontal)]
 
         # then we get target chars in a sequence
-        pos = index_chars[0][0] if index_chars else -1 # start index -1 if nothing found
+        pos = index_chars[0] if index_chars else -1 # start index -1 if nothing found
         length = len(index_chars)
         pos_end = max(pos+length, 0) # max() is used in case: pos=-1, length=0
 
@@ -244,15 +267,12 @@ class TextSpan(Element):
                 bbox = (self.bbox.x0, self.bbox.y0, intsec.x0, self.bbox.y1)
             else:
                 bbox = (self.bbox.x0, intsec.y1, self.bbox.x1, self.bbox.y1)
-            split_span = self.copy().update_bbox(bbox)
-            split_span.chars = self.chars[0:pos]
-            split_spans.append(split_span)
+            split_spans.append(self._sub_span(self.chars[0:pos], bbox))
 
         # middle intersection part if exists
         if length > 0:
             bbox = (intsec.x0, intsec.y0, intsec.x1, intsec.y1)
-            split_span = self.copy().update_bbox(bbox)
-            split_span.chars = self.chars[pos:pos_end]            
+            split_span = self._sub_span(self.chars[pos:pos_end], bbox)
             split_span._parse_text_format(rect, horizontal)  # update style
             split_spans.append(split_span)
 
@@ -262,13 +282,23 @@ class TextSpan(Element):
                 bbox = (intsec.x1, self.bbox.y0, self.bbox.x1, self.bbox.y1)
             else:
                 bbox = (self.bbox.x0, self.bbox.y0, self.bbox.x1, intsec.y0)
-            split_span = self.copy().update_bbox(bbox)
-            split_span.chars = self.chars[pos_end:]
-            split_spans.append(split_span)
+            split_spans.append(self._sub_span(self.chars[pos_end:], bbox))
 
         return split_spans
 
 
+    def _sub_span(self, chars:list, bbox):
+        '''Copy of this span with given chars and bbox. The chars are taken as they are rather than
+        deep copied along with the span.'''
+        all_chars, self.chars = self.chars, []
+        try:
+            span = self.copy()
+        finally:
+            self.chars = all_chars
+        span.chars = chars
+        return span.update_bbox(bbox)
+
+
     def _parse_text_format(self, rect:Shape, horizontal:bool=True):
         """Parse text style based on the position to a rect shape.
 
@@ -0,0 +1,273 @@
+"""
+    Page thumbnails rendered in-process with PyMuPDF.
+
+    A thumbnail is rasterized directly at the requested pixel box instead of
+    at print resolution, and kept in an on-disk cache keyed by the blob digest
+    of the document, the page index and the box. Thumbnails of a whole
+    document are rendered in parallel by a pool of worker processes, each one
+    opening the document once and handling an interleaved slice of its pages.
+
+    The cache is bounded by ``THUMBNAIL_CACHE_MAX_BYTES``: reading a thumbnail
+    refreshes its modification time, and the least recently used ones are
+    deleted once the total size is over the limit.
+"""
+
+import logging
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from itertools import repeat
+from multiprocessing import cpu_count
+from threading import Lock
+from typing import List, Optional
+
+import fitz
+from django.conf import settings
+
+from .blob_store import BlobNotFound, get_blob_store
+from .jobs import init_worker, pool_context
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WIDTH = 200
+MAX_SIZE = 2000
+JPEG_QUALITY = 80
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+# below this many missing pages, rendering inline beats the pool round trip
+PARALLEL_MIN_PAGES = 4
+
+
+def fit_zoom(rect: fitz.Rect, width: int = None, height: int = None) -> float:
+    """Scale factor fitting ``rect`` into a ``width`` x ``height`` pixel box.
+    Either side may be omitted to constrain the other one only."""
+    scales = []
+    if width:
+        scales.append(width / rect.width)
+    if height:
+        scales.append(height / rect.height)
+    return min(scales) if scales else DEFAULT_WIDTH / rect.width
+
+
+def render_thumbnail(doc: fitz.Document, index: int, width: int = None, height: int = None) -> bytes:
+    """Render page ``index`` of an open document as a JPEG fitting the box."""
+    page = doc[index]
+    zoom = fit_zoom(page.rect, width, height)
+    pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+    return pix.pil_tobytes(format="JPEG", quality=JPEG_QUALITY, optimize=True)
+
+
+class ThumbnailCache:
+    """Thumbnails stored as ``root/ab/<digest>/<page>-<width>x<height>.jpg``.
+
+    An omitted side of the box is recorded as 0. Files are written to a
+    temporary name and renamed into place, so a reader never sees a partial
+    image even when two workers render the same page. ``max_size`` bounds
+    the total size in bytes, None means unbounded.
+    """
+
+    def __init__(self, root: str, max_size: Optional[int] = DEFAULT_MAX_BYTES):
+        self.root = os.fspath(root)
+        self.max_size = max_size
+        self._size = None  # estimated total size, computed on first store
+        self._size_lock = Lock()
+        os.makedirs(self.root, exist_ok=True)
+
+    def path(self, digest: str, index: int, width: int = None, height: int = None) -> str:
+        if len(digest) != 64 or not all(c in "0123456789abcdef" for c in digest):
+            raise BlobNotFound(digest)
+        name = f"{index}-{width or 0}x{height or 0}.jpg"
+        return os.path.join(self.root, digest[:2], digest, name)
+
+    def get(self, digest: str, index: int, width: int = None, height: int = None) -> Optional[bytes]:
+        path = self.path(digest, index, width, height)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)  # mark as recently used
+        except FileNotFoundError:
+            return None
+        return data
+
+    def exists(self, digest: str, index: int, width: int = None, height: int = None) -> bool:
+        return os.path.exists(self.path(digest, index, width, height))
+
+    def put(self, digest: str, index: int, width: int, height: int, data: bytes):
+        """Store a thumbnail, then evict old ones if the cache is full."""
+        self.added(self.write(digest, index, width, height, data))
+
+    def write(self, digest: str, index: int, width: int, height: int, data: bytes) -> int:
+        """Store a thumbnail without accounting for it, and return its size.
+        Used by pool workers, the parent process then calls ``added``."""
+        target = self.path(digest, index, width, height)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(target), suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(temp_path, target)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+            raise
+        return len(data)
+
+    def added(self, size: int):
+        """Account for ``size`` bytes of new thumbnails, evicting the least
+        recently used ones beyond ``max_size``."""
+        if self.max_size is None:
+            return
+        with self._size_lock:
+            if self._size is None:
+                self._size = sum(entry[1] for entry in self._entries())
+            else:
+                self._size += size
+            if self._size > self.max_size:
+                self._evict()
+
+    def _evict(self):
+        """Remove least recently used thumbnails down to 90% of ``max_size``."""
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        target = self.max_size * 0.9
+        removed = 0
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            try:
+                os.rmdir(os.path.dirname(path))  # last page of the document
+            except OSError:
+                pass
+            total -= size
+            removed += 1
+        self._size = total
+        if removed:
+            logger.info(f"Thumbnail cache: evicted {removed} thumbnails")
+
+    def _entries(self):
+        """``(mtime, size, path)`` of every thumbnail."""
+        for dirpath, _, filenames in os.walk(self.root):
+            for name in filenames:
+                if not name.endswith(".jpg"):
+                    continue
+                path = os.path.join(dirpath, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                yield stat.st_mtime, stat.st_size, path
+
+
+_cache: Optional[ThumbnailCache] = None
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = Lock()
+
+
+def get_thumbnail_cache() -> ThumbnailCache:
+    """Return the process-wide cache rooted at ``THUMBNAIL_CACHE_ROOT`` and
+    bounded by ``THUMBNAIL_CACHE_MAX_BYTES``."""
+    global _cache
+    if _cache is None:
+        root = getattr(
+            settings,
+            "THUMBNAIL_CACHE_ROOT",
+            os.path.join(settings.MEDIA_ROOT, "thumbnails"),
+        )
+        _cache = ThumbnailCache(
+            root, getattr(settings, "THUMBNAIL_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES)
+        )
+    return _cache
+
+
+def _max_workers() -> int:
+    return getattr(settings, "THUMBNAIL_MAX_WORKERS", 0) or cpu_count()
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=_max_workers(), mp_context=pool_context(), initializer=init_worker
+            )
+        return _executor
+
+
+def _reset_executor():
+    """Drop a broken pool, stopping its management thread, so that the next
+    request starts a new one."""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def _open_document(digest: str) -> fitz.Document:
+    return fitz.open(stream=get_blob_store().get(digest), filetype="pdf")
+
+
+def _render_pages(digest: str, indexes: List[int], width: int, height: int) -> int:
+    """Render and cache a set of pages, opening the document only once.
+    Return the bytes written, for the caller to account for."""
+    cache = get_thumbnail_cache()
+    size = 0
+    with _open_document(digest) as doc:
+        for index in indexes:
+            data = render_thumbnail(doc, index, width, height)
+            size += cache.write(digest, index, width, height, data)
+    return size
+
+
+def get_thumbnail(digest: str, index: int, width: int = None, height: int = None) -> bytes:
+    """JPEG thumbnail of page ``index`` of the PDF stored under ``digest``.
+
+    Raises ``BlobNotFound`` for an unknown digest and ``IndexError`` for a page
+    outside the document.
+    """
+    if not width and not height:
+        width = DEFAULT_WIDTH
+    cache = get_thumbnail_cache()
+    data = cache.get(digest, index, width, height)
+    if data is None:
+        with _open_document(digest) as doc:
+            if not 0 <= index < doc.page_count:
+                raise IndexError(index)
+            data = render_thumbnail(doc, index, width, height)
+        cache.put(digest, index, width, height, data)
+    return data
+
+
+def get_thumbnails(digest: str, width: int = None, height: int = None) -> List[str]:
+    """Cache paths of the JPEG thumbnails of every page, in page order. Pages
+    missing from the cache are rendered in parallel; the images themselves
+    are not read back, see ``get_thumbnail``."""
+    if not width and not height:
+        width = DEFAULT_WIDTH
+    cache = get_thumbnail_cache()
+    with _open_document(digest) as doc:
+        page_count = doc.page_count
+
+    missing = [i for i in range(page_count) if not cache.exists(digest, i, width, height)]
+    if len(missing) >= PARALLEL_MIN_PAGES:
+        workers = min(_max_workers(), len(missing))
+        slices = [missing[i::workers] for i in range(workers)]
+        try:
+            sizes = list(
+                _get_executor().map(_render_pages, repeat(digest), slices, repeat(width), repeat(height))
+            )
+        except BrokenProcessPool:
+            # a worker died, e.g. out of memory: the next request gets a new pool
+            _reset_executor()
+            raise
+        cache.added(sum(sizes))
+        logger.info(f"Rendered {len(missing)} thumbnails of {digest} with {workers} workers")
+    elif missing:
+        cache.added(_render_pages(digest, missing, width, height))
+
+    return [cache.path(digest, i, width, height) for i in range(page_count)]
@@ -14,6 +14,12 @@ urlpatterns = [
     path('download-word-file/', views.download_wordFile, name='download_wordFile'),
     path("download/", views.download_page, name="download_page"),
     path("download-file/", views.download_file, name="download_file"),
+    path("jobs/<str:job_id>/", views.job_status, name="job_status"),
+    path("jobs/<str:job_id>/result/", views.job_result, name="job_result"),
+    path("jobs/<str:job_id>/download/", views.job_download_page, name="job_download_page"),
+    path("thumbnails/<str:pdf_hash>/", views.thumbnails, name="thumbnails"),
+    path("thumbnails/<str:pdf_hash>/<int:page>/", views.thumbnail, name="thumbnail"),
+    path("metrics/", views.metrics, name="metrics"),
     path('pdf-to-jpg/', views.pdf_to_jpg_view, name='pdf_to_jpg'),
     path('download-pdf-to-jpg/', views.pdf_to_jpg_convert_view, name='pdf_to_jpg_convert_view'),
     path('jpg-to-pdf/', views.jpg_to_pdf, name='jpg_to_pdf'),
@@ -34,4 +40,5 @@ urlpatterns = [
     path('api/jpg-to-pdf/', api_views.JPGToPDFAPI.as_view()),
     path('api/html-to-pdf/', api_views.ConvertURLToPDFView.as_view()),    
     path('api/pdf-to-excel/', api_views.PDFTOExcelAPI.as_view()),
+    path('api/pipeline/', api_views.PipelineAPIView.as_view()),
 ]
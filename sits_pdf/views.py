@@ -2,10 +2,12 @@ from django.shortcuts import render, redirect
 from google_auth_oauthlib.flow import Flow
 from googleapiclient.discovery import build
 from googleapiclient.http import MediaIoBaseDownload
+import hmac
 import urllib.parse
 import qrcode
 import json
 from django.http import (
+    Http404,
     HttpResponse,
     HttpResponseNotFound,
     JsonResponse,
@@ -20,20 +22,30 @@ from .pdf_split_utils import (
     split_pdf_into_single_pages,
     split_pdf_into_multiple_files,
     extract_between_pages,
+    iter_fixed_range_files,
+    iter_single_page_files,
+    parse_page_ranges,
 )
+from .zip_stream import iter_zip
 from .support._reader import PdfReader
 from .support._writer import PdfWriter
-import zipfile
+from .support._optimizer import optimize_pdf
+from .blob_store import get_blob_store, BlobNotFound
+from .streaming import stream_blob, stream_path
+from . import ghostscript
+from .thumbnails import MAX_SIZE, get_thumbnail, get_thumbnails
+from .jobs import get_job_engine, job_progress, JobNotFound, DONE, FAILED
+from .metrics import add_bytes, snapshot, stage
 from io import BytesIO
 import os
-from .word_converter import Converter
+from .word_converter import Converter, PROFILES
+from .page.LayoutCache import LayoutCache
 from .pdf_to_image_covert import convert_from_path
-from .pdf_to_image_covert import convert_from_bytes
+from .pdf_to_image_covert import convert_from_bytes, iter_images_from_bytes, pdfinfo_from_bytes
 from .Image_pdf import convert
 from django.http import HttpResponse
 import uuid
 from django.urls import reverse
-from selenium import webdriver
 import pdfkit
 import time
 import camelot
@@ -41,9 +53,6 @@ import pandas as pd
 from django.core.files.base import ContentFile
 from django.core.files.storage import default_storage
 import logging
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.common.by import By
 import io
 import base64
 from PIL import Image
@@ -57,9 +66,8 @@ from googleapiclient.discovery import build
 from django.http import JsonResponse
 from django.views.decorators.http import require_GET
 import tempfile
-from playwright.sync_api import sync_playwright
+from .browser_pool import DEFAULT_VIEWPORT, get_browser_pool
 from datetime import datetime
-import subprocess
 import openpyxl
 from openpyxl.utils import get_column_letter
 from openpyxl.drawing.image import Image as OpenpyxlImage
@@ -92,6 +100,7 @@ def handle_drive_files(drive_file_ids, credentials, file_data):
             filename, pdf_bytes = get_drive_file(
                 file_id, credentials
             )  # Assuming `get_drive_file` uses credentials
+            add_bytes(bytes_in=len(pdf_bytes))
             if filename.endswith(".pdf"):
                 file_data = process_pdf(filename, pdf_bytes, file_data)
             else:
@@ -136,9 +145,11 @@ def handle_drive_jpg_files(drive_file_ids, credentials, file_data):
 
 def handle_dropbox_file(dropbox_file_link, file_data):
     try:
-        response = requests.get(dropbox_file_link)
-        response.raise_for_status()
-        pdf_bytes = response.content
+        with stage("download"):
+            response = requests.get(dropbox_file_link)
+            response.raise_for_status()
+            pdf_bytes = response.content
+        add_bytes(bytes_in=len(pdf_bytes))
         filename = os.path.basename(dropbox_file_link)
         file_data = process_pdf(filename, pdf_bytes, file_data)
         return {"success": True, "file_data": file_data}
@@ -169,9 +180,11 @@ def handle_url_file(url, file_data):
     filename = os.path.basename(parsed_url.path)
     if filename.endswith(".pdf"):
         try:
-            response = requests.get(url)
-            response.raise_for_status()
-            pdf_bytes = response.content
+            with stage("download"):
+                response = requests.get(url)
+                response.raise_for_status()
+                pdf_bytes = response.content
+            add_bytes(bytes_in=len(pdf_bytes))
             file_data = process_pdf(filename, pdf_bytes, file_data)
             return {"success": True, "file_data": file_data}
         except Exception as e:
@@ -282,7 +295,7 @@ def upload_pdfs(request):
             request.session["file_data"] = file_data
             filenames = [file["filename"] for file in file_data]
             return JsonResponse(
-                {"success": True, "file_data": file_data, "filenames": filenames}
+                {"success": True, "file_data": with_previews(file_data), "filenames": filenames}
             )
         else:
             return JsonResponse(
@@ -296,26 +309,31 @@ def upload_pdfs(request):
     return JsonResponse({"success": False, "error": "Invalid request method."})
 
 
-def process_pdf(filename, pdf_bytes, file_data):
-    # Convert the first page to an image
-    images = convert_from_bytes(pdf_bytes, first_page=1, last_page=1)
-    if images:
-        # Save the image to a BytesIO object
-        image_io = io.BytesIO()
-        images[0].save(image_io, format="JPEG")
-        image_io.seek(0)
+# Width in pixels of the upload preview tiles
+PREVIEW_WIDTH = 300
 
-        # Create a base64 representation of the image
-        image_base64 = base64.b64encode(image_io.getvalue()).decode()
 
+def process_pdf(filename, pdf_bytes, file_data):
+    # Keep only content hashes in the session, the bytes live in the blob store
+    store = get_blob_store()
+    with stage("store_upload"):
+        pdf_hash = store.put(pdf_bytes)
+    try:
+        # Render the first page straight at tile size
+        with stage("render_preview"):
+            preview = get_thumbnail(pdf_hash, 0, PREVIEW_WIDTH)
+    except IndexError:
+        preview = None
+    if preview:
         unique_id = str(uuid.uuid4())
 
         new_file_data = {
             "file_id": unique_id,
             "filename": filename,
             "unique_filename": f"{unique_id}-{filename}",
-            "image_data": f"data:image/jpeg;base64,{image_base64}",
-            "pdf_data": base64.b64encode(pdf_bytes).decode(),
+            "preview_hash": store.put(preview),
+            "pdf_hash": pdf_hash,
+            "size": len(pdf_bytes),
         }
 
         file_data.append(new_file_data)
@@ -323,25 +341,26 @@ def process_pdf(filename, pdf_bytes, file_data):
     return file_data
 
 def process_total_page_pdf(filename, pdf_bytes, file_data, total_pages):
-    # Convert the first page to an image
-    images = convert_from_bytes(pdf_bytes, first_page=1, last_page=1)
-    if images:
-        # Save the image to a BytesIO object
-        image_io = io.BytesIO()
-        images[0].save(image_io, format="JPEG")
-        image_io.seek(0)
-
-        # Create a base64 representation of the image
-        image_base64 = base64.b64encode(image_io.getvalue()).decode()
-
+    # Keep only content hashes in the session, the bytes live in the blob store
+    store = get_blob_store()
+    with stage("store_upload"):
+        pdf_hash = store.put(pdf_bytes)
+    try:
+        # Render the first page straight at tile size
+        with stage("render_preview"):
+            preview = get_thumbnail(pdf_hash, 0, PREVIEW_WIDTH)
+    except IndexError:
+        preview = None
+    if preview:
         unique_id = str(uuid.uuid4())
 
         new_file_data = {
             "file_id": unique_id,
             "filename": filename,
             "unique_filename": f"{unique_id}-{filename}",
-            "image_data": f"data:image/jpeg;base64,{image_base64}",
-            "pdf_data": base64.b64encode(pdf_bytes).decode(),
+            "preview_hash": store.put(preview),
+            "pdf_hash": pdf_hash,
+            "size": len(pdf_bytes),
             "total_pages": total_pages,  # Add total_pages to the file data
         }
 
@@ -350,6 +369,268 @@ def process_total_page_pdf(filename, pdf_bytes, file_data, total_pages):
     return file_data
 
 
+def with_previews(file_data):
+    """Return a copy of session ``file_data`` with the preview images inlined as
+    data URLs, ready to be sent to the browser."""
+    store = get_blob_store()
+    result = []
+    for file in file_data:
+        file = dict(file)
+        preview_hash = file.get("preview_hash")
+        if preview_hash and store.exists(preview_hash):
+            image_base64 = base64.b64encode(store.get(preview_hash)).decode()
+            file["image_data"] = f"data:image/jpeg;base64,{image_base64}"
+        result.append(file)
+    return result
+
+
+def read_pdf(file_info):
+    """Load the uploaded PDF bytes referenced by a session ``file_data`` entry."""
+    return get_blob_store().get(file_info["pdf_hash"])
+
+
+def store_result(request, data, file_name, file_type):
+    """Put a conversion result into the blob store and remember it in the session
+    for ``download_file``. ``data`` is either bytes or an iterable of chunks."""
+    store = get_blob_store()
+    with stage("store_result"):
+        if isinstance(data, bytes):
+            request.session["file_hash"] = store.put(data)
+        else:
+            request.session["file_hash"] = store.put_chunks(data)
+    request.session["file_name"] = file_name
+    request.session["file_type"] = file_type
+
+
+DOCX_TYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+XLSX_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+# download page context of every background job kind
+JOB_PAGES = {
+    "pdf_to_word": {
+        "operation": "converted to editable WORD Document",
+        "process": "converted",
+        "file_type": "PDF",
+        "additional": "",
+        "files": "Word",
+        "page": "Convert PDF to Word",
+    },
+    "pdf_to_excel": {
+        "operation": "converted to editable EXCEL Spreadsheet",
+        "process": "converted",
+        "file_type": "PDF",
+        "additional": "",
+        "files": "Excel",
+        "page": "Convert PDF to Excel",
+    },
+    "compress": {
+        "operation": "compressed",
+        "process": "compressed",
+        "file_type": "PDF",
+        "additional": "",
+        "files": "PDF",
+        "page": "Compress PDFs",
+    },
+    "html_to_pdf": {
+        "operation": "converted to selectable PDF",
+        "process": "converted",
+        "file_type": "HTML",
+        "additional": "",
+        "files": "PDF",
+        "page": "Convert HTML to PDF",
+    },
+}
+
+
+def make_qr_code_data(url):
+    qr_code_img = qrcode.make(url)
+    qr_code_buffer = io.BytesIO()
+    qr_code_img.save(qr_code_buffer, format="PNG")
+    qr_code_base64 = base64.b64encode(qr_code_buffer.getvalue()).decode()
+    return f"data:image/png;base64,{qr_code_base64}"
+
+
+def job_submitted(request, kind, params):
+    """Queue a background job and answer at once: JSON clients get the job id
+    and polling URLs, browsers get a page polling the job status."""
+    job_id = get_job_engine().submit(kind, params)
+    logger.info(f"Queued {kind} job {job_id}.")
+
+    if "application/json" in request.headers.get("Accept", ""):
+        return JsonResponse(
+            {
+                "success": True,
+                "job_id": job_id,
+                "status_url": reverse("job_status", args=[job_id]),
+                "result_url": reverse("job_result", args=[job_id]),
+            },
+            status=202,
+        )
+
+    return render(
+        request,
+        "download_page/processing.html",
+        {"job_id": job_id, "page": JOB_PAGES[kind]["page"]},
+    )
+
+
+def get_job_or_404(job_id):
+    try:
+        return get_job_engine().queue.get(job_id)
+    except JobNotFound:
+        raise Http404("Job not found.")
+
+
+def job_status(request, job_id):
+    job = get_job_or_404(job_id)
+    response = {
+        "success": job["status"] != FAILED,
+        "job_id": job_id,
+        "kind": job["kind"],
+        "status": job["status"],
+        "stage": job["stage"],
+        "step": job["step"],
+        "total": job["total"],
+        "progress": round(job_progress(job) * 100),
+    }
+    if job["status"] == DONE:
+        response["result_url"] = reverse("job_result", args=[job_id])
+        response["download_page_url"] = reverse("job_download_page", args=[job_id])
+    elif job["status"] == FAILED:
+        response["error"] = job["error"]
+    return JsonResponse(response)
+
+
+def job_result(request, job_id):
+    job = get_job_or_404(job_id)
+    if job["status"] != DONE:
+        return JsonResponse(
+            {"success": False, "error": f"Job is {job['status']}."}, status=409
+        )
+    try:
+        return stream_blob(
+            request, job["result_hash"], job["result_type"], job["result_name"]
+        )
+    except BlobNotFound:
+        return HttpResponse("File not found.", status=404)
+
+
+def thumbnail_box(request):
+    """Read the ``w``/``h`` pixel box of a thumbnail request. Missing sides are
+    None; raises ``ValueError`` for sizes out of range."""
+    box = []
+    for name in ("w", "h"):
+        value = request.GET.get(name)
+        value = int(value) if value else None
+        if value is not None and not 0 < value <= MAX_SIZE:
+            raise ValueError(f"{name} must be between 1 and {MAX_SIZE}")
+        box.append(value)
+    return tuple(box)
+
+
+@require_GET
+def thumbnail(request, pdf_hash, page):
+    """JPEG thumbnail of one page (1-based) of an uploaded PDF."""
+    try:
+        width, height = thumbnail_box(request)
+    except ValueError as e:
+        return HttpResponseBadRequest(str(e))
+    if page < 1 or not get_blob_store().exists(pdf_hash):
+        raise Http404("Page not found")
+    try:
+        data = get_thumbnail(pdf_hash, page - 1, width, height)
+    except (BlobNotFound, IndexError):
+        raise Http404("Page not found")
+
+    response = HttpResponse(data, content_type="image/jpeg")
+    # the URL embeds the content hash, so the image never changes
+    response["Cache-Control"] = "public, max-age=31536000, immutable"
+    return response
+
+
+@require_GET
+def thumbnails(request, pdf_hash):
+    """Render the thumbnails of every page in parallel and list their URLs,
+    for the drag-reorder page grid."""
+    try:
+        width, height = thumbnail_box(request)
+    except ValueError as e:
+        return JsonResponse({"success": False, "error": str(e)}, status=400)
+    if not get_blob_store().exists(pdf_hash):
+        return JsonResponse({"success": False, "error": "File not found."}, status=404)
+
+    try:
+        pages = get_thumbnails(pdf_hash, width, height)
+    except Exception as e:
+        logger.error(f"Error rendering thumbnails: {str(e)}", exc_info=True)
+        return JsonResponse({"success": False, "error": "Failed to render thumbnails."}, status=500)
+
+    query = request.GET.urlencode()
+    return JsonResponse(
+        {
+            "success": True,
+            "total_pages": len(pages),
+            "thumbnails": [
+                {
+                    "page": i,
+                    "url": reverse("thumbnail", args=[pdf_hash, i])
+                    + (f"?{query}" if query else ""),
+                }
+                for i in range(1, len(pages) + 1)
+            ],
+        }
+    )
+
+
+def metrics_allowed(request) -> bool:
+    """Whether ``request`` may read the metrics: a staff user, or a client
+    sending ``Authorization: Bearer <METRICS_TOKEN>`` when the token is set.
+    ``REMOTE_ADDR`` is not trusted, behind a reverse proxy every request
+    comes from the proxy, usually 127.0.0.1."""
+    user = getattr(request, "user", None)
+    if user is not None and user.is_active and user.is_staff:
+        return True
+    token = getattr(settings, "METRICS_TOKEN", None)
+    header = request.META.get("HTTP_AUTHORIZATION", "")
+    scheme, _, credentials = header.partition(" ")
+    return bool(token) and scheme.lower() == "bearer" and hmac.compare_digest(
+        credentials.strip().encode(), token.encode()
+    )
+
+
+@require_GET
+def metrics(request):
+    """Per-operation request histograms of this process, see ``metrics_allowed``."""
+    if not metrics_allowed(request):
+        raise Http404("Page not found")
+    return JsonResponse({"operations": snapshot()})
+
+
+def job_download_page(request, job_id):
+    job = get_job_or_404(job_id)
+    if job["status"] == FAILED:
+        return render(request, "error_page.html", {"error_message": job["error"]})
+    if job["status"] != DONE:
+        return render(
+            request,
+            "download_page/processing.html",
+            {"job_id": job_id, "page": JOB_PAGES[job["kind"]]["page"]},
+        )
+
+    # keep the session based download flow working for finished jobs
+    request.session["file_hash"] = job["result_hash"]
+    request.session["file_name"] = job["result_name"]
+    request.session["file_type"] = job["result_type"]
+
+    qr_code_data = make_qr_code_data(
+        request.build_absolute_uri(reverse("job_result", args=[job_id]))
+    )
+    request.session["qr_code_data"] = qr_code_data
+
+    context = dict(JOB_PAGES[job["kind"]], qr_code_data=qr_code_data)
+    context.update(job["meta"])
+    return render(request, "download_page/download.html", context)
+
 
 def process_image(filename, image_data, file_data):
     # Convert the image data to a BytesIO object
@@ -386,7 +667,7 @@ def remove_file(request):
             for file in file_data
         ]
         return JsonResponse(
-            {"success": True, "file_data": file_data, "filenames": filenames}
+            {"success": True, "file_data": with_previews(file_data), "filenames": filenames}
         )
 
     return JsonResponse({"success": False, "error": "Invalid request"})
@@ -409,9 +690,7 @@ def merge_pdfs(request):
                     (file for file in file_data if file["filename"] == filename), None
                 )
                 if pdf_data:
-                    # Decode the base64 PDF data back to bytes
-                    pdf_bytes = base64.b64decode(pdf_data["pdf_data"])
-                    pdf_io = io.BytesIO(pdf_bytes)
+                    pdf_io = io.BytesIO(read_pdf(pdf_data))
                     merger.append(pdf_io)
                     logger.info(f"Appended {filename} to merger.")
                 else:
@@ -421,9 +700,7 @@ def merge_pdfs(request):
             merger.write(output)
             output.seek(0)
 
-            request.session["file_value"] = base64.b64encode(output.getvalue()).decode()
-            request.session["file_type"] = "application/pdf"
-            request.session["file_name"] = "merged.pdf"
+            store_result(request, output.getvalue(), "merged.pdf", "application/pdf")
 
         except Exception as e:
             logger.error(f"Error merging PDFs: {str(e)}", exc_info=True)
@@ -541,7 +818,7 @@ def upload_split_pdf(request):
         if file_data:
             logger.info("Successfully processed all PDF files.")
             request.session["file_data"] = file_data  # Store file_data in session
-            return JsonResponse({"success": True, "file_data": file_data})
+            return JsonResponse({"success": True, "file_data": with_previews(file_data)})
         else:
             logger.warning("No valid PDF files were uploaded.")
             return JsonResponse(
@@ -563,103 +840,72 @@ def split_pdf(request):
 
         try:
             filename = file_data[0]["filename"]
-            pdf_bytes = base64.b64decode(file_data[0]["pdf_data"])
+            pdf_bytes = read_pdf(file_data[0])
             split_type = request.POST.get("split_type")
 
-            with BytesIO(pdf_bytes) as f:
-                pdf = PdfReader(f)
-                num_pages = len(pdf.pages)
-
-                if split_type == "custom":
-                    start_page = int(request.POST.get("start_page"))
-                    end_page = int(request.POST.get("end_page"))
-                    writer = PdfWriter()
-                    for i in range(start_page - 1, end_page):
-                        writer.add_page(pdf.pages[i])
-                    output_pdf = BytesIO()
-                    writer.write(output_pdf)
-                    output_pdf.seek(0)
-                    output_data = output_pdf.getvalue()
-                    output_filename = f"extracted_pages_{start_page}_{end_page}.pdf"
-                    output_type = "application/pdf"
-
-                elif split_type == "fixed_range":
+            pdf = PdfReader(BytesIO(pdf_bytes))
+            num_pages = len(pdf.pages)
+
+            if split_type == "custom":
+                start_page = int(request.POST.get("start_page"))
+                end_page = int(request.POST.get("end_page"))
+                writer = PdfWriter()
+                for i in range(start_page - 1, end_page):
+                    writer.add_page(pdf.pages[i])
+                output_pdf = BytesIO()
+                writer.write(output_pdf)
+                output_pdf.seek(0)
+                output_data = output_pdf.getvalue()
+                output_filename = f"extracted_pages_{start_page}_{end_page}.pdf"
+                output_type = "application/pdf"
+
+            elif split_type == "fixed_range":
+                # parts are generated and zipped one at a time
+                try:
                     pages_per_file = int(request.POST.get("pages_per_file"))
-                    num_files = -(-num_pages // pages_per_file)
-                    pdf_files = []
-                    for i in range(num_files):
-                        writer = PdfWriter()
-                        for j in range(pages_per_file):
-                            page_num = i * pages_per_file + j
-                            if page_num < num_pages:
-                                writer.add_page(pdf.pages[page_num])
-                        output_pdf = BytesIO()
-                        writer.write(output_pdf)
-                        output_pdf.seek(0)
-                        pdf_files.append(output_pdf.getvalue())
-
-                    zip_buffer = BytesIO()
-                    with zipfile.ZipFile(zip_buffer, "w") as zip_file:
-                        for i, pdf_file in enumerate(pdf_files):
-                            zip_file.writestr(
-                                f"{os.path.splitext(filename)[0]}_part_{i+1}.pdf",
-                                pdf_file,
-                            )
-                    zip_buffer.seek(0)
-                    output_data = zip_buffer.getvalue()
-                    output_filename = f"split_files_{filename}.zip"
-                    output_type = "application/zip"
-
-                elif split_type == "all_pages":
-                    zip_buffer = BytesIO()
-                    with zipfile.ZipFile(zip_buffer, "w") as zip_file:
-                        for i in range(num_pages):
-                            writer = PdfWriter()
-                            writer.add_page(pdf.pages[i])
-                            pdf_data = BytesIO()
-                            writer.write(pdf_data)
-                            pdf_data.seek(0)
-                            zip_file.writestr(f"page_{i+1}.pdf", pdf_data.getvalue())
-                    zip_buffer.seek(0)
-                    output_data = zip_buffer.getvalue()
-                    output_filename = "single_pages.zip"
-                    output_type = "application/zip"
-
-                elif split_type == "selected_pages":
-                    pages_to_extract = request.POST.get("pages_to_extract")
-                    writer = PdfWriter()
-                    pages_to_extract_list = []
-                    for page_range in pages_to_extract.split(","):
-                        page_range = page_range.strip()
-                        if "-" in page_range:
-                            start, end = map(int, page_range.split("-"))
-                            pages_to_extract_list.extend(range(start, end + 1))
-                        else:
-                            pages_to_extract_list.append(int(page_range))
-                    for page_num in pages_to_extract_list:
-                        if 1 <= page_num <= num_pages:
-                            writer.add_page(pdf.pages[page_num - 1])
-                        else:
-                            return render(request, 'error_page.html', {
-                                'error_message': f"Error splitting PDF : Invalid page number "
-                            })
-                    output_pdf = BytesIO()
-                    writer.write(output_pdf)
-                    output_pdf.seek(0)
-                    output_data = output_pdf.getvalue()
-                    output_filename = "extracted_pages.pdf"
-                    output_type = "application/pdf"
-
-                else:
+                except (TypeError, ValueError):
+                    pages_per_file = 0
+                if pages_per_file < 1:
                     return JsonResponse(
-                        {"success": False, "error": "Invalid split type"}
+                        {"success": False, "error": "pages_per_file must be a positive integer"}
+                    )
+                output_data = iter_zip(
+                    iter_fixed_range_files(
+                        pdf, pages_per_file, os.path.splitext(filename)[0]
                     )
+                )
+                output_filename = f"split_files_{filename}.zip"
+                output_type = "application/zip"
+
+            elif split_type == "all_pages":
+                output_data = iter_zip(iter_single_page_files(pdf))
+                output_filename = "single_pages.zip"
+                output_type = "application/zip"
+
+            elif split_type == "selected_pages":
+                pages_to_extract = request.POST.get("pages_to_extract")
+                writer = PdfWriter()
+                pages_to_extract_list = parse_page_ranges(pages_to_extract)
+                for page_num in pages_to_extract_list:
+                    if 1 <= page_num <= num_pages:
+                        writer.add_page(pdf.pages[page_num - 1])
+                    else:
+                        return render(request, 'error_page.html', {
+                            'error_message': f"Error splitting PDF : Invalid page number "
+                        })
+                output_pdf = BytesIO()
+                writer.write(output_pdf)
+                output_pdf.seek(0)
+                output_data = output_pdf.getvalue()
+                output_filename = "extracted_pages.pdf"
+                output_type = "application/pdf"
 
-            request.session["file_value"] = base64.b64encode(output_data).decode(
-                "utf-8"
-            )
-            request.session["file_name"] = output_filename
-            request.session["file_type"] = output_type
+            else:
+                return JsonResponse(
+                    {"success": False, "error": "Invalid split type"}
+                )
+
+            store_result(request, output_data, output_filename, output_type)
 
             logger.info("PDF split process completed successfully.")
 
@@ -770,7 +1016,7 @@ def upload_compress_pdf(request):
         if file_data:
             logger.info("Successfully processed all PDF files.")
             request.session["file_data"] = file_data  # Store file_data in session
-            return JsonResponse({"success": True, "file_data": file_data})
+            return JsonResponse({"success": True, "file_data": with_previews(file_data)})
         else:
             logger.warning("No valid PDF files were uploaded.")
             return JsonResponse(
@@ -782,141 +1028,62 @@ def upload_compress_pdf(request):
 
 
 
-def compress_pdf_in_memory(pdf_bytes, quality='ebook'):
-    gs_path = "C:/Program Files/gs/gs10.03.1/bin/gswin64c.exe"
-    
-    # Create in-memory file objects
-    input_pdf = io.BytesIO(pdf_bytes)
-    output_pdf = io.BytesIO()
-
-    command = [
-        gs_path,
-        "-sDEVICE=pdfwrite",
-        "-dCompatibilityLevel=1.4",
-        f"-dPDFSETTINGS=/{quality}",
-        "-dNOPAUSE",
-        "-dQUIET",
-        "-dBATCH",
-        "-sOutputFile=%stdout%",  # Output to stdout to capture in memory
-        "-",
-    ]
-
-    # Run the Ghostscript command and capture the output in memory
-    process = subprocess.run(command, input=input_pdf.read(), stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-
-    if process.returncode != 0:
-        raise RuntimeError(f"Ghostscript failed with error: {process.stderr.decode()}")
-
-    # Write the output to the output_pdf BytesIO object
-    output_pdf.write(process.stdout)
-    output_pdf.seek(0)
-
-    # Get the sizes of the original and compressed PDFs
+# Image resolution used by the native optimizer for each Ghostscript preset
+NATIVE_IMAGE_DPI = {"screen": 72, "ebook": 150, "printer": 300, "prepress": 300}
+
+
+def compress_pdf_in_memory(pdf_bytes, quality='ebook', timeout=None, engine=None):
+    """Compress a PDF with Ghostscript (``engine="ghostscript"``) or with the
+    in-process optimizer (``"native"``), by default ``PDF_COMPRESSION_ENGINE``.
+    The smallest candidate is returned, never a file bigger than the input."""
+    engine = engine or getattr(settings, "PDF_COMPRESSION_ENGINE", "ghostscript")
     original_size = len(pdf_bytes)
-    compressed_size = len(output_pdf.getvalue())
+    candidates = [pdf_bytes]
 
-    # If compression didn't reduce the file size by at least 1%, apply minimal compression
-    if compressed_size >= original_size * 0.99:
-        # Read the original PDF
-        reader = PdfReader(input_pdf)
-        writer = PdfWriter()
+    if engine == "ghostscript":
+        if timeout is None:
+            timeout = getattr(settings, "GHOSTSCRIPT_TIMEOUT", ghostscript.DEFAULT_TIMEOUT)
+        try:
+            candidates.append(ghostscript.compress(pdf_bytes, quality, timeout))
+        except ghostscript.GhostscriptNotFound:
+            logger.warning("Ghostscript not found, using the native PDF optimizer")
+            engine = "native"
 
-        # Copy pages from reader to writer
-        for page in reader.pages:
-            writer.add_page(page)
+    # If Ghostscript didn't reduce the file size by at least 1%, optimize natively
+    if engine == "native" or len(candidates[-1]) >= original_size * 0.99:
+        try:
+            candidates.append(
+                optimize_pdf(pdf_bytes, image_dpi=NATIVE_IMAGE_DPI.get(quality))
+            )
+        except Exception as e:
+            logger.warning(f"Native PDF optimization failed: {str(e)}")
+
+    compressed = min(candidates, key=len)
+    logger.info(f"File compressed: {len(compressed)} bytes (original: {original_size} bytes)")
+    return compressed
+
+def format_size(size):
+    if size < 1024 * 1024:  # If the size is less than 1 MB (in KB range)
+        return f"{round(size / 1024, 2)} KB"
+    return f"{round(size / 1024 / 1024, 2)} MB"
 
-        # Apply minimal compression settings
-        writer.add_metadata(reader.metadata)
-        
-        # Save the minimally compressed file to a new BytesIO object
-        minimal_compressed_pdf = io.BytesIO()
-        writer.write(minimal_compressed_pdf)
-        minimal_compressed_pdf.seek(0)
-        
-        # Check the new file size
-        new_compressed_size = len(minimal_compressed_pdf.getvalue())
-        
-        # If still not compressed, force 1% reduction
-        if new_compressed_size >= original_size:
-            # Reduce content by 1%
-            reduced_content = pdf_bytes[:int(len(pdf_bytes) * 0.99)]
-            
-            print(f"File forcibly reduced by 1%: {len(reduced_content)} bytes (original: {original_size} bytes)")
-            return reduced_content
-        else:
-            print(f"File minimally compressed: {new_compressed_size} bytes (original: {original_size} bytes)")
-            return minimal_compressed_pdf.getvalue()
-    else:
-        print(f"File successfully compressed: {compressed_size} bytes (original: {original_size} bytes)")
-        return output_pdf.getvalue()
 
 def compress_pdfs(request):
     if request.method == "POST":
         try:
             file_data = request.session.get("file_data", [])
 
-            compressed_files = []
-
             if not file_data:
                 return JsonResponse(
                     {"success": False, "error": "No file_data found in session"}
                 )
 
-            for file in file_data:
-                pdf_bytes = base64.b64decode(file["pdf_data"])
-                original_size = len(pdf_bytes)
-                if original_size < 1024 * 1024:  # If the size is less than 1 MB (in KB range)
-                    original_kb_or_mb = original_size / 1024
-                    original_unit = "KB"
-                else:  # If the size is 1 MB or larger
-                    original_kb_or_mb = (original_size / 1024) / 1024  # Convert to MB
-                    original_unit = "MB"
-                compressed_pdf_bytes = compress_pdf_in_memory(pdf_bytes, quality='ebook')
-                compressed_size = len(compressed_pdf_bytes)
-                if compressed_size < 1024 * 1024:  # If the size is less than 1 MB (in KB range)
-                    compressed_kb_or_mb = compressed_size / 1024
-                    compressed_unit = "KB"
-                else:  # If the size is 1 MB or larger
-                    compressed_kb_or_mb = (compressed_size / 1024) / 1024  # Convert to MB
-                    compressed_unit = "MB"
-                compression_ratio = (1 - compressed_size / original_size) * 100
-                compression_ratio_percentage = round(compression_ratio, 2)
-
-                request.session["file_value"] = base64.b64encode(
-                    compressed_pdf_bytes
-                ).decode("utf-8")
-                request.session["file_name"] = "compress.pdf"
-                request.session["file_type"] = "application/pdf"
-
-                request.session.pop("file_data", None)
-
-            logger.info("PDF merge process completed successfully.")
-
-            qr_code_url = request.build_absolute_uri(reverse("download_file"))
-            qr_code_img = qrcode.make(qr_code_url)
-            qr_code_buffer = io.BytesIO()
-            qr_code_img.save(qr_code_buffer, format="PNG")
-            qr_code_base64 = base64.b64encode(qr_code_buffer.getvalue()).decode()
-
-            request.session["qr_code_data"] = f"data:image/png;base64,{qr_code_base64}"
-            qr_code_data = f"data:image/png;base64,{qr_code_base64}"
-
-            return render(
-                request,
-                "download_page/download.html",
-                {
-                    "operation": "compressed",
-                    "process": "compressed",
-                    "file_type": "PDF",
-                    "additional": "",
-                    "files": "PDF",
-                    "page": "Compress PDFs",
-                    "qr_code_data": qr_code_data,
-                    "compressed_size": f"{round(compressed_kb_or_mb, 2)} {compressed_unit}",
-                    "original_size": f"{round(original_kb_or_mb, 2)} {original_unit}",
-                    "compression_ratio_percentage": f"{round(compression_ratio_percentage)}",
-                },
-            )
+            params = {
+                "pdf_hashes": [file["pdf_hash"] for file in file_data],
+                "filenames": [file["filename"] for file in file_data],
+            }
+            request.session.pop("file_data", None)
+            return job_submitted(request, "compress", params)
 
         except Exception as e:
             logger.error(f"Error compressing PDFs: {str(e)}", exc_info=True)
@@ -995,7 +1162,7 @@ def pdf_to_word(request):
         if file_data:
             logger.info("Successfully processed all PDF files.")
             request.session["file_data"] = file_data
-            return JsonResponse({"success": True, "file_data": file_data})
+            return JsonResponse({"success": True, "file_data": with_previews(file_data)})
         else:
             return JsonResponse(
                 {
@@ -1018,45 +1185,12 @@ def download_wordFile(request):
 
             # Assume we're working with the first file if multiple files were uploaded
             file_info = file_data[0]
-
-            pdf_bytes = base64.b64decode(file_info["pdf_data"])
-            pdf_filename = file_info["filename"]
-
-            # Convert PDF to Word
-            docx_bytes = convert_pdf_to_docx(pdf_bytes)
-
-            # Store the converted file in session
-            request.session["file_value"] = base64.b64encode(docx_bytes).decode("utf-8")
-            request.session["file_name"] = pdf_filename.replace(".pdf", ".docx")
-            request.session["file_type"] = (
-                "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
-            )
+            params = {"pdf_hash": file_info["pdf_hash"], "filename": file_info["filename"]}
 
             # Clear the original PDF data from session
             request.session.pop("file_data", None)
 
-            # Generate QR code
-            qr_code_url = request.build_absolute_uri(reverse("download_file"))
-            qr_code_img = qrcode.make(qr_code_url)
-            qr_code_buffer = io.BytesIO()
-            qr_code_img.save(qr_code_buffer, format="PNG")
-            qr_code_base64 = base64.b64encode(qr_code_buffer.getvalue()).decode()
-
-            qr_code_data = f"data:image/png;base64,{qr_code_base64}"
-
-            return render(
-                request,
-                "download_page/download.html",
-                {
-                    "operation": "converted to editable WORD Document",
-                    "process": "converted",
-                    "file_type": "PDF",
-                    "additional": "",
-                    "files": "Word",
-                    "page": "Convert PDF to Word",
-                    "qr_code_data": qr_code_data,
-                },
-            )
+            return job_submitted(request, "pdf_to_word", params)
 
         except Exception as e:
             logger.error(f"Error converting PDF to Word: {str(e)}", exc_info=True)
@@ -1067,35 +1201,33 @@ def download_wordFile(request):
         return redirect("pdf_to_word")
 
 
-def convert_pdf_to_docx(pdf_bytes):
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as temp_pdf:
-        # Write PDF bytes to a temporary file
-        temp_pdf.write(pdf_bytes)
-        temp_pdf.flush()
-        temp_pdf_path = temp_pdf.name
+_layout_cache = None
 
-    try:
-        # Create a temporary file for the DOCX output
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".docx") as temp_docx:
-            temp_docx_path = temp_docx.name
 
-        # Convert PDF to Word
-        cv = Converter(temp_pdf_path)
-        cv.convert(temp_docx_path)
-        cv.close()
+def get_layout_cache():
+    """Return the process-wide page layout cache rooted at ``LAYOUT_CACHE_ROOT``
+    and bounded by ``LAYOUT_CACHE_MAX_BYTES``, or None if it is disabled."""
+    global _layout_cache
+    root = getattr(settings, "LAYOUT_CACHE_ROOT", None)
+    if root and _layout_cache is None:
+        _layout_cache = LayoutCache(root, getattr(settings, "LAYOUT_CACHE_MAX_BYTES", 512 * 1024 * 1024))
+    return _layout_cache
 
-        # Read the converted DOCX file
-        with open(temp_docx_path, "rb") as docx_file:
-            docx_bytes = docx_file.read()
 
-        return docx_bytes
+def convert_pdf_to_docx(pdf_bytes, progress=None, output=None, multi_processing=True, profile="full"):
+    # The document is written to the binary file object ``output`` if given,
+    # otherwise it is returned as bytes. With ``multi_processing`` the pages
+    # are parsed by the converter's process pool, shared by all requests.
+    # ``profile`` is one of ``PROFILES``, e.g. "text_only" skips images
+    docx_io = io.BytesIO() if output is None else output
 
+    cv = Converter(stream=pdf_bytes, progress=progress, layout_cache=get_layout_cache())
+    try:
+        cv.convert(docx_io, multi_processing=multi_processing, profile=profile)
     finally:
-        # Clean up temporary files
-        if os.path.exists(temp_pdf_path):
-            os.unlink(temp_pdf_path)
-        if os.path.exists(temp_docx_path):
-            os.unlink(temp_docx_path)
+        cv.close()
+
+    return docx_io.getvalue() if output is None else None
 
 
 def pdf_to_jpg_view(request):
@@ -1114,7 +1246,8 @@ def pdf_to_jpg_view(request):
                 file_data.append(
                     {
                         "filename": filename,
-                        "pdf_bytes": base64.b64encode(pdf_bytes).decode(),
+                        "pdf_hash": get_blob_store().put(pdf_bytes),
+                        "size": len(pdf_bytes),
                     }
                 )
             except Exception as e:
@@ -1168,7 +1301,7 @@ def pdf_to_jpg_view(request):
         if file_data:
             logger.info("Successfully processed the PDF file.")
             request.session["file_data"] = file_data
-            return JsonResponse({"success": True, "file_data": file_data})
+            return JsonResponse({"success": True, "file_data": with_previews(file_data)})
         else:
             return JsonResponse(
                 {
@@ -1180,6 +1313,18 @@ def pdf_to_jpg_view(request):
     return JsonResponse({"success": False, "error": "Invalid request method."})
 
 
+def encode_jpeg(image):
+    with stage("encode"):
+        image_io = io.BytesIO()
+        image.save(image_io, format="JPEG", quality=95)
+        return image_io.getvalue()
+
+
+def iter_jpeg_files(pdf_bytes):
+    for i, image in enumerate(iter_images_from_bytes(pdf_bytes)):
+        yield f"page_{i+1}.jpg", encode_jpeg(image)
+
+
 def pdf_to_jpg_convert_view(request):
     if request.method == "POST":
         try:
@@ -1190,40 +1335,23 @@ def pdf_to_jpg_convert_view(request):
                 )
 
             file_info = file_data[0]
-            pdf_bytes = base64.b64decode(file_info["pdf_data"])
+            pdf_bytes = read_pdf(file_info)
             pdf_filename = file_info["filename"]
-            images = convert_from_bytes(pdf_bytes)
-
-            num_images = len(images)
+            num_images = pdfinfo_from_bytes(pdf_bytes)["Pages"]
 
             if num_images == 1:
                 # Single page PDF
-                image_io = io.BytesIO()
-                images[0].save(image_io, format="JPEG", quality=95)
-                image_io.seek(0)
-
-                file_value = base64.b64encode(image_io.getvalue()).decode()
+                file_value = encode_jpeg(convert_from_bytes(pdf_bytes)[0])
                 file_type = "image/jpeg"
                 file_name = "converted_page.jpg"
             else:
-                # Multi-page PDF
-                zip_io = io.BytesIO()
-                with zipfile.ZipFile(zip_io, "w") as zip_file:
-                    for i, image in enumerate(images):
-                        image_io = io.BytesIO()
-                        image.save(image_io, format="JPEG", quality=95)
-                        image_io.seek(0)
-                        zip_file.writestr(f"page_{i+1}.jpg", image_io.getvalue())
-
-                zip_io.seek(0)
-                file_value = base64.b64encode(zip_io.getvalue()).decode()
+                # Multi-page PDF: render and zip one page at a time
+                file_value = iter_zip(iter_jpeg_files(pdf_bytes))
                 file_type = "application/zip"
                 file_name = "converted_pages.zip"
 
             # Store file information in session
-            request.session["file_value"] = file_value
-            request.session["file_type"] = file_type
-            request.session["file_name"] = file_name
+            store_result(request, file_value, file_name, file_type)
 
             qr_code_url = request.build_absolute_uri(reverse("download_file"))
             qr_code_img = qrcode.make(qr_code_url)
@@ -1367,13 +1495,7 @@ def jpg_to_pdf_convert_view(request):
             )
             pdf_io.seek(0)
 
-            file_value = base64.b64encode(pdf_io.getvalue()).decode()
-            file_type = "application/pdf"
-            file_name = "converted.pdf"
-
-            request.session["file_value"] = file_value
-            request.session["file_type"] = file_type
-            request.session["file_name"] = file_name
+            store_result(request, pdf_io.getvalue(), "converted.pdf", "application/pdf")
 
             qr_code_url = request.build_absolute_uri(reverse("download_file"))
             qr_code_img = qrcode.make(qr_code_url)
@@ -1415,35 +1537,34 @@ def convert_url_to_pdf(request):
         print("url_to_fetch", url_to_fetch)
         if not url_to_fetch:
             return JsonResponse({"success": False, "error": "URL not provided"})
-        width = int(request.POST.get("width", 0))
+        width = int(request.POST.get("width", 0)) or DEFAULT_VIEWPORT["width"]
         print("width", width)
+        paper_format = request.POST.get("paper_format") or "A4"
+        landscape = request.POST.get("orientation") == "landscape"
         try:
-            driver = webdriver.Firefox()
-            driver.get(url_to_fetch)
-            time.sleep(0)
-            total_width = width
-            total_height = 16000
-
-            driver.set_window_size(total_width, total_height)
-
-            # Take the full-page screenshot
-            screenshot = driver.get_screenshot_as_png()
-            driver.quit()
+            # the PDF is printed by the job, with the margin chosen at that point
+            result = get_browser_pool().render(url_to_fetch, screenshot_width=width)
 
-            file_data = [
+            request.session["file_data"] = [
                 {
-                    "preview_image": base64.b64encode(screenshot).decode("utf-8"),
                     "url": url_to_fetch,
                     "width": width,
+                    "preview_hash": get_blob_store().put(result.screenshot),
+                    "paper_format": paper_format,
+                    "landscape": landscape,
                 }
             ]
-            
-            request.session["file_data"] = file_data
-            print("file_data",file_data)
 
             request.session["url"] = url_to_fetch
             print("url_to_fetch", url_to_fetch)
 
+            file_data = [
+                {
+                    "preview_image": base64.b64encode(result.screenshot).decode("utf-8"),
+                    "url": url_to_fetch,
+                    "width": width,
+                }
+            ]
             return JsonResponse({"success": True, "file_data": file_data})
         except Exception as e:
             return JsonResponse({"success": False, "error": str(e)})
@@ -1451,6 +1572,30 @@ def convert_url_to_pdf(request):
     return JsonResponse({"success": False, "error": "Invalid request method"})
 
 
+MARGINS = {"none": 0, "small": 0.5, "large": 1}
+
+
+def pdf_print_options(paper_format, margin=0, landscape=False):
+    """Arguments of Playwright's ``page.pdf``, margins in cm."""
+    return {
+        "format": paper_format,
+        "print_background": True,
+        "margin": {
+            "top": f"{margin}cm",
+            "bottom": f"{margin}cm",
+            "left": f"{margin}cm",
+            "right": f"{margin}cm",
+        },
+        "landscape": landscape,
+    }
+
+
+def render_url_to_pdf(url, paper_format, margin=0, landscape=False):
+    """Print a web page to PDF with a pooled headless Chromium."""
+    options = pdf_print_options(paper_format, margin, landscape)
+    return get_browser_pool().render(url, pdf_options=[options]).pdfs[0]
+
+
 def convert_url_to_pdf_convert_view(request):
     url_to_fetch = request.session.get("url")
     print("url_to_fetch",url_to_fetch)
@@ -1461,77 +1606,22 @@ def convert_url_to_pdf_convert_view(request):
         margin = request.POST.get("margin")
         print("margin", margin)
 
-        if margin == "none":
-            top_margin = 0
-            bottom_margin = 0
-            left_margin = 0
-            right_margin = 0
-        elif margin == "small":
-            top_margin = 0.5
-            bottom_margin = 0.5
-            left_margin = 0.5
-            right_margin = 0.5
-        elif margin == "large":
-            top_margin = 1
-            bottom_margin = 1
-            left_margin = 1
-            right_margin = 1
-
         if url_to_fetch and paper_format:
-            try:
-
-                with sync_playwright() as p:
-                    browser_type = p.chromium
-                    browser = browser_type.launch(headless=True)
-                    context = browser.new_context()
-                    page = context.new_page()
-                    page.goto(url_to_fetch)
-                    page.wait_for_load_state("networkidle")
-
-                    # Generate a PDF from the webpage
-                    pdf = page.pdf(
-                        format=paper_format,
-                        print_background=True,
-                        margin={
-                            "top": f"{top_margin}cm",
-                            "bottom": f"{bottom_margin}cm",
-                            "left": f"{left_margin}cm",
-                            "right": f"{right_margin}cm",
-                        },
-                    )
-
-                    request.session["file_value"] = base64.b64encode(pdf).decode(
-                        "utf-8"
-                    )
-                    request.session["file_type"] = "application/pdf"
-                    request.session["file_name"] = "converted.pdf"
-
-                    browser.close()
-
-                qr_code_url = request.build_absolute_uri(reverse("download_file"))
-                qr_code_img = qrcode.make(qr_code_url)
-                qr_code_buffer = io.BytesIO()
-                qr_code_img.save(qr_code_buffer, format="PNG")
-                qr_code_base64 = base64.b64encode(qr_code_buffer.getvalue()).decode()
-
-                request.session["qr_code_data"] = f"data:image/png;base64,{qr_code_base64}"
-                qr_code_data = f"data:image/png;base64,{qr_code_base64}"
-
-                return render(
-                    request,
-                    "download_page/download.html",
-                    {
-                        "operation": "converted to selectable PDF",
-                        "process": "converted",
-                        "file_type": "HTML",
-                        "additional": "",
-                        "files": "PDF",
-                        "page": "Convert HTML to PDF",
-                        "qr_code_data": qr_code_data,
-                    },
+            if "orientation" in request.POST:
+                landscape = request.POST["orientation"] == "landscape"
+            else:
+                # chosen on the preview form, which is not the one posted here
+                landscape = any(
+                    file.get("url") == url_to_fetch and file.get("landscape")
+                    for file in request.session.get("file_data") or []
                 )
-            except Exception as e:
-                messages.error(request, f"Error processing files: {str(e)}")
+            params = {
+                "url": url_to_fetch,
+                "paper_format": paper_format,
+                "margin": MARGINS.get(margin, 0),
+                "landscape": landscape,
+            }
+            return job_submitted(request, "html_to_pdf", params)
         else:
             return HttpResponseNotFound("File not found")
     else:
@@ -1605,7 +1695,7 @@ def pdf_to_excel(request):
         if file_data:
             logger.info("Successfully processed all PDF files.")
             request.session["file_data"] = file_data
-            return JsonResponse({"success": True, "file_data": file_data})
+            return JsonResponse({"success": True, "file_data": with_previews(file_data)})
         else:
             return JsonResponse(
                 {
@@ -1656,9 +1746,10 @@ def extract_tables_and_content(pdf_path):
 
     return tables, image_list, text_content
 
-def write_to_excel(tables, image_list, text_content):
+def write_to_excel(tables, image_list, text_content, output=None):
+    # Same as convert_pdf_to_docx: write to ``output`` or return the bytes
     temp_image_files = []
-    excel_bytes = io.BytesIO()
+    excel_bytes = io.BytesIO() if output is None else output
     
     with pd.ExcelWriter(excel_bytes, engine="openpyxl") as writer:
         for i, table in enumerate(tables):
@@ -1719,7 +1810,7 @@ def write_to_excel(tables, image_list, text_content):
     for temp_file in temp_image_files:
         os.remove(temp_file)
 
-    return excel_bytes.getvalue()
+    return excel_bytes.getvalue() if output is None else None
 
 def pdf_to_excel_convert_view(request):
     if request.method == "POST":
@@ -1731,50 +1822,11 @@ def pdf_to_excel_convert_view(request):
                 )
 
             file_info = file_data[0]
-            pdf_bytes = base64.b64decode(file_info["pdf_data"])
-            pdf_filename = file_info["filename"]
-
-            excel_filename = f"converted_{uuid.uuid4()}.xlsx"
-
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as temp_pdf:
-                temp_pdf.write(pdf_bytes)
-                temp_pdf_path = temp_pdf.name
-
-            try:
-                tables, image_list, text_content = extract_tables_and_content(temp_pdf_path)
-                excel_bytes = write_to_excel(tables, image_list, text_content)
-            finally:
-                os.unlink(temp_pdf_path)
-
-            request.session["file_value"] = base64.b64encode(excel_bytes).decode("utf-8")
-            request.session["file_name"] = excel_filename
-            request.session["file_type"] = (
-                "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-            )
+            params = {"pdf_hash": file_info["pdf_hash"], "filename": file_info["filename"]}
 
             request.session.pop("file_data", None)
 
-            qr_code_url = request.build_absolute_uri(reverse("download_file"))
-            qr_code_img = qrcode.make(qr_code_url)
-            qr_code_buffer = io.BytesIO()
-            qr_code_img.save(qr_code_buffer, format="PNG")
-            qr_code_base64 = base64.b64encode(qr_code_buffer.getvalue()).decode()
-
-            qr_code_data = f"data:image/png;base64,{qr_code_base64}"
-
-            return render(
-                request,
-                "download_page/download.html",
-                {
-                    "operation": "converted to editable EXCEL Spreadsheet",
-                    "process": "converted",
-                    "file_type": "PDF",
-                    "additional": "",
-                    "files": "Excel",
-                    "page": "Convert PDF to Excel",
-                    "qr_code_data": qr_code_data,
-                },
-            )
+            return job_submitted(request, "pdf_to_excel", params)
 
         except Exception as e:
             logger.error(f"Error converting PDF to Excel: {str(e)}", exc_info=True)
@@ -1791,26 +1843,23 @@ def download_page(request):
 
 def download_file(request):
     file_path = request.session.get("file_path")
-    file_value = request.session.get("file_value")
+    file_hash = request.session.get("file_hash")
     file_type = request.session.get("file_type")
     file_name = request.session.get("file_name")
 
-    if file_value and file_type and file_name:
+    if file_hash and file_type and file_name:
         try:
-            pdf_data = base64.b64decode(file_value)
-            response = HttpResponse(pdf_data, content_type=file_type)
-            response["Content-Disposition"] = f'attachment; filename="{file_name}"'
-            return response
+            return stream_blob(request, file_hash, file_type, file_name)
+        except BlobNotFound:
+            logger.warning(f"Blob {file_hash} is missing from the store.")
+            return HttpResponse("File not found.", status=404)
         except Exception as e:
-            logger.error(f"Error processing in-memory download: {str(e)}")
+            logger.error(f"Error processing stored download: {str(e)}")
             return HttpResponse("Error processing file.", status=500)
     elif file_path and os.path.exists(file_path):
         print("file_path", file_path)
         try:
-            with open(file_path, "rb") as f:
-                response = HttpResponse(f.read(), content_type=file_type)
-                response["Content-Disposition"] = f'attachment; filename="{file_name}"'
-            return response
+            return stream_path(request, file_path, file_type, file_name)
         except Exception as e:
             logger.error(f"Error processing file download: {str(e)}")
             return HttpResponse("Error processing file.", status=500)
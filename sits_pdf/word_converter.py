@@ -1,11 +1,19 @@
 import json
 import logging
 import os
-from multiprocessing import Pool, cpu_count
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import cpu_count, resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from threading import Lock
 from time import perf_counter
-from typing import AnyStr, IO, Union
+from typing import AnyStr, Callable, IO, Union
 import fitz
 from docx import Document
+from .jobs import pool_context
+from .metrics import stage
+from .page.LayoutCache import LayoutCache, page_fingerprint
+from .page.LayoutPack import LayoutPack, json_default, pack_layout
 from .page.Page import Page
 from .page.Pages import Pages
 
@@ -17,13 +25,57 @@ if v < [1, 19, 0] or [1, 23, 8] < v < [1, 23, 16]:
 
 logging.basicConfig(level=logging.INFO, format="[%(levelname)s] %(message)s")
 
+# Named conversion profiles: settings switching whole stages off, applied on
+# top of the default settings and overridden by explicit keyword arguments.
+#
+# Median of 5 conversions of the 10-page synthetic report of
+# scripts/bench_profiles.py (logo, text, a ruled 7x5 table and a vector shape
+# per page; PyMuPDF 1.24.10, one CPU core):
+#
+#     full         2.98s
+#     text_only    1.03s   2.9x faster: no image extraction, no shapes, no tables
+#     tables_only  2.74s   1.1x faster: only images go, table parsing dominates
+#
+# Without images, vector graphics are dropped without rendering the page, which
+# cuts shape preprocessing from 0.47s to 0.16s here; the rest of tables_only is
+# the table parsing it is meant to keep.
+#
+# Run the script on representative documents to compare on other content.
+PROFILES = {
+    # text, images, vector graphics, hyperlinks and tables
+    "full": {},
+    # editable text and hyperlinks: no images and no shapes, hence no vector
+    # graphics, no underline/highlight styles and no tables
+    "text_only": {
+        "extract_images": False,
+        "extract_shapes": False,
+        "parse_lattice_table": False,
+        "parse_stream_table": False,
+    },
+    # text and tables: shapes are kept for table borders and shading, while
+    # images are neither extracted nor clipped from vector graphics
+    "tables_only": {
+        "extract_images": False,
+        "extract_hyperlinks": False,
+    },
+}
+
 
 class Converter:
     def __init__(
-        self, pdf_file: str = None, password: str = None, stream: bytes = None
+        self,
+        pdf_file: str = None,
+        password: str = None,
+        stream: bytes = None,
+        progress: Callable[[int, int, str], None] = None,
+        layout_cache: LayoutCache = None,
     ):
         self.filename_pdf = pdf_file
         self.password = str(password or "")
+        self.progress = progress
+        self.layout_cache = layout_cache
+        self._stream = stream
+        self._page_keys = None  # cache keys of the pages to parse
 
         if not pdf_file and not stream: 
             raise ValueError("Either pdf_file or stream must be given.")
@@ -71,6 +123,9 @@ class Converter:
             "lines_left_aligned_threshold": 1.0,
             "lines_right_aligned_threshold": 1.0,
             "lines_center_aligned_threshold": 2.0,
+            "extract_images": True,
+            "extract_shapes": True,
+            "extract_hyperlinks": True,
             "clip_image_res_ratio": 4.0,
             "min_svg_gap_dx": 15.0,
             "min_svg_gap_dy": 2.0,
@@ -82,6 +137,16 @@ class Converter:
             "delete_end_line_hyphen": False,
         }
 
+    def _settings(self, profile: str = "full", **kwargs):
+        """Default settings updated with conversion ``profile``, see
+        ``PROFILES``, then with ``kwargs``."""
+        if profile not in PROFILES:
+            raise ConversionException(f"Unknown conversion profile {profile!r}.")
+        settings = self.default_settings
+        settings.update(PROFILES[profile])
+        settings.update(kwargs)
+        return settings
+
     def parse(self, start: int = 0, end: int = None, pages: list = None, **kwargs):
         return (
             self.load_pages(start, end, pages)
@@ -89,8 +154,9 @@ class Converter:
             .parse_pages(**kwargs)
         )
 
+    @stage("open_document")
     def load_pages(self, start: int = 0, end: int = None, pages: list = None):
-        logging.info(self._color_output("[1/4] Opening document..."))
+        self._report_stage(1, "Opening document...")
         if self._fitz_doc.needs_pass:
             if not self.password:
                 raise ConversionException(f"Require password for {self.filename_pdf}.")
@@ -102,17 +168,23 @@ class Converter:
         page_indexes = self._page_indexes(start, end, pages, num)
         for i in page_indexes:
             self._pages[i].skip_parsing = False
+        self._page_keys = None
 
         return self
 
+    @stage("analyze_document")
     def parse_document(self, **kwargs):
-        logging.info(self._color_output("[2/4] Analyzing document..."))
+        self._report_stage(2, "Analyzing document...")
 
-        self._pages.parse(self.fitz_doc, **kwargs)
+        if self._page_keys is None:
+            self._restore_cached_pages(**kwargs)
+        if any(not page.skip_parsing for page in self._pages):
+            self._pages.parse(self.fitz_doc, **kwargs)
         return self
 
+    @stage("parse_pages")
     def parse_pages(self, **kwargs):
-        logging.info(self._color_output("[3/4] Parsing pages..."))
+        self._report_stage(3, "Parsing pages...")
 
         pages = [page for page in self._pages if not page.skip_parsing]
         num_pages = len(pages)
@@ -129,10 +201,45 @@ class Converter:
                 else:
                     raise ConversionException(f"Error when parsing page {pid}: {e}")
 
+        self._store_cached_pages()
         return self
 
+    def _restore_cached_pages(self, **kwargs):
+        """Restore the pages to parse that are found in the layout cache and
+        mark them as parsed, remember the keys of the others."""
+        self._page_keys = {}
+        if self.layout_cache is None or kwargs["debug"]:
+            return
+        hits = 0
+        for page in self._pages:
+            if page.skip_parsing:
+                continue
+            try:
+                key = page_fingerprint(self._fitz_doc[page.id], kwargs)
+            except Exception as e:
+                logging.warning("Page %d is not cacheable: %s", page.id + 1, e)
+                continue
+            data = self.layout_cache.get(key)
+            if data is None:
+                self._page_keys[page.id] = key
+                continue
+            pid = page.id
+            page.restore(data)
+            page.id, page.skip_parsing = pid, True
+            hits += 1
+        if hits:
+            logging.info("Restored %d pages from the layout cache", hits)
+
+    def _store_cached_pages(self):
+        for pid, key in (self._page_keys or {}).items():
+            page = self._pages[pid]
+            if page.finalized:
+                self.layout_cache.put(key, page.store())
+        self._page_keys = {}
+
+    @stage("make_docx")
     def make_docx(self, filename_or_stream=None, **kwargs):
-        logging.info(self._color_output("[4/4] Creating pages..."))
+        self._report_stage(4, "Creating pages...")
         parsed_pages = list(filter(lambda page: page.finalized, self._pages))
         if not parsed_pages:
             raise ConversionException("No parsed pages. Please parse page first.")
@@ -164,28 +271,49 @@ class Converter:
 
     def store(self):
         return {
-            "filename": os.path.basename(self.filename_pdf),
+            "filename": os.path.basename(self.filename_pdf or ""),
             "page_cnt": len(self._pages),
             "pages": [page.store() for page in self._pages if page.finalized],
         }
 
-    def restore(self, data: dict):
+    def restore(self, data: Union[dict, LayoutPack]):
+        """Restore pages from ``store()`` results, or from packed layouts,
+        whose pages are decoded one at a time."""
+        if isinstance(data, LayoutPack):
+            meta, raw_pages = data.meta, data
+        else:
+            meta, raw_pages = data, data.get("pages", [])
         if not self._pages:
-            num = data.get("page_cnt", 100)
+            num = meta.get("page_cnt", 100)
             self._pages.reset([Page(id=i, skip_parsing=True) for i in range(num)])
 
-        for raw_page in data.get("pages", []):
+        for raw_page in raw_pages:
             idx = raw_page.get("id", -1)
             self._pages[idx].restore(raw_page)
 
+    def pack(self) -> bytes:
+        """Parsed layouts in the binary format of ``LayoutPack``."""
+        data = self.store()
+        pages = data.pop("pages")
+        return pack_layout(pages, **data)
+
     def serialize(self, filename: str):
-        with open(filename, "w", encoding="utf-8") as f:
-            f.write(json.dumps(self.store(), indent=4))
+        """Write the parsed layouts to ``filename``: indented JSON for a
+        ``.json`` file, e.g. when debugging, packed layouts otherwise."""
+        if filename.lower().endswith(".json"):
+            with open(filename, "w", encoding="utf-8") as f:
+                f.write(json.dumps(self.store(), indent=4, default=json_default))
+        else:
+            with open(filename, "wb") as f:
+                f.write(self.pack())
 
     def deserialize(self, filename: str):
-        with open(filename, "r") as f:
-            data = json.load(f)
-        self.restore(data)
+        with open(filename, "rb") as f:
+            data = f.read()
+        if LayoutPack.is_packed(data):
+            self.restore(LayoutPack(data))
+        else:
+            self.restore(json.loads(data))
 
     def debug_page(
         self,
@@ -217,17 +345,12 @@ class Converter:
     ):
         t0 = perf_counter()
         logging.info("Start to convert %s", self.filename_pdf)
-        settings = self.default_settings
-        settings.update(kwargs)
-
-        if pages and settings["multi_processing"]:
-            raise ConversionException(
-                "Multi-processing works for continuous pages "
-                'specified by "start" and "end" only.'
-            )
+        settings = self._settings(**kwargs)
 
         if settings["multi_processing"]:
-            self._convert_with_multi_processing(docx_filename, start, end, **settings)
+            self._convert_with_multi_processing(
+                docx_filename, start, end, pages, **settings
+            )
         else:
             self.parse(start, end, pages, **settings).make_docx(
                 docx_filename, **settings
@@ -236,10 +359,14 @@ class Converter:
         logging.info("Terminated in %.2fs.", perf_counter() - t0)
 
     def extract_tables(
-        self, start: int = 0, end: int = None, pages: list = None, **kwargs
+        self,
+        start: int = 0,
+        end: int = None,
+        pages: list = None,
+        profile: str = "tables_only",
+        **kwargs,
     ):
-        settings = self.default_settings
-        settings.update(kwargs)
+        settings = self._settings(profile, **kwargs)
         self.parse(start, end, pages, **settings)
 
         tables = []
@@ -250,58 +377,63 @@ class Converter:
         return tables
 
     def _convert_with_multi_processing(
-        self, docx_filename: str, start: int, end: int, **kwargs
+        self, docx_filename: str, start: int, end: int, pages: list, **kwargs
     ):
-        cpu = (
-            min(kwargs["cpu_count"], cpu_count())
-            if kwargs["cpu_count"]
-            else cpu_count()
-        )
-        prefix = "pages"
-        vectors = [
-            (
-                i,
-                cpu,
-                start,
-                end,
-                self.filename_pdf,
-                self.password,
-                kwargs,
-                f"{prefix}-{i}.json",
-            )
-            for i in range(cpu)
-        ]
-        pool = Pool()
-        pool.map(self._parse_pages_per_cpu, vectors, 1)
-        for i in range(cpu):
-            filename = f"{prefix}-{i}.json"
-            if not os.path.exists(filename):
-                continue
-            self.deserialize(filename)
-            os.remove(filename)
+        """Parse the pages in worker processes, then make the docx here.
+
+        The document is shared with the workers once: a file path is opened
+        by each worker, a stream is copied into a shared memory block. Each
+        worker parses a contiguous run of the requested pages and sends the
+        packed page layouts back through the pool pipe. Header and footer
+        detection only compares pages of the same run.
+        """
+        self.load_pages(start, end, pages)
+        self._restore_cached_pages(**kwargs)
+        indexes = [page.id for page in self._pages if not page.skip_parsing]
+        cpu = min(kwargs["cpu_count"] or cpu_count(), cpu_count(), len(indexes))
+        if cpu < 2:
+            self.parse_document(**kwargs).parse_pages(**kwargs)
+            self.make_docx(docx_filename, **kwargs)
+            return
+
+        self._report_stage(2, "Analyzing document...")
+        self._report_stage(3, "Parsing pages...")
+        m, n = divmod(len(indexes), cpu)
+        bounds = [i * m + min(i, n) for i in range(cpu + 1)]
+        chunks = [indexes[bounds[i] : bounds[i + 1]] for i in range(cpu)]
+
+        shm = None
+        if self.filename_pdf:
+            source = (self.filename_pdf, None)
+        else:
+            shm = SharedMemory(create=True, size=len(self._stream))
+            shm.buf[: len(self._stream)] = self._stream
+            source = (shm.name, len(self._stream))
+        try:
+            executor = _get_executor()
+            futures = [
+                executor.submit(
+                    _parse_pages_in_worker,
+                    source,
+                    self.password,
+                    chunk,
+                    kwargs,
+                    self.layout_cache,
+                )
+                for chunk in chunks
+            ]
+            for future in futures:
+                for raw_page in LayoutPack(future.result()):
+                    self._pages[raw_page["id"]].restore(raw_page)
+        except BrokenProcessPool as e:
+            _reset_executor()
+            raise ConversionException(f"Parsing worker died: {e}")
+        finally:
+            if shm is not None:
+                shm.close()
+                shm.unlink()
         self.make_docx(docx_filename, **kwargs)
 
-    @staticmethod
-    def _parse_pages_per_cpu(vector):
-        idx, cpu, s, e, pdf_filename, password, kwargs, json_filename = vector
-        cv = Converter(pdf_filename, password)
-        cv.load_pages()
-        e = e or len(cv.fitz_doc)
-        all_indexes = range(s, e)
-        num_pages = len(all_indexes)
-        m = int(num_pages / cpu)
-        n = num_pages % cpu
-        seg_size = m + int(idx < n)
-        seg_from = (m + 1) * idx + min(n - idx, 0)
-        seg_to = min(seg_from + seg_size, num_pages)
-        page_indexes = [all_indexes[i] for i in range(seg_from, seg_to)]
-        for page in cv.pages:
-            page.skip_parsing = True
-        for i in page_indexes:
-            cv.pages[i].skip_parsing = False
-        cv.parse_document(**kwargs).parse_pages(**kwargs).serialize(json_filename)
-        cv.close()
-
     @staticmethod
     def _page_indexes(start, end, pages, pdf_len):
         if pages:
@@ -313,11 +445,73 @@ class Converter:
 
         return indexes
 
+    def _report_stage(self, step: int, msg: str):
+        logging.info(self._color_output(f"[{step}/4] {msg}"))
+        if self.progress:
+            self.progress(step, 4, msg)
+
     @staticmethod
     def _color_output(msg):
         return f"\033[1;36m{msg}\033[0m"
 
 
+_executor: ProcessPoolExecutor = None
+_executor_lock = Lock()
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    """Process pool shared by all conversions, so that concurrent requests
+    together never run more parsing workers than there are cores."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # workers must share this process' tracker of shared memory
+            # blocks, or they would report the blocks they attach as leaked
+            resource_tracker.ensure_running()
+            _executor = ProcessPoolExecutor(max_workers=cpu_count(), mp_context=pool_context())
+        return _executor
+
+
+def _reset_executor():
+    """Drop a broken pool, stopping its management thread, so that the next
+    conversion starts a new one."""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def _parse_pages_in_worker(
+    source: tuple,
+    password: str,
+    indexes: list,
+    settings: dict,
+    layout_cache: LayoutCache = None,
+):
+    """Parse pages ``indexes`` of the document ``source``, a ``(path, None)``
+    or ``(shared memory name, size)`` pair, and return their packed layouts."""
+    name, size = source
+    if size is None:
+        cv = Converter(name, password, layout_cache=layout_cache)
+    else:
+        shm = SharedMemory(name=name)
+        try:
+            cv = Converter(
+                password=password,
+                stream=bytes(shm.buf[:size]),
+                layout_cache=layout_cache,
+            )
+        finally:
+            shm.close()
+    try:
+        cv.load_pages(pages=indexes)
+        cv.parse_document(**settings).parse_pages(**settings)
+        return pack_layout([page.store() for page in cv.pages if page.finalized])
+    finally:
+        cv.close()
+
+
 class ConversionException(Exception):
     pass
 
@@ -0,0 +1,58 @@
+"""
+    Incremental ZIP archive builder.
+
+    ``iter_zip`` consumes ``(name, data)`` entries from any iterable - usually a
+    generator producing one split PDF or one JPEG at a time - and yields the
+    archive bytes as soon as each entry has been compressed. Feeding the
+    result to a ``StreamingHttpResponse`` or ``BlobStore.put_chunks`` keeps
+    memory bounded by a single entry, whatever the number of entries.
+"""
+
+import io
+import zipfile
+from typing import Iterable, Iterator, Tuple
+
+
+class _ZipOutput(io.RawIOBase):
+    """Write-only, non-seekable sink collecting the bytes written by
+    ``zipfile`` until they are drained."""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def seek(self, *args):
+        # make zipfile fall back to data descriptors instead of rewriting headers
+        raise io.UnsupportedOperation("seek")
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def iter_zip(
+    entries: Iterable[Tuple[str, bytes]], compression: int = zipfile.ZIP_DEFLATED
+) -> Iterator[bytes]:
+    """Yield a ZIP archive of ``entries`` chunk by chunk."""
+    output = _ZipOutput()
+    with zipfile.ZipFile(output, "w", compression) as zip_file:
+        for name, data in entries:
+            zip_file.writestr(name, data)
+            chunk = output.drain()
+            if chunk:
+                yield chunk
+    chunk = output.drain()  # central directory
+    if chunk:
+        yield chunk
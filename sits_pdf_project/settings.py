@@ -43,8 +43,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "sits_pdf.metrics.TimingMiddleware",
     "django.middleware.security.SecurityMiddleware",
-    "django.contrib.sessions.middleware.SessionMiddleware",
+    "sits_pdf.metrics.TimedSessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
@@ -135,6 +136,79 @@ STATICFILES_DIRS = [
 MEDIA_URL = '/output/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'output')
 
+# Content-addressed storage for uploaded PDFs and conversion results.
+# The session keeps only the SHA-256 digest of each file.
+BLOB_STORE_BACKEND = "sits_pdf.blob_store.FileSystemBlobStore"
+BLOB_STORE_ROOT = os.path.join(BASE_DIR, 'blobs')
+# Blobs not written or re-uploaded for this many seconds are deleted by
+# "manage.py prune_storage", to be run periodically (e.g. from cron).
+BLOB_STORE_MAX_AGE = 7 * 24 * 3600
+
+# Background conversions: persistent job table and worker process count
+# (0 means one worker per CPU core).
+JOBS_DB_PATH = os.path.join(BASE_DIR, 'jobs.sqlite3')
+JOBS_MAX_WORKERS = 0
+# A running job whose worker stopped renewing its lease for this many seconds
+# is considered abandoned and queued again.
+JOBS_LEASE_SECONDS = 60
+# Finished jobs are dropped after this many seconds, when an engine starts
+# and by "manage.py prune_storage".
+JOBS_MAX_AGE = 7 * 24 * 3600
+
+# Page thumbnail cache, keyed by document hash, page and pixel box, its size
+# limit in bytes (least recently used thumbnails are evicted beyond it; None
+# disables the limit), and the number of processes rendering all pages of a
+# document (0: one per core).
+THUMBNAIL_CACHE_ROOT = os.path.join(BASE_DIR, 'thumbnails')
+THUMBNAIL_CACHE_MAX_BYTES = 256 * 1024 * 1024
+THUMBNAIL_MAX_WORKERS = 0
+
+# Ghostscript used for compression: executable (None: look it up on PATH,
+# then in the default Windows install folder), number of concurrent
+# interpreters (0: one per core) and time limit per file in seconds.
+GHOSTSCRIPT_PATH = None
+GHOSTSCRIPT_MAX_WORKERS = 0
+GHOSTSCRIPT_TIMEOUT = 120
+
+# "ghostscript" or "native" (pure Python optimizer, no external binary).
+# Ghostscript results saving less than 1% are also run through the optimizer.
+PDF_COMPRESSION_ENGINE = "ghostscript"
+
+# Parsed page layouts of PDF to Word conversions, keyed by page content and
+# parsing settings, so repeated templates skip layout analysis. Least
+# recently used pages are evicted beyond the size limit; None disables it.
+LAYOUT_CACHE_ROOT = os.path.join(BASE_DIR, 'layout_cache')
+LAYOUT_CACHE_MAX_BYTES = 512 * 1024 * 1024
+
+# Warm headless Chromium pool for HTML to PDF: number of browsers (and so of
+# concurrent renders), pages served before a browser is relaunched, and the
+# per-step page timeout in seconds.
+BROWSER_POOL_SIZE = 2
+BROWSER_MAX_PAGES = 50
+BROWSER_TIMEOUT = 60
+
+# Per-request stage timings, logged as JSON lines on "sits_pdf.metrics" and
+# aggregated at /metrics/, served to staff users and to clients sending
+# "Authorization: Bearer <METRICS_TOKEN>" (the client address is not trusted,
+# behind a reverse proxy it is the proxy's). Tracing Python allocations adds
+# the tracemalloc peak to each record but slows requests.
+METRICS_TRACEMALLOC = False
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "")
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "formatters": {
+        "json_line": {"format": "%(message)s"},
+    },
+    "handlers": {
+        "metrics": {"class": "logging.StreamHandler", "formatter": "json_line"},
+    },
+    "loggers": {
+        "sits_pdf.metrics": {"handlers": ["metrics"], "level": "INFO", "propagate": False},
+    },
+}
+
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.0/ref/settings/#default-auto-field